@@ -3,7 +3,8 @@ from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
 from .models import (
     LivingWorld, Post, Friendship, CommunityMembership,
-    Proposal, Vote, SmartProfile, VerifiableCredential, DataExport
+    Proposal, Vote, SmartProfile, VerifiableCredential, DataExport, Job,
+    PinnedContent, FundingRound, Contribution, OpinionAnalysis
 )
 
 User = get_user_model()
@@ -32,12 +33,13 @@ class LivingWorldAdmin(admin.ModelAdmin):
     list_display = ['name', 'owner', 'category', 'member_count', 'created_at']
     list_filter = ['created_at', 'category']
     search_fields = ['name', 'description', 'owner__username']
-    readonly_fields = ['id', 'created_at', 'updated_at']
+    readonly_fields = ['id', 'member_count', 'created_at', 'updated_at']
     ordering = ['-created_at']
     
     def member_count(self, obj):
-        return obj.memberships.count()
+        return obj.member_count
     member_count.short_description = 'Members'
+    member_count.admin_order_field = 'member_count'
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
@@ -88,12 +90,16 @@ class ProposalAdmin(admin.ModelAdmin):
     list_display = ['title', 'creator', 'world', 'vote_count', 'created_at']
     list_filter = ['created_at', 'world']
     search_fields = ['title', 'description', 'creator__username', 'world__name']
-    readonly_fields = ['id', 'created_at', 'updated_at']
+    readonly_fields = [
+        'id', 'vote_count', 'agree_count', 'disagree_count', 'abstain_count',
+        'created_at', 'updated_at'
+    ]
     ordering = ['-created_at']
     
     def vote_count(self, obj):
-        return obj.votes.count()
+        return obj.vote_count
     vote_count.short_description = 'Votes'
+    vote_count.admin_order_field = 'vote_count'
 
 @admin.register(Vote)
 class VoteAdmin(admin.ModelAdmin):
@@ -103,6 +109,29 @@ class VoteAdmin(admin.ModelAdmin):
     readonly_fields = ['id', 'created_at']
     ordering = ['-created_at']
 
+@admin.register(FundingRound)
+class FundingRoundAdmin(admin.ModelAdmin):
+    list_display = ['title', 'world', 'mechanism', 'status', 'matching_pool', 'created_at']
+    list_filter = ['mechanism', 'status', 'created_at']
+    search_fields = ['title', 'world__name', 'creator__username']
+    readonly_fields = ['id', 'results', 'closed_at', 'created_at', 'updated_at']
+    ordering = ['-created_at']
+
+@admin.register(Contribution)
+class ContributionAdmin(admin.ModelAdmin):
+    list_display = ['contributor', 'proposal', 'round', 'amount', 'updated_at']
+    list_filter = ['round__mechanism', 'created_at']
+    search_fields = ['contributor__username', 'proposal__title', 'round__title']
+    readonly_fields = ['id', 'created_at', 'updated_at']
+    ordering = ['-created_at']
+
+@admin.register(OpinionAnalysis)
+class OpinionAnalysisAdmin(admin.ModelAdmin):
+    list_display = ['world', 'votes_analyzed', 'vote_watermark', 'computed_at']
+    search_fields = ['world__name']
+    readonly_fields = ['result', 'state', 'vote_watermark', 'votes_analyzed', 'computed_at']
+    ordering = ['-computed_at']
+
 @admin.register(DataExport)
 class DataExportAdmin(admin.ModelAdmin):
     list_display = ['user', 'status', 'ipfs_cid', 'created_at']
@@ -110,3 +139,19 @@ class DataExportAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'ipfs_cid']
     readonly_fields = ['id', 'created_at', 'updated_at', 'ipfs_cid']
     ordering = ['-created_at']
+
+@admin.register(PinnedContent)
+class PinnedContentAdmin(admin.ModelAdmin):
+    list_display = ['cid', 'size', 'pin_state', 'directory_cid', 'updated_at']
+    list_filter = ['pin_state']
+    search_fields = ['cid', 'sha256', 'directory_cid']
+    readonly_fields = ['sha256', 'created_at', 'updated_at']
+    ordering = ['-updated_at']
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['task', 'queue', 'status', 'priority', 'attempts', 'run_at', 'locked_by']
+    list_filter = ['status', 'queue', 'task']
+    search_fields = ['task', 'locked_by']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'locked_until', 'locked_by', 'last_error']
+    ordering = ['-created_at']
@@ -9,9 +9,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     UserViewSet, LivingWorldViewSet, PostViewSet, FriendshipViewSet,
-    CommunityMembershipViewSet, ProposalViewSet, VoteViewSet, AICompanionView
+    CommunityMembershipViewSet, ProposalViewSet, VoteViewSet, FundingRoundViewSet
+)
+from .viewsets import SmartProfileViewSet, VerifiableCredentialViewSet, DataExportViewSet
+from .async_views import (
+    CompanionQueryView, ExportDownloadView, IPFSContentView, WorldEventsView
 )
-from .viewsets import SmartProfileViewSet, VerifiableCredentialViewSet
 
 # Create router and register ViewSets
 router = DefaultRouter()
@@ -22,13 +25,18 @@ router.register(r'friendships', FriendshipViewSet)
 router.register(r'memberships', CommunityMembershipViewSet)
 router.register(r'proposals', ProposalViewSet)
 router.register(r'votes', VoteViewSet)
+router.register(r'funding-rounds', FundingRoundViewSet)
 router.register(r'smart-profiles', SmartProfileViewSet)
 router.register(r'verifiable-credentials', VerifiableCredentialViewSet)
+router.register(r'exports', DataExportViewSet)
 
 urlpatterns = [
     # Include router URLs
     path('', include(router.urls)),
     
-    # Custom endpoints
-    path('companion/query/', AICompanionView.as_view(), name='ai-companion'),
+    # Custom endpoints (async; see core/async_views.py)
+    path('companion/query/', CompanionQueryView.as_view(), name='ai-companion'),
+    path('exports/<uuid:pk>/download/', ExportDownloadView.as_view(), name='export-download'),
+    path('ipfs/<str:cid>/', IPFSContentView.as_view(), name='ipfs-content'),
+    path('worlds/<uuid:pk>/events/', WorldEventsView.as_view(), name='world-events'),
 ] 
\ No newline at end of file
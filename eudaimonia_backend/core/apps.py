@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'core' 
\ No newline at end of file
+    name = 'core'
+
+    def ready(self):
+        from . import counters, friend_graph, profile_cache, world_events  # noqa: F401  (connects signal receivers)
+        from . import tasks  # noqa: F401  (registers background tasks)
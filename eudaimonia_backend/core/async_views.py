@@ -0,0 +1,270 @@
+"""
+Eudaimonia Async Views
+
+Async implementations of the I/O-bound endpoints: companion queries,
+export downloads, IPFS content fetches and world event streams. Served under ASGI
+(``eudaimonia_backend/asgi.py``), a request waiting on the LLM or the
+IPFS node holds no worker thread, so one process can keep thousands of
+slow requests open. Database work goes through ``sync_to_async``.
+
+These are plain Django views, since DRF's request handling is
+synchronous. ``AsyncAPIView`` supplies the JWT authentication and JSON
+error responses the DRF views get from the framework.
+"""
+
+import json
+import logging
+import re
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .companion import (
+    CompanionError, answer_events, collect, get_llm_client, placeholder_response
+)
+from .companion_cache import cached_answer_fragments
+from .companion_context import load_context
+from .ipfs_async import get_async_service
+from .ipfs_service import IPFSError
+from .models import DataExport, LivingWorld
+from .streaming import event_stream_response
+from .world_events import get_broker
+
+logger = logging.getLogger(__name__)
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+@sync_to_async
+def authenticate(request):
+    """
+    Return the user authenticated by the request's JWT, or None if it
+    carries no credentials. Raises AuthenticationFailed for a bad token.
+    """
+    result = JWTAuthentication().authenticate(request)
+    return result[0] if result else None
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range`` header into ``(start, end)``, end
+    exclusive. Returns None if there is no usable header and raises
+    ValueError if the range cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size
+    else:
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+    if start >= end:
+        raise ValueError(header)
+    return start, end
+
+
+class AsyncAPIView(View):
+    """
+    Base class for async API views.
+
+    Authenticates the request with the same JWT scheme as the DRF views
+    and maps IPFS failures to a 502 response.
+    """
+    authentication_required = True
+    query_budget = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token authentication only; there is no session cookie to protect.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if self.authentication_required:
+            try:
+                user = await authenticate(request)
+            except AuthenticationFailed as e:
+                return self.unauthorized(e.detail)
+            if user is None:
+                return self.unauthorized('Authentication credentials were not provided.')
+            request.user = user
+
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except IPFSError as e:
+            logger.warning('IPFS request failed: %s', e)
+            return JsonResponse({'error': 'IPFS node unavailable'}, status=502)
+
+    def unauthorized(self, detail):
+        if isinstance(detail, dict):
+            payload = detail
+        else:
+            payload = {'detail': str(detail)}
+        response = JsonResponse(payload, status=401)
+        response['WWW-Authenticate'] = 'Bearer realm="api"'
+        return response
+
+    def json_body(self, request):
+        """
+        The request body decoded as a JSON object, or None if invalid.
+        """
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    async def immutable_response(self, request, cid, content_type, filename=None):
+        """
+        Stream the content behind ``cid``, honouring ``Range`` and
+        ``If-None-Match``. Content behind a CID never changes, so it is
+        cacheable indefinitely with the CID as its ETag.
+        """
+        etag = f'"{cid}"'
+        if request.headers.get('If-None-Match') == etag:
+            return HttpResponse(status=304, headers={'ETag': etag})
+
+        ipfs = get_async_service()
+        size = await ipfs.stat_size(cid)
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            return HttpResponse(status=416, headers={'Content-Range': f'bytes */{size}'})
+
+        if byte_range is None:
+            start, end, status = 0, size, 200
+        else:
+            (start, end), status = byte_range, 206
+        response = StreamingHttpResponse(
+            ipfs.cat(cid, offset=start, length=end - start),
+            status=status,
+            content_type=content_type,
+        )
+        response['Content-Length'] = str(end - start)
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        if status == 206:
+            response['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+        if filename:
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class CompanionQueryView(AsyncAPIView):
+    """
+    AI Companion endpoint for contextual AI assistance.
+
+    This endpoint provides personalized AI assistance based on
+    the user's faceted identity and community context. Clients that
+    accept ``text/event-stream`` get the answer streamed as it is
+    generated: ``token`` events, then ``done`` (with the first-token
+    latency) or ``error``.
+
+    Answers are cached per profile version, and identical questions
+    asked concurrently share one LLM call (see core/companion_cache.py).
+    """
+    query_budget = {'post': 4}
+
+    async def post(self, request):
+        """
+        Process AI companion queries with user context.
+
+        The query is enriched with the user's faceted profile before
+        being sent to the LLM; the event loop serves other requests
+        while the model answers.
+        """
+        data = self.json_body(request)
+        query = (data or {}).get('query', '')
+        if not query:
+            return JsonResponse({'error': 'Query is required'}, status=400)
+
+        version, user_context, context = await sync_to_async(load_context)(request.user, query)
+
+        client = get_llm_client()
+        fragments, source = await cached_answer_fragments(
+            client, request.user.pk, version, context, query
+        )
+        if 'text/event-stream' in request.headers.get('Accept', ''):
+            return event_stream_response(request, answer_events(fragments, source=source))
+        if client is None:
+            return JsonResponse(placeholder_response(user_context, query))
+
+        try:
+            message = await collect(fragments)
+        except CompanionError as e:
+            logger.warning('Companion query failed: %s', e)
+            return JsonResponse({'error': 'AI companion is unavailable'}, status=502)
+
+        return JsonResponse({
+            'message': message,
+            'user_context': user_context,
+            'query': query,
+            'cached': source != 'llm',
+        })
+
+
+class ExportDownloadView(AsyncAPIView):
+    """
+    Download a completed DataExport of the current user from IPFS.
+
+    Full exports are gzipped NDJSON; incremental exports return their
+    JSON manifest, whose chunks are fetched through IPFSContentView.
+    """
+    query_budget = {'get': 2}
+
+    async def get(self, request, pk):
+        export = await DataExport.objects.filter(pk=pk, user=request.user).afirst()
+        if export is None:
+            return JsonResponse({'error': 'Export not found'}, status=404)
+        if export.status != 'complete' or not export.ipfs_cid:
+            return JsonResponse({'error': 'Export is not complete'}, status=409)
+
+        if export.kind == 'incremental':
+            content_type, filename = 'application/json', f'eudaimonia-export-{export.pk}.json'
+        else:
+            content_type, filename = 'application/gzip', f'eudaimonia-export-{export.pk}.ndjson.gz'
+        return await self.immutable_response(request, export.ipfs_cid, content_type, filename)
+
+
+class IPFSContentView(AsyncAPIView):
+    """
+    Fetch content of the current user's completed data exports by CID:
+    an export itself, or a chunk listed in an incremental export's
+    manifest.
+
+    Other CIDs, including content this node pinned for other users, are
+    not found, so the endpoint is not a gateway to arbitrary content.
+    """
+    query_budget = {'get': 2}
+
+    async def get(self, request, cid):
+        owned = DataExport.objects.filter(user=request.user, status='complete').filter(
+            Q(ipfs_cid=cid) | Q(chunks__cid=cid)
+        )
+        if not await owned.aexists():
+            return JsonResponse({'error': 'Content not found'}, status=404)
+        return await self.immutable_response(request, cid, 'application/octet-stream')
+
+
+class WorldEventsView(AsyncAPIView):
+    """
+    Stream the activity of a LivingWorld as Server-Sent Events.
+
+    Clients get ``ready`` once subscribed, then ``post``, ``member`` and
+    ``tally`` events as they happen (see core/world_events.py), instead
+    of polling the world's posts, members and proposals.
+    """
+    query_budget = {'get': 2}
+
+    async def get(self, request, pk):
+        if not await LivingWorld.objects.filter(pk=pk).aexists():
+            return JsonResponse({'error': 'World not found'}, status=404)
+        return event_stream_response(request, get_broker().subscribe(pk))
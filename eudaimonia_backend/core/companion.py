@@ -0,0 +1,179 @@
+"""
+Eudaimonia AI Companion
+
+Prompt construction and the LLM client behind the companion endpoint.
+A compact, token-budgeted summary of the user's faceted profile (see
+``core.companion_context``) is given to the model as context, so answers
+reflect the communities, roles and reputations the user holds.
+
+The OpenAI client is optional: without ``OPENAI_API_KEY`` the endpoint
+answers with a placeholder instead of calling a model. Any
+OpenAI-compatible server can be used through ``OPENAI_BASE_URL``,
+including ``FakeLLMServer`` from ``core/llm_fake.py`` for local testing.
+
+Answers are streamed: ``answer_fragments`` yields the answer as it is
+generated and ``answer_events`` turns fragments into ``(event, data)``
+pairs ready for ``core.streaming``, reporting the time to the first
+token. Repeated questions are served by ``core.companion_cache``.
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from contextlib import aclosing
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_MESSAGE = (
+    "You are an AI companion helping a user navigate their social world "
+    "on Eudaimonia. You understand the concept of 'Faceted Identity' "
+    "where a person's identity emerges from their various community "
+    "affiliations and roles."
+)
+
+
+class CompanionError(Exception):
+    """
+    Raised when the LLM provider cannot be reached or returns an error.
+    """
+
+
+def build_messages(context, query):
+    """
+    Chat messages for ``query`` asked by a user described by ``context``
+    (see core/companion_context.py).
+    """
+    return [
+        {'role': 'system', 'content': SYSTEM_MESSAGE},
+        {'role': 'system', 'content': f"User context:\n{context}"},
+        {'role': 'user', 'content': query},
+    ]
+
+
+PLACEHOLDER_MESSAGE = 'AI Companion feature is being implemented'
+
+
+def placeholder_response(user_context, query):
+    return {
+        'message': PLACEHOLDER_MESSAGE,
+        'user_context': user_context,
+        'query': query,
+        'planned_integration': 'OpenAI API for personalized responses'
+    }
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_llm_client():
+    """
+    Return the AsyncOpenAI client for the running event loop, or None if
+    no API key is configured.
+    """
+    if not settings.OPENAI_API_KEY:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        from openai import AsyncOpenAI
+
+        client = _clients[loop] = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL or None,
+            timeout=settings.OPENAI_TIMEOUT,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+        )
+    return client
+
+
+async def stream_completion(client, context, query):
+    """
+    Ask the model ``query`` and yield its answer as it is generated, in
+    text fragments. Closing the generator early closes the connection to
+    the provider, which stops the generation.
+    """
+    import openai
+
+    try:
+        stream = await client.chat.completions.create(
+            model=settings.OPENAI_MODEL,
+            messages=build_messages(context, query),
+            stream=True,
+        )
+    except openai.APIError as e:
+        raise CompanionError(str(e)) from e
+
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
+    except (openai.APIError, httpx.HTTPError) as e:
+        raise CompanionError(str(e)) from e
+    finally:
+        await stream.response.aclose()
+
+
+def answer_fragments(client, context, query):
+    """
+    The answer to ``query`` as an async iterator of text fragments. Without
+    a client the placeholder message is the only fragment.
+    """
+    if client is None:
+        return single_fragment(PLACEHOLDER_MESSAGE)
+    return stream_completion(client, context, query)
+
+
+async def collect(fragments):
+    """
+    Join an async iterator of fragments into the full answer.
+    """
+    async with aclosing(fragments):
+        return ''.join([text async for text in fragments])
+
+
+async def answer_events(fragments, **info):
+    """
+    Yield ``fragments`` as ``('token', ...)`` events followed by one
+    ``('done', ...)`` event with timings and ``info``, or an
+    ``('error', ...)`` event if the provider fails.
+    """
+    started = time.monotonic()
+    first_token_ms = None
+    chunks = 0
+
+    def elapsed_ms():
+        return round((time.monotonic() - started) * 1000, 1)
+
+    try:
+        async with aclosing(fragments):
+            async for text in fragments:
+                if first_token_ms is None:
+                    first_token_ms = elapsed_ms()
+                    logger.info('Companion first token after %.1f ms', first_token_ms)
+                chunks += 1
+                yield 'token', {'text': text}
+    except CompanionError as e:
+        logger.warning('Companion stream failed: %s', e)
+        yield 'error', {'error': 'AI companion is unavailable'}
+        return
+    except asyncio.CancelledError:
+        logger.info('Companion stream cancelled after %d chunks, %.1f ms', chunks, elapsed_ms())
+        raise
+
+    yield 'done', {
+        'first_token_ms': first_token_ms,
+        'duration_ms': elapsed_ms(),
+        'chunks': chunks,
+        **info,
+    }
+
+
+async def single_fragment(text):
+    yield text
@@ -0,0 +1,184 @@
+"""
+Eudaimonia AI Companion Cache
+
+Serves repeated companion questions without another LLM call. Answers
+are keyed on the user, their profile version (see ``profile_cache``),
+the model, prompt and rendered context, and the normalized query, so an
+answer is only reused while the context it was generated from is
+unchanged: joining a world, editing a SmartProfile or new matching posts
+in the user's worlds give the next question a fresh answer.
+
+Queries match exactly after normalization (Unicode NFKC, case folding,
+collapsed whitespace, trailing punctuation dropped), so "What should I
+do?" and "what should i do" share an answer; paraphrases do not.
+
+Identical questions arriving while the first is still being answered
+are not sent to the provider again: one generation runs and its
+fragments are fanned out to every request waiting on it. This happens
+per process (per event loop). The generation is cancelled once every
+waiting client has gone, and only complete answers are cached.
+
+The backend is the ``companion`` entry of ``CACHES`` (see settings).
+"""
+
+import asyncio
+import hashlib
+import logging
+import unicodedata
+import weakref
+from contextlib import aclosing
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .companion import (
+    SYSTEM_MESSAGE, CompanionError, answer_fragments, single_fragment
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump when the prompt is built differently, to retire cached answers.
+PROMPT_SCHEMA = 3
+
+_TRAILING_PUNCTUATION = ' ?!.,;:。？！'
+
+
+def get_response_cache():
+    return caches[getattr(settings, 'COMPANION_CACHE_ALIAS', 'companion')]
+
+
+def normalize_query(query):
+    text = unicodedata.normalize('NFKC', query).casefold()
+    return ' '.join(text.split()).rstrip(_TRAILING_PUNCTUATION)
+
+
+def response_key(user_id, profile_version, context, query):
+    digest = hashlib.sha256('\0'.join([
+        settings.OPENAI_MODEL, SYSTEM_MESSAGE, context, normalize_query(query)
+    ]).encode()).hexdigest()
+    return f'companion:{PROMPT_SCHEMA}:{user_id}:{profile_version}:{digest}'
+
+
+class _Flight:
+    """
+    One generation in progress, shared by every request asking the same
+    question.
+    """
+
+    def __init__(self, key, fragments, registry):
+        self.key = key
+        self.fragments = []
+        self.finished = False
+        self.error = None
+        self.listeners = 0
+        self._registry = registry
+        self._changed = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run(fragments))
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _run(self, fragments):
+        try:
+            async with aclosing(fragments):
+                async for text in fragments:
+                    self.fragments.append(text)
+                    self._notify()
+            answer = ''.join(self.fragments)
+            if answer:
+                await asyncio.to_thread(get_response_cache().set, self.key, answer)
+        except asyncio.CancelledError:
+            # Anyone still following must not take the partial answer
+            # for a complete one.
+            self.error = CompanionError('cancelled')
+            raise
+        except CompanionError as e:
+            self.error = e
+        except Exception as e:
+            logger.exception('Companion generation failed')
+            self.error = e
+        finally:
+            self.finished = True
+            if self._registry.get(self.key) is self:
+                del self._registry[self.key]
+            self._notify()
+
+    def follow(self):
+        """
+        Return an async iterator over every fragment of the answer, from
+        the first. It counts as a listener from now on, not from its
+        first read, until it is exhausted or closed.
+        """
+        return _Follower(self)
+
+    def _release(self):
+        self.listeners -= 1
+        if not self.listeners and not self.finished:
+            self._task.cancel()
+
+
+class _Follower:
+    """
+    One request reading a _Flight. Registered when handed out, so a
+    request that has joined but not yet started reading keeps the
+    generation alive.
+    """
+
+    def __init__(self, flight):
+        self._flight = flight
+        self._index = 0
+        self._closed = False
+        flight.listeners += 1
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        flight = self._flight
+        while not self._closed:
+            changed = flight._changed
+            if self._index < len(flight.fragments):
+                self._index += 1
+                return flight.fragments[self._index - 1]
+            if flight.finished:
+                self._close()
+                if flight.error is not None:
+                    raise CompanionError(str(flight.error))
+                break
+            await changed.wait()
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        self._close()
+
+    def _close(self):
+        if not self._closed:
+            self._closed = True
+            self._flight._release()
+
+
+_flights = weakref.WeakKeyDictionary()
+
+
+async def cached_answer_fragments(client, user_id, profile_version, context, query):
+    """
+    Return ``(fragments, source)`` for ``query``: the cached answer
+    (``'cache'``), the generation already in progress for it
+    (``'shared'``) or a new one (``'llm'``). Placeholder answers
+    (``'placeholder'``, no client) are not cached.
+    """
+    if client is None:
+        return answer_fragments(None, context, query), 'placeholder'
+
+    key = response_key(user_id, profile_version, context, query)
+    answer = await get_response_cache().aget(key)
+    if answer is not None:
+        return single_fragment(answer), 'cache'
+
+    registry = _flights.setdefault(asyncio.get_running_loop(), {})
+    flight = registry.get(key)
+    if flight is not None:
+        return flight.follow(), 'shared'
+    flight = registry[key] = _Flight(key, answer_fragments(client, context, query), registry)
+    return flight.follow(), 'llm'
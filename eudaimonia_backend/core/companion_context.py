@@ -0,0 +1,214 @@
+"""
+Eudaimonia AI Companion Context
+
+Builds the user context given to the LLM with each companion query. The
+faceted profile and the user's recent posts are turned into short
+*segments* (one line per membership or post), which are ranked by
+relevance to the query and packed into a token budget, so the prompt
+stays the same size however many worlds a user belongs to. Posts by
+others in the user's worlds that match the query are retrieved from the
+post index (see core.post_index) and compete for the same budget.
+
+Segments are built once per profile version and state of the user's
+posts (see ``posts_version``) and cached (the ``companion`` entry of
+``CACHES``); ranking and packing them for a query is pure Python over a
+few dozen lines. Tokens are counted with a regex approximation of BPE
+tokenizers that slightly overestimates, so the budget is an upper bound
+without a tokenizer dependency.
+"""
+
+import math
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .companion_cache import get_response_cache
+from .models import Post
+from .post_index import retrieve_posts
+from .profile_cache import get_faceted_profile, get_profile_version
+
+# Bump when segments are built or rendered differently.
+CONTEXT_SCHEMA = 1
+
+# Recent posts of the user considered for the context.
+CONTEXT_POSTS = 20
+
+# Longest world description or post excerpt in a segment, in tokens.
+EXCERPT_TOKENS = 40
+
+SECTIONS = (
+    ('membership', 'Communities:'),
+    ('post', 'Recent posts:'),
+    ('world_post', 'Posts in their communities:'),
+)
+
+ROLE_WEIGHTS = {'admin': 1.5, 'moderator': 1.0, 'member': 0.5}
+
+# Words, numbers, runs of punctuation and leading spaces, roughly as BPE
+# tokenizers split text before merging.
+_PIECE_RE = re.compile(r" ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+")
+
+_TERM_RE = re.compile(r'[^\W_]{3,}')
+
+STOP_WORDS = frozenset(
+    'the and for are but not you your with this that have from what which '
+    'when where who how can could would should about into they them their '
+    'there was were been has had will just more some any all our out'.split()
+)
+
+Segment = namedtuple('Segment', ['kind', 'text', 'tokens', 'terms', 'weight'])
+
+
+def _piece_tokens(piece):
+    # Merged BPE tokens average about four characters of English.
+    return max(1, math.ceil(len(piece.strip() or piece) / 4))
+
+
+def count_tokens(text):
+    """
+    Approximate the number of LLM tokens in ``text``.
+    """
+    return sum(_piece_tokens(piece) for piece in _PIECE_RE.findall(text))
+
+
+def truncate_tokens(text, limit):
+    """
+    ``text`` cut to at most ``limit`` tokens, with an ellipsis if cut.
+    """
+    used = 0
+    for match in _PIECE_RE.finditer(text):
+        used += _piece_tokens(match.group())
+        if used > limit - 1:
+            return text[:match.start()].rstrip() + '…'
+    return text
+
+
+def query_terms(text):
+    return frozenset(term for term in _TERM_RE.findall(text.casefold()) if term not in STOP_WORDS)
+
+
+def _segment(kind, text, weight):
+    return Segment(kind, text, count_tokens(text) + 1, query_terms(text), weight)
+
+
+def build_segments(user, profile):
+    """
+    Candidate context segments for ``user``, whose faceted profile
+    document is ``profile``.
+    """
+    segments = [_segment('user', f"The user is {profile['username']}.", 0.0)]
+    for membership in profile['community_memberships']:
+        description = truncate_tokens(' '.join((membership['world_description'] or '').split()), EXCERPT_TOKENS)
+        weight = ROLE_WEIGHTS.get(membership['role'], 0.5) + math.log1p(membership['reputation']) / 4
+        segments.append(_segment('membership', (
+            f"- {membership['world_name']}: {membership['role']} as "
+            f"\"{membership['profile_name']}\", reputation {membership['reputation']}. {description}"
+        ), weight))
+
+    now = timezone.now()
+    posts = (
+        Post.objects.filter(author=user).select_related('world')
+        .only('content', 'created_at', 'world__name').order_by('-created_at')[:CONTEXT_POSTS]
+    )
+    for post in posts:
+        age_days = (now - post.created_at).total_seconds() / 86400
+        content = truncate_tokens(' '.join(post.content.split()), EXCERPT_TOKENS)
+        segments.append(_segment('post', f'- In {post.world.name}: "{content}"', 1 / (1 + age_days / 7)))
+    return segments
+
+
+def retrieved_segments(results):
+    """
+    Segments for ``(score, post)`` pairs from ``retrieve_posts``. Their
+    weight grows with the similarity to the query.
+    """
+    segments = []
+    for score, post in results:
+        content = truncate_tokens(' '.join(post.content.split()), EXCERPT_TOKENS)
+        segments.append(_segment(
+            'world_post', f'- {post.author.username} in {post.world.name}: "{content}"', 1 + 3 * score
+        ))
+    return segments
+
+
+def posts_version(user_id):
+    """
+    A token that changes whenever ``user_id``'s posts do: the newest
+    ``updated_at`` and the number of posts (deleting an older post does
+    not change the former). One indexed query.
+    """
+    stamp = Post.objects.filter(author_id=user_id).aggregate(
+        latest=Max('updated_at'), count=Count('id')
+    )
+    latest = stamp['latest'].timestamp() if stamp['latest'] else 0
+    return f"{latest}:{stamp['count']}"
+
+
+def _segments_key(user_id, profile_version, posts):
+    return f'companion-context:{CONTEXT_SCHEMA}:{user_id}:{profile_version}:{posts}'
+
+
+def get_context_segments(user, profile_version, posts, profile):
+    """
+    Return the context segments for ``user`` at ``profile_version`` and
+    ``posts`` (from ``posts_version``), from cache if current.
+    """
+    cache = get_response_cache()
+    key = _segments_key(user.pk, profile_version, posts)
+    segments = cache.get(key)
+    if segments is None:
+        segments = build_segments(user, profile)
+        cache.set(key, segments)
+    return segments
+
+
+def render_context(segments, query, budget=None):
+    """
+    Render the segments most relevant to ``query`` within ``budget``
+    tokens. A segment's score is its weight plus two points for each
+    query term it mentions; the user line is always kept.
+    """
+    budget = budget or settings.COMPANION_CONTEXT_TOKENS
+    terms = query_terms(query)
+    head, candidates = segments[0], segments[1:]
+    ranked = sorted(
+        candidates,
+        key=lambda segment: segment.weight + 2 * len(terms & segment.terms),
+        reverse=True,
+    )
+
+    chosen, used = set(), head.tokens + sum(count_tokens(title) + 1 for _, title in SECTIONS)
+    for segment in ranked:
+        if used + segment.tokens <= budget:
+            chosen.add(id(segment))
+            used += segment.tokens
+
+    lines = [head.text]
+    for kind, title in SECTIONS:
+        section = [segment.text for segment in ranked if segment.kind == kind and id(segment) in chosen]
+        if section:
+            lines.append(title)
+            lines.extend(section)
+    return '\n'.join(lines)
+
+
+def load_context(user, query):
+    """
+    Return ``(profile version, faceted profile, rendered context)`` for
+    a companion query by ``user``.
+    """
+    # Read the versions first: if the profile or posts change in between,
+    # the segments are cached under the outdated versions, where nobody
+    # looks.
+    version = get_profile_version(user.pk)
+    posts = posts_version(user.pk)
+    profile = get_faceted_profile(user)
+    segments = get_context_segments(user, version, posts, profile)
+    world_ids = {membership['world_id'] for membership in profile['community_memberships']}
+    retrieved = retrieve_posts(
+        query, world_ids, k=settings.COMPANION_RETRIEVED_POSTS, exclude_author=user
+    )
+    return version, profile, render_context(segments + retrieved_segments(retrieved), query)
@@ -0,0 +1,149 @@
+"""
+Eudaimonia Counter Caches
+
+This module keeps the denormalized ``LivingWorld.member_count`` and
+``Proposal.vote_count`` columns, and the per-choice vote tallies
+(``Proposal.agree_count`` etc.), in step with the rows they count, so
+serializers and the admin can read a column instead of issuing a COUNT
+query per object.
+
+Counters are adjusted with ``F()`` expressions in the same transaction
+as the membership or vote being created, changed or deleted; a vote's
+total and choice counters move in a single UPDATE. Code paths that
+bypass model signals (``bulk_create``, queryset ``update()`` and
+``delete()``) must call ``adjust_counters`` themselves;
+``manage.py reconcile_counters`` repairs any drift that slips through.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import CommunityMembership, LivingWorld, Proposal, Vote
+
+
+def adjust_counter(model, pk, field, delta):
+    """
+    Atomically add ``delta`` to ``field`` on the row ``pk`` of ``model``.
+    """
+    adjust_counters(model, pk, {field: delta})
+
+
+def adjust_counters(model, pk, deltas):
+    """
+    Atomically add each ``{field: delta}`` of ``deltas`` to the row ``pk``
+    of ``model``, in one UPDATE.
+    """
+    adjust_counters_in(model, [pk], deltas)
+
+
+def adjust_counters_in(model, pks, deltas):
+    """
+    Like ``adjust_counters``, for every row of ``model`` in ``pks``.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas or not pks:
+        return
+    model.objects.filter(pk__in=pks).update(**{
+        field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items()
+    })
+
+
+def tally_field(choice):
+    return f'{choice}_count'
+
+
+@receiver(post_save, sender=CommunityMembership)
+def membership_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_counter(LivingWorld, instance.world_id, 'member_count', 1)
+
+
+@receiver(post_delete, sender=CommunityMembership)
+def membership_deleted(sender, instance, **kwargs):
+    adjust_counter(LivingWorld, instance.world_id, 'member_count', -1)
+
+
+@receiver(pre_save, sender=Vote)
+def vote_about_to_change(sender, instance, update_fields=None, raw=False, **kwargs):
+    instance._previous_choice = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and 'choice' not in update_fields:
+        return
+    instance._previous_choice = Vote.objects.filter(
+        pk=instance.pk
+    ).values_list('choice', flat=True).first()
+
+
+@receiver(post_save, sender=Vote)
+def vote_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_counters(Proposal, instance.proposal_id, {
+            'vote_count': 1, tally_field(instance.choice): 1,
+        })
+        return
+    previous = getattr(instance, '_previous_choice', None)
+    if previous is not None and previous != instance.choice:
+        adjust_counters(Proposal, instance.proposal_id, {
+            tally_field(previous): -1, tally_field(instance.choice): 1,
+        })
+
+
+@receiver(post_delete, sender=Vote)
+def vote_deleted(sender, instance, **kwargs):
+    adjust_counters(Proposal, instance.proposal_id, {
+        'vote_count': -1, tally_field(instance.choice): -1,
+    })
+
+
+# (model, counter field, related model, foreign key on the related model,
+#  filter on the related rows counted)
+COUNTERS = [
+    (LivingWorld, 'member_count', CommunityMembership, 'world', {}),
+    (Proposal, 'vote_count', Vote, 'proposal', {}),
+] + [
+    (Proposal, tally_field(choice), Vote, 'proposal', {'choice': choice})
+    for choice, _ in Vote.CHOICE_CHOICES
+]
+
+
+def actual_count_subquery(related_model, fk_name, filters=None):
+    """
+    Correlated subquery counting ``related_model`` rows (matching
+    ``filters``) per outer row.
+    """
+    counts = related_model.objects.filter(
+        **{fk_name: OuterRef('pk')}, **(filters or {})
+    ).order_by().values(fk_name).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def find_drift(model, field, related_model, fk_name, filters=None):
+    """
+    Return a queryset of ``model`` rows whose counter disagrees with reality,
+    annotated with the correct value as ``actual``.
+    """
+    return model.objects.annotate(
+        actual=actual_count_subquery(related_model, fk_name, filters)
+    ).exclude(**{field: F('actual')})
+
+
+def reconcile(model, field, related_model, fk_name, filters=None, batch_size=1000):
+    """
+    Recompute drifted counters for ``model`` in bulk.
+
+    Returns the number of rows corrected.
+    """
+    drifted = find_drift(model, field, related_model, fk_name, filters)
+    corrections = [
+        model(pk=pk, **{field: actual})
+        for pk, actual in drifted.values_list('pk', 'actual')
+    ]
+    with transaction.atomic():
+        model.objects.bulk_update(corrections, [field], batch_size=batch_size)
+    return len(corrections)
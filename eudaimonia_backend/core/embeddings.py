@@ -0,0 +1,97 @@
+"""
+Eudaimonia Text Embeddings
+
+Embedders turn texts into unit-length float32 vectors, so the dot
+product of two vectors is their cosine similarity. The embedder used for
+the post index is set by ``POST_EMBEDDER`` (a dotted path) and
+``POST_EMBEDDER_OPTIONS``:
+
+``HashingEmbedder``
+    The default. Feature hashing of words and word pairs: no model and
+    no dependencies, deterministic across processes, and fast enough to
+    embed queries inline. It captures shared vocabulary, not meaning.
+
+``SentenceTransformerEmbedder``
+    A local sentence-transformers model (e.g. ``all-MiniLM-L6-v2``).
+    Needs the optional ``sentence-transformers`` package.
+
+An embedder has a ``name`` that changes whenever its vectors would,
+which keeps indexes built by different embedders apart.
+"""
+
+import re
+import zlib
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_WORD_RE = re.compile(r'[^\W_]{2,}')
+
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of unigrams and bigrams, with sublinear term
+    frequencies.
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f'hashing-{dim}'
+
+    def features(self, text):
+        words = _WORD_RE.findall(text.casefold())
+        return words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self.features(text):
+                digest = zlib.crc32(feature.encode())
+                # The top bit picks the sign, so collisions cancel out on average.
+                key = (digest % self.dim, 1.0 if digest & 0x80000000 else -1.0)
+                counts[key] = counts.get(key, 0) + 1
+            for (column, sign), count in counts.items():
+                vectors[row, column] += sign * (1 + np.log(count))
+        return normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    """
+    Embeddings from a local sentence-transformers model.
+    """
+
+    def __init__(self, model='all-MiniLM-L6-v2', batch_size=64, device=None):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model, device=device)
+        self.batch_size = batch_size
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model.replace('/', '-')}-{self.dim}"
+
+    def embed(self, texts):
+        vectors = self.model.encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=True,
+            convert_to_numpy=True, show_progress_bar=False,
+        )
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+def normalize(vectors):
+    """
+    Scale each row of ``vectors`` to unit length, leaving zero rows.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+@lru_cache(maxsize=None)
+def get_embedder():
+    """
+    Return the embedder configured by ``POST_EMBEDDER``.
+    """
+    embedder_class = import_string(settings.POST_EMBEDDER)
+    return embedder_class(**settings.POST_EMBEDDER_OPTIONS)
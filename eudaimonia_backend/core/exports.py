@@ -0,0 +1,275 @@
+"""
+Eudaimonia Data Exports
+
+Builds a user's data export as a stream of NDJSON records (one JSON
+object per line), compressed with gzip and spooled to a temporary file,
+then uploads it to IPFS in chunks. Rows are read through server-side
+cursors (``QuerySet.iterator``), so memory use stays bounded by the
+chunk size rather than by the size of the account.
+
+Every record carries a ``type`` naming its section, e.g.::
+
+    {"type": "post", "id": "...", "world_id": "...", "content": "..."}
+
+The output is deterministic (rows in primary key order, no timestamps in
+the gzip header or the export header), so an export of unchanged data
+has the same content hash as the previous one and is not uploaded again
+(see core.pinning).
+
+Incremental exports contain only records changed since the previous
+complete export's ``watermark``, so their cost follows new activity
+rather than account age. Their records are cut into gzipped NDJSON
+chunks of ``CHUNK_RECORDS``, each uploaded as its own content-addressed
+object, and the export's CID is a JSON manifest::
+
+    {"type": "export_manifest", "kind": "incremental",
+     "previous": "<CID of the previous export>", "since": "...",
+     "watermark": "...", "chunks": [{"cid": "...", "records": 5000}, ...]}
+
+The chunk CIDs are also recorded as ExportChunk rows, so they can be
+served to the export's owner (see ``IPFSContentView``).
+
+Following ``previous`` back to a full export reconstructs the account;
+a record that appears more than once is superseded by its latest copy.
+Deletions are not recorded, so schedule periodic full exports as well.
+"""
+
+import gzip
+import io
+import json
+import tempfile
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .pinning import BATCH_MAX_BYTES, PinningManager
+from .models import (
+    CommunityMembership, DataExport, ExportChunk, Friendship, Post, Proposal,
+    SmartProfile, VerifiableCredential, Vote
+)
+
+# Rows fetched per round trip from the server-side cursor.
+CURSOR_CHUNK_SIZE = 2000
+
+# Bytes handed to gzip per write.
+WRITE_BUFFER_SIZE = 64 * 1024
+
+EXPORT_FORMAT_VERSION = 2
+
+# Records per content-addressed chunk of an incremental export.
+CHUNK_RECORDS = 5000
+
+# Incremental exports re-read this far behind the previous watermark, so
+# rows saved by transactions that committed after it are not missed.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+def export_sections(user):
+    """
+    Return ``(record type, queryset, fields, changed field)`` for every
+    section of an export. The changed field is the timestamp incremental
+    exports filter on.
+    """
+    return [
+        ('smart_profile', SmartProfile.objects.filter(user=user), [
+            'id', 'name', 'did', 'created_at', 'updated_at',
+        ], 'updated_at'),
+        ('verifiable_credential', VerifiableCredential.objects.filter(profile__user=user), [
+            'id', 'profile_id', 'credential_data', 'issuer_did', 'issued_at', 'updated_at',
+        ], 'updated_at'),
+        ('community_membership', CommunityMembership.objects.filter(profile__user=user), [
+            'id', 'profile_id', 'world_id', 'world__name', 'role', 'reputation',
+            'joined_at', 'updated_at',
+        ], 'updated_at'),
+        ('post', Post.objects.filter(author=user), [
+            'id', 'world_id', 'content', 'created_at', 'updated_at',
+        ], 'updated_at'),
+        ('proposal', Proposal.objects.filter(creator=user), [
+            'id', 'world_id', 'title', 'description', 'created_at', 'updated_at',
+        ], 'updated_at'),
+        ('vote', Vote.objects.filter(voter=user), [
+            'id', 'proposal_id', 'choice', 'created_at', 'updated_at',
+        ], 'updated_at'),
+        ('friendship', Friendship.objects.filter(Q(user1=user) | Q(user2=user)), [
+            'id', 'user1_id', 'user1__username', 'user2_id', 'user2__username',
+            'status', 'created_at', 'updated_at',
+        ], 'updated_at'),
+    ]
+
+
+def iter_section_records(user, since=None):
+    """
+    Yield the records of every section as dicts, limited to rows changed
+    after ``since`` if given.
+    """
+    for record_type, queryset, fields, changed_field in export_sections(user):
+        if since is not None:
+            queryset = queryset.filter(**{f'{changed_field}__gt': since})
+        rows = queryset.order_by('pk').values(*fields).iterator(chunk_size=CURSOR_CHUNK_SIZE)
+        for row in rows:
+            yield {'type': record_type, **row}
+
+
+def iter_export_records(user):
+    """
+    Yield the export's records as dicts, starting with a header record.
+    """
+    yield {
+        'type': 'export',
+        'format_version': EXPORT_FORMAT_VERSION,
+        'user_id': user.pk,
+        'username': user.username,
+    }
+    yield from iter_section_records(user)
+
+
+def iter_chunks(records, size=CHUNK_RECORDS):
+    """
+    Yield ``(gzipped NDJSON bytes, record count)`` for every ``size``
+    records.
+    """
+    records = iter(records)
+    while True:
+        buffer = io.BytesIO()
+        count = write_ndjson(_take(records, size), buffer)
+        if not count:
+            return
+        yield buffer.getvalue(), count
+
+
+def _take(iterator, count):
+    for _ in range(count):
+        try:
+            yield next(iterator)
+        except StopIteration:
+            return
+
+
+def iter_ndjson(records):
+    """
+    Encode records as NDJSON lines (bytes).
+    """
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for record in records:
+        yield encoder.encode(record).encode('utf-8') + b'\n'
+
+
+def write_ndjson(records, fileobj, compress=True):
+    """
+    Write ``records`` to ``fileobj`` as (optionally gzipped) NDJSON.
+
+    Returns the number of records written.
+    """
+    stream = gzip.GzipFile(fileobj=fileobj, mode='wb', mtime=0) if compress else fileobj
+    count = 0
+    buffer = bytearray()
+    try:
+        for line in iter_ndjson(records):
+            buffer += line
+            count += 1
+            if len(buffer) >= WRITE_BUFFER_SIZE:
+                stream.write(buffer)
+                buffer.clear()
+        if buffer:
+            stream.write(buffer)
+    finally:
+        if compress:
+            stream.close()
+    return count
+
+
+def previous_export(export):
+    """
+    The user's latest complete export other than ``export``, or None.
+    """
+    return DataExport.objects.filter(
+        user_id=export.user_id, status='complete', watermark__isnull=False
+    ).exclude(pk=export.pk).order_by('-watermark').first()
+
+
+def run_export(export, ipfs=None, final_attempt=True):
+    """
+    Build ``export``'s data, upload it to IPFS and record the CID.
+
+    Content identical to an earlier upload is not sent again. An
+    incremental export with no earlier complete export to build on is
+    made as a full export.
+
+    ``DataExport.status`` moves from pending to in_progress, then to
+    complete or failed. When the caller will retry (``final_attempt``
+    false), a failure returns the export to pending instead.
+    """
+    export.status = 'in_progress'
+    export.watermark = timezone.now()
+    export.previous = previous_export(export) if export.kind == 'incremental' else None
+    if export.previous is None:
+        export.kind = 'full'
+    export.save(update_fields=['status', 'kind', 'previous', 'watermark', 'updated_at'])
+
+    pins = PinningManager(ipfs)
+    try:
+        if export.kind == 'incremental':
+            cid, chunks = _upload_incremental(export, pins)
+        else:
+            cid, chunks = _upload_full(export, pins), []
+    except Exception:
+        export.status = 'failed' if final_attempt else 'pending'
+        export.save(update_fields=['status', 'updated_at'])
+        raise
+
+    export.ipfs_cid = cid
+    export.status = 'complete'
+    with transaction.atomic():
+        export.save(update_fields=['ipfs_cid', 'status', 'updated_at'])
+        ExportChunk.objects.bulk_create(
+            ExportChunk(export=export, index=index, cid=chunk['cid'])
+            for index, chunk in enumerate(chunks)
+        )
+    return export
+
+
+def _upload_full(export, pins):
+    with tempfile.TemporaryFile() as spool:
+        write_ndjson(iter_export_records(export.user), spool)
+        spool.seek(0)
+        return pins.add_stream(spool)
+
+
+def _upload_incremental(export, pins):
+    since = export.previous.watermark - WATERMARK_OVERLAP
+    chunks = []
+    pending, pending_bytes = [], 0
+
+    def flush():
+        cids = pins.add_many([content for content, _ in pending])
+        chunks.extend(
+            {'cid': cid, 'records': count, 'bytes': len(content)}
+            for cid, (content, count) in zip(cids, pending)
+        )
+        pending.clear()
+
+    for content, count in iter_chunks(iter_section_records(export.user, since)):
+        pending.append((content, count))
+        pending_bytes += len(content)
+        if pending_bytes >= BATCH_MAX_BYTES:
+            flush()
+            pending_bytes = 0
+    if pending:
+        flush()
+
+    manifest = {
+        'type': 'export_manifest',
+        'format_version': EXPORT_FORMAT_VERSION,
+        'kind': 'incremental',
+        'user_id': export.user.pk,
+        'username': export.user.username,
+        'previous': export.previous.ipfs_cid,
+        'since': since,
+        'watermark': export.watermark,
+        'chunks': chunks,
+    }
+    encoded = json.dumps(manifest, cls=DjangoJSONEncoder, sort_keys=True, indent=1)
+    return pins.add_bytes(encoded.encode('utf-8')), chunks
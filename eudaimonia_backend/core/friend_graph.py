@@ -0,0 +1,128 @@
+"""
+Eudaimonia Friendship Graph
+
+Accepted friendships are mirrored into ``FriendshipEdge`` as two
+directed rows, giving the social graph a canonical adjacency index:
+"friends of X" is ``edges WHERE user = X``. The helpers below answer
+friend lists, mutual-friend counts and friend-of-friend queries from
+that index with a single query each.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Friendship, FriendshipEdge
+
+User = get_user_model()
+
+
+def _add_edges(friendship):
+    FriendshipEdge.objects.bulk_create([
+        FriendshipEdge(
+            user_id=friendship.user1_id, friend_id=friendship.user2_id,
+            friendship=friendship, created_at=friendship.updated_at
+        ),
+        FriendshipEdge(
+            user_id=friendship.user2_id, friend_id=friendship.user1_id,
+            friendship=friendship, created_at=friendship.updated_at
+        ),
+    ], ignore_conflicts=True)
+
+
+def _restore_pair_edges(friendship):
+    """
+    Re-add the pair's edges from another accepted Friendship between the
+    same users (one in the other direction), if there is one.
+    """
+    remaining = Friendship.objects.filter(
+        Q(user1_id=friendship.user1_id, user2_id=friendship.user2_id)
+        | Q(user1_id=friendship.user2_id, user2_id=friendship.user1_id),
+        status='accepted'
+    ).exclude(pk=friendship.pk).first()
+    if remaining is not None:
+        _add_edges(remaining)
+
+
+@receiver(post_save, sender=Friendship)
+def sync_friendship_edges(sender, instance, raw=False, **kwargs):
+    """
+    Keep the adjacency index in step with a Friendship's status.
+
+    A pair has one set of edges even if both users sent a request and
+    both were accepted; the edges belong to whichever row was accepted
+    first, and move to the other row when that one stops counting.
+    """
+    if raw:
+        return
+    with transaction.atomic():
+        if instance.status == 'accepted':
+            _add_edges(instance)
+        elif FriendshipEdge.objects.filter(friendship=instance).delete()[0]:
+            _restore_pair_edges(instance)
+
+
+@receiver(post_delete, sender=Friendship)
+def friendship_deleted(sender, instance, **kwargs):
+    """
+    Deleting a Friendship removes its edges through the foreign key;
+    restore them from the pair's other accepted Friendship, if any.
+    """
+    if instance.status == 'accepted':
+        _restore_pair_edges(instance)
+
+
+def friend_ids(user):
+    """
+    Subquery-ready queryset of the ids of ``user``'s friends.
+    """
+    return FriendshipEdge.objects.filter(user=user).values('friend')
+
+
+def friend_edges(user):
+    """
+    Edges from ``user`` to each friend, with the friend row joined in.
+    """
+    return FriendshipEdge.objects.filter(user=user).select_related('friend')
+
+
+def mutual_friend_edges(user, other):
+    """
+    Edges from ``other`` to friends they share with ``user``.
+    """
+    return friend_edges(other).filter(friend__in=friend_ids(user))
+
+
+def mutual_friend_count(user, other):
+    return mutual_friend_edges(user, other).count()
+
+
+def mutual_friend_counts(user, others):
+    """
+    Map each user id in ``others`` to its number of mutual friends with
+    ``user``, in one grouped query. Users with none are omitted.
+    """
+    rows = FriendshipEdge.objects.filter(
+        user__in=others,
+        friend__in=friend_ids(user)
+    ).values('user').annotate(mutual=Count('friend')).values_list('user', 'mutual')
+    return dict(rows)
+
+
+def friends_of_friends(user):
+    """
+    Users two hops from ``user`` who are not already their friends,
+    annotated with ``mutual_friends`` and ordered by it, descending.
+    """
+    friends = friend_ids(user)
+    return User.objects.filter(
+        friend_edges__friend__in=friends
+    ).exclude(
+        pk=user.pk
+    ).exclude(
+        pk__in=friends
+    ).annotate(
+        mutual_friends=Count('friend_edges')
+    ).order_by('-mutual_friends', 'pk')
@@ -0,0 +1,237 @@
+"""
+Eudaimonia Async IPFS Service
+
+An asyncio counterpart to ``IPFSService`` for async views and workers.
+It talks to the node's HTTP API (``/api/v0``) directly through one
+shared ``httpx.AsyncClient``, so many transfers can run concurrently on
+a single event loop over a bounded set of keep-alive connections.
+
+Content is streamed in both directions: ``add_stream`` sends the
+multipart body chunk by chunk from bytes, a file object or an async
+iterable, and ``cat`` is an async iterator over the response body::
+
+    ipfs = get_async_service()
+    cid = await ipfs.add_stream(upload)
+    async for chunk in ipfs.cat(cid):
+        ...
+"""
+
+import asyncio
+import json
+import uuid
+import weakref
+from contextlib import asynccontextmanager
+from urllib.parse import quote
+
+import httpx
+from django.conf import settings
+
+from .ipfs_cache import get_cache, is_cid
+from .ipfs_service import IPFSError
+
+# Bytes per chunk sent to or read from the node.
+CHUNK_SIZE = 64 * 1024
+
+
+def api_url(api_addr):
+    """
+    Turn an IPFS API multiaddr (e.g. ``/dns/ipfs/tcp/5001/http``) into a
+    base URL. Plain http(s) URLs are returned unchanged.
+    """
+    if api_addr.startswith(('http://', 'https://')):
+        return api_addr.rstrip('/')
+    parts = api_addr.strip('/').split('/')
+    if len(parts) < 4 or parts[0] not in ('ip4', 'ip6', 'dns', 'dns4', 'dns6') or parts[2] != 'tcp':
+        raise IPFSError(f"Unsupported IPFS API address: {api_addr}")
+    host, port = parts[1], parts[3]
+    if parts[0] == 'ip6':
+        host = f'[{host}]'
+    scheme = parts[4] if len(parts) > 4 and parts[4] in ('http', 'https') else 'http'
+    return f'{scheme}://{host}:{port}'
+
+
+async def _iter_source(source, chunk_size):
+    """
+    Yield ``source`` in chunks of at most ``chunk_size`` bytes.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+    elif hasattr(source, '__aiter__'):
+        async for chunk in source:
+            yield chunk
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = await asyncio.to_thread(source.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for chunk in source:
+            yield chunk
+
+
+async def _multipart(source, filename, boundary, chunk_size):
+    yield (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{quote(filename)}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode()
+    async for chunk in _iter_source(source, chunk_size):
+        yield chunk
+    yield f'\r\n--{boundary}--\r\n'.encode()
+
+
+class AsyncIPFSService:
+    """
+    Async IPFS HTTP API client. Use one instance per event loop (see
+    ``get_async_service``) or as an async context manager.
+    """
+
+    def __init__(self, api_addr=None, *, client=None, cache=None, chunk_size=CHUNK_SIZE):
+        api_addr = api_addr or getattr(settings, 'IPFS_API_ADDR', None)
+        if not api_addr:
+            raise IPFSError("IPFS_API_ADDR is not set in the environment.")
+        self.base_url = api_url(api_addr) + '/api/v0'
+        self.chunk_size = chunk_size
+        self._cache = cache if cache is not None else get_cache()
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                settings.IPFS_READ_TIMEOUT, connect=settings.IPFS_CONNECT_TIMEOUT,
+                pool=settings.IPFS_ACQUIRE_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.IPFS_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.IPFS_ASYNC_MAX_CONNECTIONS,
+            ),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._owns_client:
+            await self._client.aclose()
+
+    @asynccontextmanager
+    async def _stream(self, command, params=None, **kwargs):
+        """
+        POST an API command and yield the streaming response.
+        """
+        url = f'{self.base_url}/{command}'
+        try:
+            async with self._client.stream('POST', url, params=params, **kwargs) as response:
+                if response.status_code >= 400:
+                    body = await response.aread()
+                    raise IPFSError(f"IPFS {command} failed: {_error_message(body, response)}")
+                yield response
+        except httpx.HTTPError as e:
+            raise IPFSError(f"IPFS {command} failed: {e}") from e
+
+    async def add_stream(self, source, filename='file', pin=True):
+        """
+        Add ``source`` (bytes, a file object or an async iterable of bytes)
+        to IPFS, streaming it in chunks. Returns the CID.
+        """
+        boundary = uuid.uuid4().hex
+        body = _multipart(source, filename, boundary, self.chunk_size)
+        headers = {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+        params = {'pin': 'true' if pin else 'false', 'progress': 'false'}
+        async with self._stream('add', params, content=body, headers=headers) as response:
+            body = await response.aread()
+        lines = [line for line in body.splitlines() if line.strip()]
+        if not lines:
+            raise IPFSError("IPFS add returned no result.")
+        return json.loads(lines[-1])['Hash']
+
+    async def add_bytes(self, data, pin=True):
+        return await self.add_stream(data, pin=pin)
+
+    async def cat(self, cid, offset=0, length=None):
+        """
+        Async iterator over the content behind ``cid``, from ``offset``
+        for ``length`` bytes (to the end if None).
+        """
+        if self._cache is not None and is_cid(cid):
+            # Opening verifies the entry on first use (hashing the whole
+            # file), so it runs on a worker thread, off the event loop.
+            cached = self._cache.open(cid)
+            buffer = await asyncio.to_thread(cached.__enter__)
+            try:
+                if buffer is not None:
+                    end = len(buffer) if length is None else min(offset + length, len(buffer))
+                    for start in range(offset, end, self.chunk_size):
+                        yield bytes(buffer[start:min(start + self.chunk_size, end)])
+                    return
+            finally:
+                await asyncio.to_thread(cached.__exit__, None, None, None)
+
+        params = {'arg': cid}
+        if offset:
+            params['offset'] = offset
+        if length is not None:
+            params['length'] = length
+        async with self._stream('cat', params) as response:
+            async for chunk in response.aiter_bytes(self.chunk_size):
+                yield chunk
+
+    async def get_file(self, cid):
+        """
+        Return the content behind ``cid`` as bytes, through the local
+        content cache.
+        """
+        cacheable = self._cache is not None and is_cid(cid)
+        if cacheable:
+            content = await asyncio.to_thread(self._cache.get, cid)
+            if content is not None:
+                return content
+        content = b''.join([chunk async for chunk in self.cat(cid)])
+        if cacheable:
+            await asyncio.to_thread(self._cache.put, cid, content)
+        return content
+
+    async def stat_size(self, cid):
+        """
+        Return the size in bytes of the content behind ``cid``.
+        """
+        if self._cache is not None and is_cid(cid):
+            size = await asyncio.to_thread(self._cache.size_of, cid)
+            if size is not None:
+                return size
+        async with self._stream('files/stat', {'arg': f'/ipfs/{cid}'}) as response:
+            body = await response.aread()
+        return json.loads(body)['Size']
+
+    async def is_healthy(self):
+        try:
+            async with self._stream('id') as response:
+                await response.aread()
+        except IPFSError:
+            return False
+        return True
+
+
+def _error_message(body, response):
+    try:
+        return json.loads(body)['Message']
+    except (ValueError, KeyError, TypeError):
+        return f'HTTP {response.status_code}'
+
+
+_services = weakref.WeakKeyDictionary()
+
+
+def get_async_service():
+    """
+    Return the AsyncIPFSService shared by the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    service = _services.get(loop)
+    if service is None:
+        service = _services[loop] = AsyncIPFSService()
+    return service
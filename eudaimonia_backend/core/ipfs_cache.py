@@ -0,0 +1,286 @@
+"""
+Eudaimonia IPFS Content Cache
+
+On-disk cache of IPFS objects keyed by CID. Content behind a CID never
+changes, so a cached copy never goes stale and can be served without
+asking the node again.
+
+Each object is stored as ``<dir>/<cid[-2:]>/<cid>`` next to a
+``<cid>.sha256`` sidecar holding the digest of the bytes as written.
+Entries are checked against the sidecar when first read by a process,
+so a file corrupted or truncated on disk is dropped and refetched. This
+is corruption detection only: the digest is not the CID (a UnixFS CID
+hashes the DAG, not the raw bytes), so content that never matched its
+CID is not caught. Writes go through a temporary file and
+``os.replace``, so readers never see a partial object, and several
+processes may share one directory.
+
+The cache is bounded by ``max_bytes``. Reads touch an entry's mtime.
+Each process keeps a running total of the cache size, taken from one
+directory scan and updated by its own writes and removals; when a write
+takes it over the limit, the directory is scanned again and the least
+recently used entries are removed, down to ``EVICT_TO`` of the limit.
+Writes by other processes are only counted from that next scan, so with
+several writers the limit is approximate.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Objects at least this large are read through mmap rather than read().
+MMAP_THRESHOLD = 1024 * 1024
+
+# Bytes read per step when hashing a stream.
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# CIDv0 (base58btc, "Qm...") or CIDv1 in a multibase string alphabet.
+CID_PATTERN = re.compile(r'^(Qm[1-9A-HJ-NP-Za-km-z]{44}|[bBfFkKzZ][0-9A-Za-z]{8,127})$')
+
+SIDECAR_SUFFIX = '.sha256'
+
+# Eviction frees space down to this fraction of ``max_bytes``, so a full
+# cache is not scanned again on every write.
+EVICT_TO = 0.9
+
+
+def is_cid(value):
+    return bool(CID_PATTERN.match(value or ''))
+
+
+class CIDCache:
+    """
+    Size-bounded LRU cache of immutable IPFS objects on local disk.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self._verified = {}
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        # Bytes in the cache as far as this process knows; None until scanned.
+        self._size = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, cid):
+        if not is_cid(cid):
+            raise ValueError(f"Not a CID: {cid!r}")
+        return os.path.join(self.directory, cid[-2:], cid)
+
+    def _read_digest(self, path):
+        try:
+            with open(path + SIDECAR_SUFFIX) as sidecar:
+                return sidecar.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            size = 0
+        self._remove_file(path)
+        self._grow(-size)
+
+    def _grow(self, delta):
+        with self._lock:
+            if self._size is not None:
+                self._size = max(self._size + delta, 0)
+
+    def _verify(self, path, fileobj):
+        """
+        Check the entry against its sidecar digest once per process and
+        file version. Returns False (after removing it) if it was
+        corrupted on disk.
+        """
+        stat = os.fstat(fileobj.fileno())
+        key = (stat.st_ino, stat.st_size)
+        if self._verified.get(path) == key:
+            return True
+
+        expected = self._read_digest(path)
+        if expected is None:
+            self._remove(path)
+            return False
+        digest = hashlib.sha256()
+        fileobj.seek(0)
+        for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        fileobj.seek(0)
+        if digest.hexdigest() != expected:
+            self._remove(path)
+            return False
+        self._verified[path] = key
+        return True
+
+    @contextmanager
+    def open(self, cid):
+        """
+        Yield a read-only buffer of the cached object, or None on a miss.
+
+        Large objects are memory-mapped, so slicing the buffer reads only
+        the pages touched. The buffer is only valid inside the block.
+        """
+        path = self._path(cid)
+        try:
+            fileobj = open(path, 'rb')
+        except FileNotFoundError:
+            yield None
+            return
+
+        with fileobj:
+            if not self._verify(path, fileobj):
+                yield None
+                return
+            self._touch(path)
+            if os.fstat(fileobj.fileno()).st_size < MMAP_THRESHOLD:
+                yield memoryview(fileobj.read())
+                return
+            with mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def get(self, cid):
+        """
+        Return the cached object as bytes, or None on a miss.
+        """
+        with self.open(cid) as buffer:
+            return None if buffer is None else bytes(buffer)
+
+    def get_range(self, cid, start, end=None):
+        """
+        Return bytes ``[start, end)`` of the cached object, or None on a
+        miss. ``end`` of None reads to the end of the object.
+        """
+        with self.open(cid) as buffer:
+            if buffer is None:
+                return None
+            return bytes(buffer[start:end])
+
+    def size_of(self, cid):
+        try:
+            return os.path.getsize(self._path(cid))
+        except FileNotFoundError:
+            return None
+
+    def __contains__(self, cid):
+        return is_cid(cid) and os.path.exists(self._path(cid))
+
+    def put(self, cid, data):
+        """
+        Store ``data`` (bytes) under ``cid``.
+        """
+        path = self._path(cid)
+        if len(data) > self.max_bytes:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        previous = self.size_of(cid) or 0
+        self._write_atomic(path + SIDECAR_SUFFIX, hashlib.sha256(data).hexdigest().encode())
+        self._write_atomic(path, data)
+        self._verified.pop(path, None)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += len(data) - previous
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith('.') or entry.name.endswith(SIDECAR_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        """
+        Scan the cache and, if it exceeds ``max_bytes``, remove least
+        recently used entries until it fits ``EVICT_TO`` of that.
+        Returns the number of bytes freed.
+        """
+        with self._evict_lock:
+            entries = list(self._entries())
+            total = sum(size for _, size, _ in entries)
+            freed = 0
+            if total > self.max_bytes:
+                target = self.max_bytes * EVICT_TO
+                entries.sort(key=lambda entry: entry[2])
+                for path, size, _ in entries:
+                    if total - freed <= target:
+                        break
+                    self._remove_file(path)
+                    freed += size
+            with self._lock:
+                self._size = total - freed
+            return freed
+
+    def _remove_file(self, path):
+        # _remove without the size bookkeeping, for evict's own total.
+        for name in (path, path + SIDECAR_SUFFIX):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+        self._verified.pop(path, None)
+
+    def clear(self):
+        for path, _, _ in list(self._entries()):
+            self._remove_file(path)
+        with self._lock:
+            self._size = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the process-wide CIDCache, or None if IPFS_CACHE_DIR is unset.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            directory = getattr(settings, 'IPFS_CACHE_DIR', None)
+            if not directory:
+                return None
+            _cache = CIDCache(directory, settings.IPFS_CACHE_MAX_BYTES)
+        return _cache
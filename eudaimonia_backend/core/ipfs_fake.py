@@ -0,0 +1,347 @@
+"""
+Eudaimonia Fake IPFS Node
+
+A small in-memory stand-in for the IPFS HTTP API, for exercising
+``IPFSService`` and ``AsyncIPFSService`` without a daemon. It serves
+the subset of ``/api/v0`` the services use (add, cat, files/stat,
+pin add/rm/ls, id, version) from a background thread::
+
+    with FakeIPFSNode(latency=0.02, failure_rate=0.05) as node:
+        with override_settings(IPFS_API_ADDR=node.api_addr):
+            ...
+
+Content is addressed by a CIDv1 (raw codec, sha256), so the same bytes
+always get the same CID. These are not the CIDs a real node would give
+for UnixFS content.
+
+Slow or unreliable nodes can be simulated: ``latency`` delays every
+response, ``bandwidth`` throttles request and response bodies, and
+failures are injected at random (``failure_rate``, seeded for
+repeatability) or on demand with ``fail_next``. A failure is either an
+API error (HTTP 500) or, with ``failure_mode='disconnect'``, a
+connection dropped before any response.
+"""
+
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Version reported to clients; ipfshttpclient refuses nodes outside 0.5-0.9.
+NODE_VERSION = '0.8.0'
+
+# Bytes per write when streaming cat responses.
+CHUNK_SIZE = 64 * 1024
+
+
+def make_cid(data):
+    """
+    CIDv1, raw codec, sha256 multihash, base32 multibase.
+    """
+    digest = hashlib.sha256(data).digest()
+    encoded = base64.b32encode(b'\x01\x55\x12\x20' + digest).decode('ascii')
+    return 'b' + encoded.rstrip('=').lower()
+
+
+def _flag(params, name, default):
+    # The node parses booleans like Go's strconv.ParseBool ("true", "True", "1").
+    value = params.get(name)
+    return default if value is None else value.lower() in ('1', 't', 'true')
+
+
+def parse_multipart(body, boundary):
+    """
+    Yield ``(headers, content)`` for each part of a multipart body.
+    """
+    delimiter = b'--' + boundary
+    for part in body.split(delimiter)[1:]:
+        if part.startswith(b'--'):
+            break
+        part = part[2:] if part.startswith(b'\r\n') else part
+        head, _, content = part.partition(b'\r\n\r\n')
+        if content.endswith(b'\r\n'):
+            content = content[:-2]
+        headers = {}
+        for line in head.decode('latin-1').split('\r\n'):
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        yield headers, content
+
+
+class FakeIPFSNode:
+    """
+    In-memory IPFS HTTP API server running on a background thread.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, *, latency=0.0, bandwidth=None,
+                 failure_rate=0.0, failure_mode='error', seed=0):
+        self.objects = {}
+        self.directories = {}
+        self.pins = set()
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.failure_rate = failure_rate
+        self.failure_mode = failure_mode
+        self.requests = Counter()
+        self.failures = Counter()
+        self.lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._forced_failures = []
+        self.server = ThreadingHTTPServer((host, port), _handler_for(self))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def api_addr(self):
+        host, port = self.server.server_address[:2]
+        return f'/ip4/{host}/tcp/{port}/http'
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def add(self, data, pin=False):
+        cid = make_cid(data)
+        with self.lock:
+            self.objects[cid] = bytes(data)
+            if pin:
+                self.pins.add(cid)
+        return cid
+
+    def add_directory(self, entries, pin=False):
+        listing = json.dumps(sorted(entries.items())).encode()
+        cid = make_cid(b'dir:' + listing)
+        with self.lock:
+            self.directories[cid] = dict(entries)
+            if pin:
+                self.pins.add(cid)
+        return cid
+
+    def fail_next(self, count=1, command=None, mode=None):
+        """
+        Make the next ``count`` requests (for ``command`` only, if given)
+        fail with ``mode`` (default ``failure_mode``).
+        """
+        with self.lock:
+            self._forced_failures.extend([(command, mode or self.failure_mode)] * count)
+
+    def should_fail(self, command):
+        """
+        Return the failure mode to apply to this request, or None.
+        """
+        with self.lock:
+            self.requests[command] += 1
+            mode = None
+            for index, (target, forced_mode) in enumerate(self._forced_failures):
+                if target in (None, command):
+                    del self._forced_failures[index]
+                    mode = forced_mode
+                    break
+            if mode is None and self.failure_rate and self._random.random() < self.failure_rate:
+                mode = self.failure_mode
+            if mode is not None:
+                self.failures[command] += 1
+            return mode
+
+    def throttle(self, size):
+        if self.bandwidth:
+            time.sleep(size / self.bandwidth)
+
+    def reset(self):
+        with self.lock:
+            self.objects.clear()
+            self.directories.clear()
+            self.pins.clear()
+            self.requests.clear()
+            self.failures.clear()
+            self._forced_failures.clear()
+
+
+def _handler_for(node):
+    class Handler(_FakeIPFSHandler):
+        pass
+    Handler.node = node
+    return Handler
+
+
+class _FakeIPFSHandler(BaseHTTPRequestHandler):
+    node = None
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        command = url.path.removeprefix('/api/v0/')
+        body = self._read_body()
+        self.node.throttle(len(body))
+
+        failure = self.node.should_fail(command)
+        if self.node.latency:
+            time.sleep(self.node.latency)
+        if failure == 'disconnect':
+            self.close_connection = True
+            self.connection.close()
+            return
+        if failure is not None:
+            self.send_error_json(500, f'injected failure in "{command}"')
+            return
+
+        handler = getattr(self, 'api_' + command.replace('/', '_'), None)
+        if handler is None:
+            self.send_error_json(404, f'unknown command "{command}"')
+            return
+        handler(params, body)
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b''.join(chunks)
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def send_json(self, payload, status=200):
+        self.send_lines([payload], status)
+
+    def send_lines(self, payloads, status=200):
+        body = b''.join(json.dumps(payload).encode() + b'\n' for payload in payloads)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json({'Message': message, 'Code': 0, 'Type': 'error'}, status)
+
+    def api_version(self, params, body):
+        self.send_json({'Version': NODE_VERSION, 'Commit': '', 'Repo': '10', 'System': 'fake', 'Golang': ''})
+
+    def api_id(self, params, body):
+        self.send_json({'ID': 'fake-node', 'Addresses': [], 'AgentVersion': f'fake/{NODE_VERSION}'})
+
+    def api_add(self, params, body):
+        content_type = self.headers.get('Content-Type', '')
+        _, _, boundary = content_type.partition('boundary=')
+        if not boundary:
+            self.send_error_json(400, 'expected a multipart body')
+            return
+
+        # Like a real node, a wrapped add pins only the directory root.
+        pin = _flag(params, 'pin', True)
+        wrap = _flag(params, 'wrap-with-directory', False)
+        results = []
+        for headers, content in parse_multipart(body, boundary.strip('"').encode()):
+            if headers.get('content-type') == 'application/x-directory':
+                continue
+            disposition = headers.get('content-disposition', '')
+            _, _, filename = disposition.partition('filename="')
+            name = filename.rstrip('"') or 'file'
+            cid = self.node.add(content, pin=pin and not wrap)
+            results.append({'Name': name, 'Hash': cid, 'Size': str(len(content))})
+
+        if wrap:
+            entries = {result['Name']: result['Hash'] for result in results}
+            results.append({'Name': '', 'Hash': self.node.add_directory(entries, pin=pin), 'Size': '0'})
+        self.send_lines(results)
+
+    def api_cat(self, params, body):
+        cid = params.get('arg', '').removeprefix('/ipfs/')
+        if cid in self.node.directories:
+            self.send_error_json(500, 'this dag node is a directory')
+            return
+        data = self.node.objects.get(cid)
+        if data is None:
+            self.send_error_json(500, f'block {cid} not found')
+            return
+
+        offset = int(params.get('offset', 0))
+        length = params.get('length')
+        end = len(data) if length is None else min(offset + int(length), len(data))
+        view = memoryview(data)[offset:end]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(view)))
+        self.end_headers()
+        for start in range(0, len(view), CHUNK_SIZE):
+            chunk = view[start:start + CHUNK_SIZE]
+            self.node.throttle(len(chunk))
+            self.wfile.write(chunk)
+
+    def api_files_stat(self, params, body):
+        cid = params.get('arg', '').removeprefix('/ipfs/')
+        data = self.node.objects.get(cid)
+        if data is None:
+            self.send_error_json(500, f'block {cid} not found')
+            return
+        self.send_json({'Hash': cid, 'Size': len(data), 'CumulativeSize': len(data), 'Type': 'file'})
+
+    def _args(self):
+        url = urlsplit(self.path)
+        return [value.removeprefix('/ipfs/') for value in parse_qs(url.query).get('arg', [])]
+
+    def api_pin_add(self, params, body):
+        cids = self._args()
+        for cid in cids:
+            if cid not in self.node.objects and cid not in self.node.directories:
+                self.send_error_json(500, f'pin: block {cid} not found')
+                return
+        with self.node.lock:
+            self.node.pins.update(cids)
+        self.send_json({'Pins': cids})
+
+    def api_pin_rm(self, params, body):
+        cids = self._args()
+        for cid in cids:
+            if cid not in self.node.pins:
+                self.send_error_json(500, 'not pinned or pinned indirectly')
+                return
+        with self.node.lock:
+            self.node.pins.difference_update(cids)
+        self.send_json({'Pins': cids})
+
+    def api_pin_ls(self, params, body):
+        cids = self._args()
+        with self.node.lock:
+            pinned = sorted(self.node.pins)
+        if cids:
+            missing = [cid for cid in cids if cid not in pinned]
+            if missing:
+                self.send_error_json(500, f'path \'{missing[0]}\' is not pinned')
+                return
+            pinned = cids
+        self.send_json({'Keys': {cid: {'Type': 'recursive'} for cid in pinned}})
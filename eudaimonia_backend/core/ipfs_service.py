@@ -1,31 +1,274 @@
+import io
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
 import ipfshttpclient
-from decouple import config
+from django.conf import settings
 
-class IPFSService:
-    def __init__(self):
-        api_addr = config('IPFS_API_ADDR', default=None)
-        if not api_addr:
-            raise Exception("IPFS_API_ADDR is not set in the environment.")
+from .ipfs_cache import get_cache, is_cid
+
+
+class IPFSError(Exception):
+    """
+    Raised when the IPFS node is unreachable, slow or returns an error.
+    """
+
+
+class IPFSClientPool:
+    """
+    Process-wide pool of keep-alive IPFS HTTP client sessions.
+
+    Connecting to the node costs a version handshake and a TCP setup, so
+    clients are reused across calls instead of opened per request. At
+    most ``size`` calls talk to the node at once; further callers wait up
+    to ``acquire_timeout`` seconds for a free client. Clients idle for
+    longer than ``health_check_interval`` are probed before reuse and
+    replaced if the node no longer answers.
+    """
+
+    def __init__(self, api_addr, size=4, connect_timeout=5.0, read_timeout=60.0,
+                 acquire_timeout=30.0, health_check_interval=30.0):
+        self.api_addr = api_addr
+        self.size = size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._reset()
 
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _connect(self):
         try:
-            self._client = ipfshttpclient.connect(api_addr)
+            return ipfshttpclient.connect(
+                self.api_addr,
+                session=True,
+                timeout=(self.connect_timeout, self.read_timeout)
+            )
         except Exception as e:
-            raise Exception(f"Failed to connect to IPFS node: {e}")
+            raise IPFSError(f"Failed to connect to IPFS node: {e}") from e
+
+    def _checkout(self):
+        try:
+            client, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+        if time.monotonic() - last_used > self.health_check_interval:
+            try:
+                client.id()
+            except Exception:
+                self._discard(client)
+                return self._connect()
+        return client
+
+    def _discard(self, client):
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def client(self):
+        """
+        Borrow a connected client for the duration of the block.
+        """
+        if os.getpid() != self._pid:
+            # Sessions must not be shared with a parent process after fork.
+            self._reset()
+
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise IPFSError("Timed out waiting for a free IPFS connection.")
+        try:
+            client = self._checkout()
+            try:
+                yield client
+            except ipfshttpclient.exceptions.Error as e:
+                self._discard(client)
+                raise IPFSError(f"IPFS request failed: {e}") from e
+            except BaseException:
+                self._discard(client)
+                raise
+            else:
+                self._idle.put((client, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def check_health(self):
+        """
+        Return True if the node answers an identity request.
+        """
+        try:
+            with self.client() as client:
+                client.id()
+        except IPFSError:
+            return False
+        return True
+
+    def close(self):
+        while True:
+            try:
+                client, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(client)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return the process-wide IPFSClientPool, creating it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            api_addr = getattr(settings, 'IPFS_API_ADDR', None)
+            if not api_addr:
+                raise IPFSError("IPFS_API_ADDR is not set in the environment.")
+            _pool = IPFSClientPool(
+                api_addr,
+                size=settings.IPFS_POOL_SIZE,
+                connect_timeout=settings.IPFS_CONNECT_TIMEOUT,
+                read_timeout=settings.IPFS_READ_TIMEOUT,
+                acquire_timeout=settings.IPFS_ACQUIRE_TIMEOUT,
+                health_check_interval=settings.IPFS_HEALTH_CHECK_INTERVAL,
+            )
+        return _pool
+
+
+class _Reader:
+    def __init__(self, read):
+        self.read = read
+
+
+class IPFSService:
+    def __init__(self, pool=None, cache=None):
+        self._pool = pool or get_pool()
+        self._cache = cache if cache is not None else get_cache()
+
+    def _cacheable(self, cid):
+        return self._cache is not None and is_cid(cid)
 
     def add_file(self, file_content):
         """
         Adds a file (bytes) to IPFS.
         Returns the IPFS CID.
         """
-        res = self._client.add_bytes(file_content, wrap_with_directory=True)
+        with self._pool.client() as client:
+            return client.add_bytes(file_content)
+
+    def add_stream(self, fileobj):
+        """
+        Adds a file-like object to IPFS, streaming it to the node in
+        chunks rather than reading it into memory.
+        Returns the IPFS CID.
+        """
+        if not isinstance(getattr(fileobj, 'name', ''), str):
+            # ipfshttpclient takes the upload's filename from ``name``, which
+            # is a descriptor number for anonymous temporary files.
+            fileobj = _Reader(fileobj.read)
+        with self._pool.client() as client:
+            res = client.add(fileobj)
         return res['Hash']
 
+    def add_directory(self, files):
+        """
+        Adds several files to IPFS in one request, wrapped in a directory.
+        ``files`` maps file names to bytes.
+        Returns ``(directory CID, {name: CID})``.
+        """
+        named = []
+        for name, content in files.items():
+            fileobj = io.BytesIO(content)
+            fileobj.name = name
+            named.append(fileobj)
+        with self._pool.client() as client:
+            results = client.add(*named, wrap_with_directory=True)
+        if isinstance(results, dict):
+            results = [results]
+        cids = {result['Name']: result['Hash'] for result in results}
+        return cids.pop(''), cids
+
+    def pin(self, *cids):
+        with self._pool.client() as client:
+            client.pin.add(*cids)
+
+    def unpin(self, *cids):
+        with self._pool.client() as client:
+            client.pin.rm(*cids)
+
+    def pinned(self):
+        """
+        Returns the set of CIDs pinned recursively on the node.
+        """
+        with self._pool.client() as client:
+            return set(client.pin.ls(type='recursive')['Keys'])
+
     def get_file(self, cid):
         """
         Retrieves a file from IPFS by its CID.
         Returns the file content as bytes.
+
+        Served from the local content cache when possible; fetched objects
+        are added to it.
+        """
+        if self._cacheable(cid):
+            content = self._cache.get(cid)
+            if content is not None:
+                return content
+        with self._pool.client() as client:
+            content = client.cat(cid)
+        if self._cacheable(cid):
+            self._cache.put(cid, content)
+        return content
+
+    def get_range(self, cid, start, end=None):
+        """
+        Retrieves bytes ``[start, end)`` of a file by its CID.
+
+        Objects too large for the local cache are read from the node with
+        an offset and length instead of being fetched whole.
         """
-        return self._client.cat(cid)
+        if self._cacheable(cid):
+            content = self._cache.get_range(cid, start, end)
+            if content is not None:
+                return content
+            size = self.stat_size(cid)
+            if size <= self._cache.max_bytes:
+                return self.get_file(cid)[start:end]
+        kwargs = {'offset': start}
+        if end is not None:
+            kwargs['length'] = max(end - start, 0)
+        with self._pool.client() as client:
+            return client.cat(cid, **kwargs)
+
+    def stat_size(self, cid):
+        """
+        Returns the size in bytes of the file behind a CID.
+        """
+        if self._cacheable(cid):
+            size = self._cache.size_of(cid)
+            if size is not None:
+                return size
+        with self._pool.client() as client:
+            return client.files.stat(f'/ipfs/{cid}')['Size']
+
+    def is_healthy(self):
+        """
+        Returns True if the IPFS node is reachable.
+        """
+        return self._pool.check_health()
 
     def close(self):
-        self._client.close()
+        """
+        Kept for compatibility; pooled connections stay open for reuse.
+        """
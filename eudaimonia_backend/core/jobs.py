@@ -0,0 +1,216 @@
+"""
+Eudaimonia Background Jobs
+
+A small job queue stored in the application database, so heavy work
+(data exports, IPFS uploads, batch recomputation) can leave the request
+cycle without an external broker.
+
+Tasks are plain functions registered with ``@task`` and called with the
+job's JSON payload as keyword arguments::
+
+    @task('core.process_data_export', queue='exports', concurrency=2)
+    def process_data_export(export_id):
+        ...
+
+    enqueue('core.process_data_export', {'export_id': str(export.id)})
+
+Workers (``manage.py run_jobs``) claim jobs highest priority first with
+a conditional UPDATE, which is safe across processes and hosts. A
+claimed job is invisible to other workers until its visibility timeout
+lapses, so work held by a crashed worker is picked up again. Failures
+are retried with exponential backoff until ``max_attempts`` is reached.
+A task's ``concurrency`` caps how many of its jobs run at once across
+all workers (best effort: two workers racing may briefly exceed it).
+"""
+
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# How many claimable jobs a worker considers per poll.
+CLAIM_CANDIDATES = 10
+
+
+class UnknownTask(LookupError):
+    """
+    Raised when enqueueing a task name that was never registered.
+    """
+
+
+@dataclass(frozen=True)
+class TaskSpec:
+    name: str
+    func: object
+    queue: str = 'default'
+    max_attempts: int = 5
+    retry_backoff: int = 30
+    visibility_timeout: int = 300
+    concurrency: int = None
+    on_failure: object = None
+
+
+registry = {}
+
+
+def task(name, *, queue='default', max_attempts=5, retry_backoff=30,
+         visibility_timeout=300, concurrency=None, on_failure=None):
+    """
+    Register ``func`` as a background task.
+
+    ``retry_backoff`` is the base delay in seconds, doubled after each
+    failed attempt. ``visibility_timeout`` is how long a worker may hold
+    the job before it is considered lost. ``on_failure`` is called with
+    the job's payload once the job has failed for good.
+    """
+    def decorator(func):
+        registry[name] = TaskSpec(
+            name=name, func=func, queue=queue, max_attempts=max_attempts,
+            retry_backoff=retry_backoff, visibility_timeout=visibility_timeout,
+            concurrency=concurrency, on_failure=on_failure,
+        )
+        return func
+    return decorator
+
+
+def enqueue(task_name, payload=None, *, priority=0, delay=None, queue=None):
+    """
+    Queue a job for ``task_name``. Returns the Job.
+
+    Call inside ``transaction.on_commit`` when the payload refers to rows
+    created in the current transaction.
+    """
+    spec = registry.get(task_name)
+    if spec is None:
+        raise UnknownTask(task_name)
+    run_at = timezone.now() + (delay or timedelta())
+    return Job.objects.create(
+        task=task_name,
+        payload=payload or {},
+        queue=queue or spec.queue,
+        priority=priority,
+        max_attempts=spec.max_attempts,
+        run_at=run_at,
+    )
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _claimable(now):
+    return Q(status='queued') | Q(status='running', locked_until__lt=now)
+
+
+def claim_job(worker_id, queues):
+    """
+    Atomically claim the next runnable job on ``queues``, or return None.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        _claimable(now), queue__in=queues, run_at__lte=now
+    ).order_by('-priority', 'run_at').values_list('pk', 'task')[:CLAIM_CANDIDATES]
+
+    for pk, task_name in candidates:
+        spec = registry.get(task_name)
+        if spec is None:
+            Job.objects.filter(pk=pk, status='queued').update(
+                status='failed', last_error=f'Unknown task {task_name!r}'
+            )
+            continue
+
+        if spec.concurrency is not None:
+            running = Job.objects.filter(
+                task=task_name, status='running', locked_until__gte=now
+            ).count()
+            if running >= spec.concurrency:
+                continue
+
+        claimed = Job.objects.filter(_claimable(now), pk=pk).update(
+            status='running',
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=spec.visibility_timeout),
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run_job(job, worker_id):
+    """
+    Execute a claimed job and record the outcome.
+    """
+    spec = registry[job.task]
+    owned = Job.objects.filter(pk=job.pk, status='running', locked_by=worker_id)
+
+    if job.attempts > job.max_attempts:
+        # Reclaimed after a lost worker used up the final attempt.
+        owned.update(status='failed', locked_until=None, updated_at=timezone.now())
+        _gave_up(spec, job)
+        return False
+
+    try:
+        spec.func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s (%s) failed on attempt %d', job.pk, job.task, job.attempts)
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            owned.update(status='failed', locked_until=None, last_error=error, updated_at=now)
+            _gave_up(spec, job)
+        else:
+            delay = spec.retry_backoff * 2 ** (job.attempts - 1)
+            delay *= random.uniform(0.8, 1.2)
+            owned.update(
+                status='queued', locked_until=None, last_error=error,
+                run_at=now + timedelta(seconds=delay), updated_at=now,
+            )
+        return False
+
+    owned.update(status='succeeded', locked_until=None, updated_at=timezone.now())
+    return True
+
+
+def _gave_up(spec, job):
+    if spec.on_failure is None:
+        return
+    try:
+        spec.on_failure(**job.payload)
+    except Exception:
+        logger.exception('Failure handler of job %s (%s) failed', job.pk, job.task)
+
+
+def work(queues=('default',), worker_id=None, poll_interval=1.0, burst=False,
+         should_stop=lambda: False):
+    """
+    Claim and run jobs until ``should_stop()`` returns True, or, with
+    ``burst``, until no runnable job remains. Returns the number run.
+    """
+    worker_id = worker_id or default_worker_id()
+    processed = 0
+    while not should_stop():
+        close_old_connections()
+        job = claim_job(worker_id, list(queues))
+        if job is None:
+            if burst:
+                break
+            time.sleep(poll_interval)
+            continue
+        run_job(job, worker_id)
+        processed += 1
+    close_old_connections()
+    return processed
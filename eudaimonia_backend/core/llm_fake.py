@@ -0,0 +1,258 @@
+"""
+Eudaimonia Fake LLM Server
+
+A stand-in for an OpenAI-compatible chat completions API, for exercising
+the companion endpoint without a provider or an API key. It serves
+``POST /v1/chat/completions``, streamed (Server-Sent Events) or not,
+from a background thread::
+
+    with FakeLLMServer(first_token_latency=0.3, token_interval=0.02) as llm:
+        with override_settings(OPENAI_API_KEY='test', OPENAI_BASE_URL=llm.base_url):
+            ...
+
+The answer is ``reply`` (a string, or a callable taking the request's
+messages), split into whitespace-led tokens. ``first_token_latency``
+delays the first token and ``token_interval`` every following one.
+Failures are injected at random (``failure_rate``, seeded) or with
+``fail_next``: ``'error'`` answers HTTP 500, ``'disconnect'`` drops the
+connection before responding and ``'midstream'`` drops it halfway
+through a streamed answer.
+
+Streams the client abandons are counted in ``cancelled``, so tests can
+check that a disconnect upstream stops the generation.
+"""
+
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    'Your communities shape who you are here. Based on the worlds you '
+    'belong to, here are a few places where your voice would matter.'
+)
+
+_TOKEN_RE = re.compile(r'\s*\S+')
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text)
+
+
+class FakeLLMServer:
+    """
+    OpenAI-compatible chat completions server on a background thread.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, *, reply=DEFAULT_REPLY,
+                 first_token_latency=0.0, token_interval=0.0,
+                 failure_rate=0.0, failure_mode='error', seed=0):
+        self.reply = reply
+        self.first_token_latency = first_token_latency
+        self.token_interval = token_interval
+        self.failure_rate = failure_rate
+        self.failure_mode = failure_mode
+        self.requests = Counter()
+        self.failures = Counter()
+        self.completed = 0
+        self.cancelled = 0
+        self.tokens_sent = 0
+        self.lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._forced_failures = []
+        self.server = ThreadingHTTPServer((host, port), _handler_for(self))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def answer(self, messages):
+        return self.reply(messages) if callable(self.reply) else self.reply
+
+    def fail_next(self, count=1, mode=None):
+        """
+        Make the next ``count`` requests fail with ``mode`` (default
+        ``failure_mode``).
+        """
+        with self.lock:
+            self._forced_failures.extend([mode or self.failure_mode] * count)
+
+    def should_fail(self, kind):
+        """
+        Return the failure mode to apply to this request, or None.
+        """
+        with self.lock:
+            self.requests[kind] += 1
+            if self._forced_failures:
+                mode = self._forced_failures.pop(0)
+            elif self.failure_rate and self._random.random() < self.failure_rate:
+                mode = self.failure_mode
+            else:
+                mode = None
+            if mode is not None:
+                self.failures[mode] += 1
+            return mode
+
+    def record(self, tokens, outcome='completed'):
+        """
+        Count a finished stream: ``'completed'``, ``'cancelled'`` by the
+        client or ``'dropped'`` by an injected failure.
+        """
+        with self.lock:
+            self.tokens_sent += tokens
+            if outcome == 'completed':
+                self.completed += 1
+            elif outcome == 'cancelled':
+                self.cancelled += 1
+
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.failures.clear()
+            self._forced_failures.clear()
+            self.completed = self.cancelled = self.tokens_sent = 0
+
+
+def _handler_for(server):
+    class Handler(_FakeLLMHandler):
+        pass
+    Handler.llm = server
+    return Handler
+
+
+class _FakeLLMHandler(BaseHTTPRequestHandler):
+    llm = None
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self.send_error_json(400, 'invalid JSON body')
+            return
+        if self.path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+            self.send_error_json(404, f'unknown path {self.path}')
+            return
+
+        stream = bool(payload.get('stream'))
+        failure = self.llm.should_fail('stream' if stream else 'complete')
+        if failure == 'disconnect':
+            self.close_connection = True
+            self.connection.close()
+            return
+        if failure == 'error':
+            self.send_error_json(500, 'injected failure')
+            return
+
+        tokens = tokenize(self.llm.answer(payload.get('messages', [])))
+        model = payload.get('model', 'fake')
+        if stream:
+            self.stream_tokens(model, tokens, drop_halfway=failure == 'midstream')
+        else:
+            if self.llm.first_token_latency:
+                time.sleep(self.llm.first_token_latency)
+            time.sleep(self.llm.token_interval * max(len(tokens) - 1, 0))
+            self.send_json(_completion(model, ''.join(tokens)))
+            self.llm.record(len(tokens))
+
+    def stream_tokens(self, model, tokens, drop_halfway=False):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+        sent = 0
+        try:
+            if self.llm.first_token_latency:
+                time.sleep(self.llm.first_token_latency)
+            for index, token in enumerate(tokens):
+                if drop_halfway and index >= len(tokens) // 2:
+                    self.close_connection = True
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                    self.llm.record(sent, 'dropped')
+                    return
+                if index and self.llm.token_interval:
+                    time.sleep(self.llm.token_interval)
+                self.write_event(_chunk(completion_id, model, {'content': token}))
+                sent += 1
+            self.write_event(_chunk(completion_id, model, {}, finish_reason='stop'))
+            self.write_chunk(b'data: [DONE]\n\n')
+            self.write_chunk(b'')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            self.llm.record(sent, 'cancelled')
+            return
+        self.llm.record(sent)
+
+    def write_event(self, payload):
+        self.write_chunk(b'data: ' + json.dumps(payload).encode() + b'\n\n')
+
+    def write_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json({'error': {'message': message, 'type': 'server_error', 'code': None}}, status)
+
+
+def _completion(model, text):
+    return {
+        'id': f'chatcmpl-{uuid.uuid4().hex}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': text},
+            'finish_reason': 'stop',
+        }],
+    }
+
+
+def _chunk(completion_id, model, delta, finish_reason=None):
+    return {
+        'id': completion_id,
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+    }
@@ -0,0 +1,29 @@
+"""
+Analyze the opinion groups in LivingWorld votes.
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.opinions import analyze_opinions
+
+
+class Command(BaseCommand):
+    help = 'Find opinion groups and consensus proposals in the votes of each LivingWorld.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Analyze every world from scratch instead of only those with new votes.',
+        )
+        parser.add_argument(
+            '--world',
+            action='append',
+            dest='worlds',
+            help='Only analyze this world (may be repeated).',
+        )
+
+    def handle(self, *args, **options):
+        count = analyze_opinions(world_ids=options['worlds'], full=options['full'])
+        kind = 'Full' if options['full'] else 'Incremental'
+        self.stdout.write(self.style.SUCCESS(f'{kind} run analyzed {count} world(s).'))
@@ -0,0 +1,131 @@
+"""
+Benchmark streamed AI companion answers against a fake LLM server,
+through the response cache and in-flight deduplication.
+"""
+
+import asyncio
+import statistics
+import time
+import uuid
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.companion import answer_events
+from core.companion_cache import cached_answer_fragments
+from core.llm_fake import FakeLLMServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure first-token latency, caching and cancellation of streamed companion answers, '
+        'using an in-process fake LLM.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Number of companion queries.')
+        parser.add_argument(
+            '--distinct', type=int, default=None,
+            help='Number of distinct questions among the queries (default: all distinct).',
+        )
+        parser.add_argument('--concurrency', type=int, default=10, help='Queries streamed at once.')
+        parser.add_argument('--first-token-latency', type=float, default=200.0, help='Simulated time to first token, in ms.')
+        parser.add_argument('--token-interval', type=float, default=20.0, help='Simulated time between tokens, in ms.')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of queries that fail.')
+        parser.add_argument(
+            '--cancel-after', type=int, default=None,
+            help='Abandon each stream after this many tokens, as a disconnecting client would.',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Seed for injected failures.')
+
+    def handle(self, *args, **options):
+        try:
+            from openai import AsyncOpenAI
+        except ImportError:
+            raise CommandError('The openai package is required (see requirements.txt).')
+
+        llm = FakeLLMServer(
+            first_token_latency=options['first_token_latency'] / 1000,
+            token_interval=options['token_interval'] / 1000,
+            failure_rate=options['failure_rate'], failure_mode='midstream',
+            seed=options['seed'],
+        )
+        with llm:
+            client = AsyncOpenAI(api_key='benchmark', base_url=llm.base_url, max_retries=0)
+            start = time.perf_counter()
+            results = asyncio.run(self.run(client, options))
+            elapsed = time.perf_counter() - start
+            # Give the server a moment to notice abandoned streams.
+            time.sleep(options['token_interval'] / 1000 * 3)
+            self.report(results, elapsed, llm)
+
+    async def run(self, client, options):
+        limit = asyncio.Semaphore(options['concurrency'])
+        user_context = {'username': 'benchmark', 'community_memberships': []}
+
+        distinct = options['distinct'] or options['requests']
+        # A fresh profile version per run, so earlier runs' answers are not reused.
+        version = uuid.uuid4().hex
+
+        async def query(index):
+            async with limit:
+                fragments, source = await cached_answer_fragments(
+                    client, 'benchmark', version, user_context, f'Question {index % distinct}?'
+                )
+                return source, await self.stream(fragments, options['cancel_after'])
+
+        try:
+            return await asyncio.gather(*(query(index) for index in range(options['requests'])))
+        finally:
+            await client.close()
+
+    async def stream(self, fragments, cancel_after):
+        start = time.perf_counter()
+        first_token, tokens, outcome = None, 0, 'done'
+        events = answer_events(fragments)
+        try:
+            async for event, data in events:
+                if event == 'token':
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    tokens += 1
+                    if cancel_after is not None and tokens >= cancel_after:
+                        outcome = 'cancelled'
+                        break
+                elif event == 'error':
+                    outcome = 'error'
+        finally:
+            await events.aclose()
+        return outcome, first_token, time.perf_counter() - start, tokens
+
+    def report(self, results, elapsed, llm):
+        sources = Counter(source for source, _ in results)
+        results = [result for _, result in results]
+        first_tokens = [first for _, first, _, _ in results if first is not None]
+        durations = [duration for _, _, duration, _ in results]
+        outcomes = [outcome for outcome, _, _, _ in results]
+
+        self.stdout.write(f'{"metric":<20} {"p50 ms":>9} {"p95 ms":>9} {"max ms":>9}')
+        for label, values in (('first token', first_tokens), ('full answer', durations)):
+            if values:
+                self.stdout.write(
+                    f'{label:<20} {_percentile(values, 50):>9.1f} '
+                    f'{_percentile(values, 95):>9.1f} {max(values) * 1000:>9.1f}'
+                )
+        self.stdout.write(
+            f'{len(results)} queries in {elapsed:.2f}s: {outcomes.count("done")} done, '
+            f'{outcomes.count("error")} failed, {outcomes.count("cancelled")} abandoned.'
+        )
+        self.stdout.write('Answered from: ' + ', '.join(
+            f'{source} {count}' for source, count in sorted(sources.items())
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f'LLM served {sum(llm.requests.values())} request(s), completed {llm.completed} '
+            f'stream(s), saw {llm.cancelled} cancelled, sent {llm.tokens_sent} token(s).'
+        ))
+
+
+def _percentile(values, percent):
+    if len(values) == 1:
+        return values[0] * 1000
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1] * 1000
@@ -0,0 +1,128 @@
+"""
+Benchmark the quadratic voting and funding engine on synthetic rounds.
+"""
+
+import math
+import statistics
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import FundingRound
+from core.quadratic import (
+    ContributionMatrix, allocate_matching, compute_results, quadratic_funding, quadratic_votes
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure quadratic voting and funding on a synthetic round, or time a real one with --round.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contributors', type=int, default=50000, help='Contributors in the synthetic round.')
+        parser.add_argument('--proposals', type=int, default=500, help='Proposals in the synthetic round.')
+        parser.add_argument(
+            '--per-contributor', type=float, default=8.0,
+            help='Average number of proposals each contributor supports.',
+        )
+        parser.add_argument('--pool', type=float, default=1_000_000.0, help='Matching pool.')
+        parser.add_argument('--max-share', type=float, default=0.1, help='Largest share of the pool per proposal.')
+        parser.add_argument('--budget', type=float, default=100.0, help='Voice credits per voter.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed repetitions of each step.')
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Also compute the results with plain Python loops, compare and time them.',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic round.')
+        parser.add_argument('--round', help='Time loading and computing this FundingRound instead.')
+
+    def handle(self, *args, **options):
+        if options['round']:
+            return self.benchmark_round(options['round'], options['repeat'])
+
+        rows, cols, amounts = self.synthesize(options)
+        shape = (options['contributors'], options['proposals'])
+        self.stdout.write(
+            f'{shape[0]} contributors, {shape[1]} proposals, {len(amounts)} contributions'
+        )
+
+        matrix = self.measure(
+            'build matrix', options['repeat'],
+            lambda: ContributionMatrix.from_arrays(rows, cols, amounts, shape)
+        )
+        votes = self.measure(
+            'quadratic voting', options['repeat'],
+            lambda: quadratic_votes(matrix, options['budget'])
+        )
+        funding = self.measure(
+            'quadratic funding', options['repeat'],
+            lambda: quadratic_funding(matrix, options['pool'], options['max_share'])
+        )
+        self.stdout.write(
+            f'Matched {funding["match"].sum():,.2f} of {options["pool"]:,.2f}; '
+            f'top proposal receives {funding["match"].max():,.2f} and '
+            f'{votes["votes"].max():,.1f} votes.'
+        )
+
+        if options['verify']:
+            self.verify(rows, cols, amounts, options, votes, funding)
+
+    def synthesize(self, options):
+        rng = np.random.default_rng(options['seed'])
+        # A few proposals draw most of the support, as in real rounds.
+        popularity = 1.0 / np.arange(1, options['proposals'] + 1) ** 1.1
+        popularity /= popularity.sum()
+        counts = np.maximum(rng.poisson(options['per_contributor'], options['contributors']), 1)
+        rows = np.repeat(np.arange(options['contributors']), counts)
+        cols = rng.choice(options['proposals'], size=len(rows), p=popularity)
+        amounts = np.round(rng.lognormal(mean=2.0, sigma=1.0, size=len(rows)), 2) + 0.01
+        return rows, cols, amounts
+
+    def measure(self, label, repeat, func):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        self.stdout.write(
+            f'{label:<20} median {statistics.median(timings) * 1000:>9.2f} ms   '
+            f'best {min(timings) * 1000:>9.2f} ms'
+        )
+        return result
+
+    def verify(self, rows, cols, amounts, options, votes, funding):
+        start = time.perf_counter()
+        given = defaultdict(float)
+        for row, col, amount in zip(rows.tolist(), cols.tolist(), amounts.tolist()):
+            given[row, col] += amount
+        spent = defaultdict(float)
+        for (row, _), amount in given.items():
+            spent[row] += amount
+        sqrt_sums = [0.0] * options['proposals']
+        totals = [0.0] * options['proposals']
+        vote_totals = [0.0] * options['proposals']
+        for (row, col), amount in given.items():
+            sqrt_sums[col] += math.sqrt(amount)
+            totals[col] += amount
+            scale = min(1.0, options['budget'] / spent[row])
+            vote_totals[col] += math.sqrt(amount * scale)
+        ideal = [max(s * s - t, 0.0) for s, t in zip(sqrt_sums, totals)]
+        match = allocate_matching(ideal, options['pool'], options['max_share'])
+        elapsed = time.perf_counter() - start
+
+        if not (np.allclose(vote_totals, votes['votes']) and np.allclose(ideal, funding['ideal'])
+                and np.allclose(match, funding['match'])):
+            raise CommandError('Vectorized results differ from the reference computation.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Results match the plain Python reference, which took {elapsed * 1000:.1f} ms.'
+        ))
+
+    def benchmark_round(self, pk, repeat):
+        try:
+            funding_round = FundingRound.objects.get(pk=pk)
+        except (FundingRound.DoesNotExist, ValueError):
+            raise CommandError(f'No funding round {pk}.')
+        matrix = self.measure('load contributions', repeat, lambda: ContributionMatrix.load(funding_round))
+        self.stdout.write(f'{matrix.matrix.shape[0]} contributors, {matrix.matrix.nnz} contributions')
+        self.measure('compute results', repeat, lambda: compute_results(funding_round, matrix))
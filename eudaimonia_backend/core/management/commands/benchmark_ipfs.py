@@ -0,0 +1,137 @@
+"""
+Benchmark the IPFS services and content cache against a fake node.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import run_export
+from core.ipfs_async import AsyncIPFSService
+from core.ipfs_cache import CIDCache
+from core.ipfs_fake import FakeIPFSNode
+from core.ipfs_service import IPFSClientPool, IPFSError, IPFSService
+from core.models import DataExport
+
+
+class Command(BaseCommand):
+    help = 'Measure IPFS add/cat throughput and cache effect offline, using an in-process fake node.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=200, help='Number of objects to add and read.')
+        parser.add_argument('--size', type=int, default=64 * 1024, help='Size of each object in bytes.')
+        parser.add_argument('--latency', type=float, default=5.0, help='Simulated node latency per request, in ms.')
+        parser.add_argument('--bandwidth', type=float, default=None, help='Simulated node bandwidth, in MB/s.')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests that fail.')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent transfers in the async runs.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for injected failures.')
+        parser.add_argument(
+            '--export-user',
+            help='Also time a full data export for this username (creates a DataExport row).',
+        )
+
+    def handle(self, *args, **options):
+        count, size = options['objects'], options['size']
+        payloads = [os.urandom(size) for _ in range(count)]
+        bandwidth = options['bandwidth'] * 1024 * 1024 if options['bandwidth'] else None
+        self.results = []
+
+        node = FakeIPFSNode(
+            latency=options['latency'] / 1000, bandwidth=bandwidth,
+            failure_rate=options['failure_rate'], seed=options['seed'],
+        )
+        with node, tempfile.TemporaryDirectory() as cache_dir:
+            cache = CIDCache(cache_dir, max_bytes=count * size * 2)
+            pool = IPFSClientPool(node.api_addr, size=options['concurrency'])
+            service = IPFSService(pool=pool, cache=cache)
+
+            cids = self.measure('sync add', payloads, service.add_file)
+            cids = [cid for cid in cids if cid]
+            self.measure('sync get (cold cache)', cids, service.get_file)
+            self.measure('sync get (warm cache)', cids, service.get_file)
+            cache.clear()
+
+            asyncio.run(self.run_async(node, cache, payloads, options['concurrency']))
+
+            if options['export_user']:
+                self.run_export_benchmark(options['export_user'], service)
+            pool.close()
+
+            self.report(node)
+
+    def measure(self, label, items, func):
+        results, failures, transferred = [], 0, 0
+        start = time.perf_counter()
+        for item in items:
+            try:
+                result = func(item)
+            except IPFSError:
+                failures += 1
+                result = None
+            results.append(result)
+            transferred += _size(item, result)
+        self.results.append((label, len(items), failures, time.perf_counter() - start, transferred))
+        return results
+
+    async def run_async(self, node, cache, payloads, concurrency):
+        limit = asyncio.Semaphore(concurrency)
+        async with AsyncIPFSService(node.api_addr, cache=cache) as ipfs:
+            async def guarded(func, item):
+                async with limit:
+                    try:
+                        return await func(item)
+                    except IPFSError:
+                        return None
+
+            async def measure(label, items, func):
+                start = time.perf_counter()
+                results = await asyncio.gather(*(guarded(func, item) for item in items))
+                failures = sum(result is None for result in results)
+                transferred = sum(_size(item, result) for item, result in zip(items, results))
+                self.results.append((label, len(items), failures, time.perf_counter() - start, transferred))
+                return results
+
+            cids = await measure('async add', payloads, ipfs.add_bytes)
+            cids = [cid for cid in cids if cid]
+            await measure('async get (cold cache)', cids, ipfs.get_file)
+            await measure('async get (warm cache)', cids, ipfs.get_file)
+
+    def run_export_benchmark(self, username, service):
+        try:
+            user = get_user_model().objects.get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user named {username!r}.')
+        export = DataExport.objects.create(user=user)
+        start = time.perf_counter()
+        try:
+            run_export(export, ipfs=service)
+            failures = 0
+        except IPFSError:
+            failures = 1
+        elapsed = time.perf_counter() - start
+        size = service.stat_size(export.ipfs_cid) if export.ipfs_cid else 0
+        self.results.append(('export', 1, failures, elapsed, size))
+
+    def report(self, node):
+        self.stdout.write(f'{"operation":<24} {"ops":>6} {"failed":>6} {"seconds":>9} {"ops/s":>9} {"MB/s":>8}')
+        for label, ops, failures, elapsed, transferred in self.results:
+            rate = ops / elapsed if elapsed else 0
+            throughput = transferred / elapsed / 1024 / 1024 if elapsed else 0
+            self.stdout.write(
+                f'{label:<24} {ops:>6} {failures:>6} {elapsed:>9.3f} {rate:>9.1f} {throughput:>8.1f}'
+            )
+        requests = sum(node.requests.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Node served {requests} request(s), {sum(node.failures.values())} injected failure(s).'
+        ))
+
+
+def _size(item, result):
+    for value in (item, result):
+        if isinstance(value, (bytes, bytearray)):
+            return len(value)
+    return 0
@@ -0,0 +1,46 @@
+"""
+Export a user's data as gzipped NDJSON, to IPFS or to a local file.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import iter_export_records, run_export, write_ndjson
+from core.models import DataExport
+
+
+class Command(BaseCommand):
+    help = "Export a user's data as gzipped NDJSON and upload it to IPFS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--output',
+            help='Write the export to this file instead of uploading it to IPFS.',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Upload only records changed since the last complete export.',
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist.")
+
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                count = write_ndjson(iter_export_records(user), output)
+            self.stdout.write(self.style.SUCCESS(
+                f"Wrote {count} record(s) to {options['output']}."
+            ))
+            return
+
+        kind = 'incremental' if options['incremental'] else 'full'
+        export = run_export(DataExport.objects.create(user=user, kind=kind))
+        self.stdout.write(self.style.SUCCESS(
+            f'{export.get_kind_display()} export {export.id} uploaded as {export.ipfs_cid}.'
+        ))
@@ -0,0 +1,66 @@
+"""
+Copy accounts from Django's ``auth_user`` table into ``core.User``.
+
+Databases created before ``AUTH_USER_MODEL`` was set to ``core.User``
+registered accounts in ``auth_user``; run this once after upgrading so
+they can log in again. Password hashes are copied unchanged.
+"""
+
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import User
+
+FIELDS = [
+    'username', 'email', 'password', 'first_name', 'last_name',
+    'is_staff', 'is_active', 'is_superuser', 'last_login', 'date_joined',
+]
+
+
+class Command(BaseCommand):
+    help = 'Copy accounts from the legacy auth_user table into core.User.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be copied without writing anything.',
+        )
+
+    def handle(self, *args, **options):
+        if 'auth_user' not in connection.introspection.table_names():
+            raise CommandError('There is no auth_user table to import from.')
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {', '.join(FIELDS)} FROM auth_user ORDER BY id")
+            rows = [dict(zip(FIELDS, row)) for row in cursor.fetchall()]
+        for row in rows:
+            # Raw queries return naive datetimes on backends without
+            # time zone support (SQLite); they are stored in UTC.
+            for field in ('last_login', 'date_joined'):
+                if row[field] is not None and timezone.is_naive(row[field]):
+                    row[field] = timezone.make_aware(row[field], dt_timezone.utc)
+
+        copied = 0
+        with transaction.atomic():
+            for row in rows:
+                # core.User requires a unique email; those accounts need
+                # to be recreated by hand.
+                if not row['email']:
+                    self.stdout.write(self.style.WARNING(f"{row['username']}: skipped, no email"))
+                elif User.objects.filter(username=row['username']).exists():
+                    self.stdout.write(f"{row['username']}: already exists")
+                elif User.objects.filter(email__iexact=row['email']).exists():
+                    self.stdout.write(self.style.WARNING(
+                        f"{row['username']}: skipped, email {row['email']} is taken"
+                    ))
+                else:
+                    if not options['dry_run']:
+                        User.objects.create(**row)
+                    copied += 1
+
+        verb = 'Would copy' if options['dry_run'] else 'Copied'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {copied} of {len(rows)} account(s)'))
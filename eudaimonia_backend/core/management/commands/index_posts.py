@@ -0,0 +1,35 @@
+"""
+Embed posts into the companion's post index.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.post_index import BATCH_SIZE, get_post_index, index_posts
+
+
+class Command(BaseCommand):
+    help = 'Embed new and edited posts into the per-world vector index used by the AI companion.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild the index from every post, dropping rows of deleted posts.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of posts embedded per batch.',
+        )
+
+    def handle(self, *args, **options):
+        index = get_post_index()
+        start = time.perf_counter()
+        count = index_posts(full=options['full'], batch_size=options['batch_size'], index=index)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Embedded {count} post(s) with {index.embedder.name} in {elapsed:.2f}s.'
+        ))
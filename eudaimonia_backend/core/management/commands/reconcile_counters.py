@@ -0,0 +1,38 @@
+"""
+Recompute denormalized counters that have drifted from the rows they count.
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.counters import COUNTERS, find_drift, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Reconcile LivingWorld.member_count and the Proposal vote counts and tallies with the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted rows without correcting them.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows written per UPDATE batch.',
+        )
+
+    def handle(self, *args, **options):
+        for model, field, related_model, fk_name, filters in COUNTERS:
+            label = f'{model._meta.label}.{field}'
+            if options['dry_run']:
+                drifted = find_drift(model, field, related_model, fk_name, filters).count()
+                self.stdout.write(f'{label}: {drifted} drifted row(s)')
+                continue
+
+            fixed = reconcile(
+                model, field, related_model, fk_name, filters,
+                batch_size=options['batch_size']
+            )
+            self.stdout.write(self.style.SUCCESS(f'{label}: corrected {fixed} row(s)'))
@@ -0,0 +1,41 @@
+"""
+Recompute precomputed connection recommendations.
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.recommendations import DEFAULT_BATCH_SIZE, DEFAULT_TOP_N, refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Refresh "people you may know" recommendations from the friendship and membership graph.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every user instead of only those affected since the last run.',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=DEFAULT_TOP_N,
+            help='Number of recommendations stored per user.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Number of users scored per sparse matrix block.',
+        )
+
+    def handle(self, *args, **options):
+        run = refresh_recommendations(
+            full=options['full'],
+            top_n=options['top'],
+            batch_size=options['batch_size'],
+        )
+        kind = 'Full' if run.full else 'Incremental'
+        self.stdout.write(self.style.SUCCESS(
+            f'{kind} refresh recomputed {run.users_refreshed} user(s).'
+        ))
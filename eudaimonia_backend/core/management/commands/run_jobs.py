@@ -0,0 +1,82 @@
+"""
+Run background job workers.
+"""
+
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import default_worker_id, work
+
+
+def _worker_main(queues, poll_interval, burst):
+    stopping = multiprocessing.Event()
+
+    def request_stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    work(
+        queues=queues,
+        worker_id=default_worker_id(),
+        poll_interval=poll_interval,
+        burst=burst,
+        should_stop=stopping.is_set,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Process jobs from the database-backed job queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue',
+            action='append',
+            dest='queues',
+            help='Queue to consume (repeatable). Defaults to default, exports and batch.',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Number of worker processes.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep when no job is runnable.',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once no runnable job remains.',
+        )
+
+    def handle(self, *args, **options):
+        queues = options['queues'] or ['default', 'exports', 'batch']
+        worker_args = (queues, options['poll_interval'], options['burst'])
+
+        if options['processes'] <= 1:
+            _worker_main(*worker_args)
+            return
+
+        # Children must open their own database connections.
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=_worker_main, args=worker_args, daemon=False)
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-15 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communitymembership',
+            index=models.Index(fields=['world', '-joined_at', '-id'], name='membership_world_joined_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created_at', '-id'], name='post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['world', '-created_at', '-id'], name='post_world_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proposal',
+            index=models.Index(fields=['-created_at', '-id'], name='proposal_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proposal',
+            index=models.Index(fields=['world', '-created_at', '-id'], name='proposal_world_created_idx'),
+        ),
+    ]
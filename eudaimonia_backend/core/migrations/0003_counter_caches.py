@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-15 12:01
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    LivingWorld = apps.get_model('core', 'LivingWorld')
+    CommunityMembership = apps.get_model('core', 'CommunityMembership')
+    Proposal = apps.get_model('core', 'Proposal')
+    Vote = apps.get_model('core', 'Vote')
+
+    for model, field, related_model, fk_name in [
+        (LivingWorld, 'member_count', CommunityMembership, 'world'),
+        (Proposal, 'vote_count', Vote, 'proposal'),
+    ]:
+        counts = related_model.objects.filter(
+            **{fk_name: OuterRef('pk')}
+        ).order_by().values(fk_name).annotate(total=Count('pk')).values('total')
+        model.objects.update(**{
+            field: Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='livingworld',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='proposal',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
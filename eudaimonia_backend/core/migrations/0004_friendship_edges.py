@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-15 12:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+def backfill_edges(apps, schema_editor):
+    Friendship = apps.get_model('core', 'Friendship')
+    FriendshipEdge = apps.get_model('core', 'FriendshipEdge')
+
+    edges = []
+    for friendship in Friendship.objects.filter(status='accepted').iterator():
+        edges.append(FriendshipEdge(
+            user_id=friendship.user1_id, friend_id=friendship.user2_id,
+            friendship=friendship, created_at=friendship.updated_at
+        ))
+        edges.append(FriendshipEdge(
+            user_id=friendship.user2_id, friend_id=friendship.user1_id,
+            friendship=friendship, created_at=friendship.updated_at
+        ))
+        if len(edges) >= 1000:
+            FriendshipEdge.objects.bulk_create(edges, ignore_conflicts=True)
+            edges = []
+    FriendshipEdge.objects.bulk_create(edges, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_counter_caches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FriendshipEdge',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('friend', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.user')),
+                ('friendship', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='edges', to='core.friendship')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friend_edges', to='core.user')),
+            ],
+            options={
+                'verbose_name': 'Friendship Edge',
+                'verbose_name_plural': 'Friendship Edges',
+                'db_table': 'friendship_edge',
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='friend_edge_user_created_idx')],
+                'unique_together': {('user', 'friend')},
+            },
+        ),
+        migrations.RunPython(backfill_edges, migrations.RunPython.noop),
+    ]
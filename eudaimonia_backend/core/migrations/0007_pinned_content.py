@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-15 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PinnedContent',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('cid', models.CharField(max_length=255)),
+                ('directory_cid', models.CharField(blank=True, max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('pin_state', models.CharField(choices=[('pinned', 'Pinned'), ('unpinned', 'Unpinned'), ('failed', 'Failed')], default='pinned', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Pinned Content',
+                'verbose_name_plural': 'Pinned Content',
+                'db_table': 'pinned_content',
+                'indexes': [models.Index(fields=['cid'], name='pinned_content_cid_idx')],
+            },
+        ),
+    ]
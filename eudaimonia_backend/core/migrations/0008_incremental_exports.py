@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-15 12:17
+
+from django.db import migrations, models
+from django.db.models import F
+import django.db.models.deletion
+
+
+def backfill_vote_updated_at(apps, schema_editor):
+    Vote = apps.get_model('core', 'Vote')
+    Vote.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_pinned_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataexport',
+            name='kind',
+            field=models.CharField(choices=[('full', 'Full'), ('incremental', 'Incremental')], default='full', max_length=11),
+        ),
+        migrations.AddField(
+            model_name='dataexport',
+            name='previous',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.dataexport'),
+        ),
+        migrations.AddField(
+            model_name='dataexport',
+            name='watermark',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_vote_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='communitymembership',
+            index=models.Index(fields=['profile', 'updated_at'], name='membership_profile_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dataexport',
+            index=models.Index(fields=['user', 'status', '-watermark'], name='export_user_watermark_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['user1', 'updated_at'], name='friendship_user1_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['user2', 'updated_at'], name='friendship_user2_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'updated_at'], name='post_author_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proposal',
+            index=models.Index(fields=['creator', 'updated_at'], name='proposal_creator_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['voter', 'updated_at'], name='vote_voter_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-15 12:33
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_tallies(apps, schema_editor):
+    Proposal = apps.get_model('core', 'Proposal')
+    Vote = apps.get_model('core', 'Vote')
+
+    for choice in ('agree', 'disagree', 'abstain'):
+        counts = Vote.objects.filter(
+            proposal=OuterRef('pk'), choice=choice
+        ).order_by().values('proposal').annotate(total=Count('pk')).values('total')
+        Proposal.objects.update(**{
+            f'{choice}_count': Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_post_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proposal',
+            name='abstain_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='proposal',
+            name='agree_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='proposal',
+            name='disagree_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-15 12:39
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_proposal_tallies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FundingRound',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('mechanism', models.CharField(choices=[('voting', 'Quadratic Voting'), ('funding', 'Quadratic Funding')], default='funding', max_length=10)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('closed', 'Closed')], default='open', max_length=10)),
+                ('matching_pool', models.DecimalField(decimal_places=2, default=0, max_digits=18, validators=[django.core.validators.MinValueValidator(0)])),
+                ('credit_budget', models.PositiveIntegerField(default=100)),
+                ('max_match_share', models.FloatField(default=1.0, validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(1.0)])),
+                ('results', models.JSONField(blank=True, editable=False, null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='funding_rounds_created', to='core.user')),
+                ('world', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='funding_rounds', to='core.livingworld')),
+            ],
+            options={
+                'verbose_name': 'Funding Round',
+                'verbose_name_plural': 'Funding Rounds',
+                'db_table': 'funding_round',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Contribution',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contributor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to='core.user')),
+                ('proposal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to='core.proposal')),
+                ('round', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to='core.fundinground')),
+            ],
+            options={
+                'verbose_name': 'Contribution',
+                'verbose_name_plural': 'Contributions',
+                'db_table': 'contribution',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='fundinground',
+            index=models.Index(fields=['world', '-created_at'], name='funding_round_world_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['round', 'contributor'], name='contribution_contributor_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='contribution',
+            unique_together={('round', 'proposal', 'contributor')},
+        ),
+    ]
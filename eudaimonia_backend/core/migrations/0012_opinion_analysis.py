@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-15 12:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_funding_rounds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpinionAnalysis',
+            fields=[
+                ('world', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='opinion_analysis', serialize=False, to='core.livingworld')),
+                ('result', models.JSONField(default=dict)),
+                ('state', models.JSONField(default=dict)),
+                ('vote_watermark', models.DateTimeField(blank=True, null=True)),
+                ('votes_analyzed', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Opinion Analysis',
+                'verbose_name_plural': 'Opinion Analyses',
+                'db_table': 'opinion_analysis',
+            },
+        ),
+    ]
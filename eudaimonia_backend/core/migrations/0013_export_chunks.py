@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-15 12:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_opinion_analysis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportChunk',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('index', models.PositiveIntegerField()),
+                ('cid', models.CharField(max_length=255)),
+                ('export', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='core.dataexport')),
+            ],
+            options={
+                'verbose_name': 'Export Chunk',
+                'verbose_name_plural': 'Export Chunks',
+                'db_table': 'export_chunk',
+                'indexes': [models.Index(fields=['cid'], name='export_chunk_cid_idx')],
+                'unique_together': {('export', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-15 13:11
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_credential_updated_at(apps, schema_editor):
+    VerifiableCredential = apps.get_model('core', 'VerifiableCredential')
+    VerifiableCredential.objects.update(updated_at=F('issued_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_export_chunks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='verifiablecredential',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_credential_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='verifiablecredential',
+            index=models.Index(fields=['profile', 'updated_at'], name='credential_profile_updated_idx'),
+        ),
+    ]
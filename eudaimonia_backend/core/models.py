@@ -2,6 +2,26 @@ import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+
+class CounterCacheMixin:
+    """
+    Keep denormalized counter columns out of ordinary saves.
+
+    Counters listed in ``counter_fields`` are only ever changed with
+    ``F()`` updates (see core.counters), so a stale in-memory instance
+    must never write its copy back over the database value.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
 
 
 class User(AbstractUser):
@@ -38,7 +58,7 @@ class User(AbstractUser):
         return self.username
 
 
-class LivingWorld(models.Model):
+class LivingWorld(CounterCacheMixin, models.Model):
     WORLD_CATEGORIES = [
         ('education', 'Education'),
         ('art', 'Art'),
@@ -47,6 +67,7 @@ class LivingWorld(models.Model):
         ('hobbies', 'Hobbies'),
         ('other', 'Other'),
     ]
+    counter_fields = ('member_count',)
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=200, unique=True)
@@ -62,6 +83,8 @@ class LivingWorld(models.Model):
         on_delete=models.CASCADE,
         related_name='owned_worlds'
     )
+    # Denormalized count of CommunityMemberships, maintained by core.counters.
+    member_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -95,6 +118,12 @@ class Post(models.Model):
         verbose_name = 'Post'
         verbose_name_plural = 'Posts'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='post_created_idx'),
+            models.Index(fields=['world', '-created_at', '-id'], name='post_world_created_idx'),
+            models.Index(fields=['author', 'updated_at'], name='post_author_updated_idx'),
+            models.Index(fields=['updated_at', 'id'], name='post_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.author.username} in {self.world.name}: {self.content[:50]}..."
@@ -127,11 +156,113 @@ class Friendship(models.Model):
         verbose_name = 'Friendship'
         verbose_name_plural = 'Friendships'
         unique_together = ['user1', 'user2']
+        indexes = [
+            models.Index(fields=['user1', 'updated_at'], name='friendship_user1_updated_idx'),
+            models.Index(fields=['user2', 'updated_at'], name='friendship_user2_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user1.username} - {self.user2.username} ({self.status})"
 
 
+class FriendshipEdge(models.Model):
+    """
+    One direction of an accepted Friendship.
+
+    Every accepted friendship is stored twice, as ``user -> friend`` and
+    ``friend -> user``, so that "friends of X" is a single indexed range
+    scan on ``user`` instead of an OR across both Friendship columns.
+    Rows are maintained by core.friend_graph; do not write them directly.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='friend_edges'
+    )
+    friend = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    friendship = models.ForeignKey(
+        Friendship,
+        on_delete=models.CASCADE,
+        related_name='edges'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'friendship_edge'
+        verbose_name = 'Friendship Edge'
+        verbose_name_plural = 'Friendship Edges'
+        unique_together = ['user', 'friend']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='friend_edge_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.friend_id}"
+
+
+class ConnectionRecommendation(models.Model):
+    """
+    A precomputed "people you may know" suggestion.
+
+    Rows are produced in batch by core.recommendations from mutual
+    friends and shared LivingWorld memberships, and served as-is.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='connection_recommendations'
+    )
+    candidate = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+    mutual_friends = models.PositiveIntegerField(default=0)
+    shared_worlds = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'connection_recommendation'
+        verbose_name = 'Connection Recommendation'
+        verbose_name_plural = 'Connection Recommendations'
+        unique_together = ['user', 'candidate']
+        indexes = [
+            models.Index(fields=['user', '-score'], name='recommendation_user_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.candidate_id} for {self.user_id} ({self.score:.2f})"
+
+
+class RecommendationRun(models.Model):
+    """
+    Bookkeeping for recommendation refreshes; the start time of the last
+    run is the watermark for the next incremental refresh.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    full = models.BooleanField(default=False)
+    users_refreshed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'recommendation_run'
+        verbose_name = 'Recommendation Run'
+        verbose_name_plural = 'Recommendation Runs'
+        ordering = ['-started_at']
+
+    def __str__(self):
+        kind = 'full' if self.full else 'incremental'
+        return f"{kind} run at {self.started_at} ({self.users_refreshed} users)"
+
+
 class SmartProfile(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
@@ -164,11 +295,15 @@ class VerifiableCredential(models.Model):
     credential_data = models.JSONField()
     issuer_did = models.CharField(max_length=255)
     issued_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'verifiable_credential'
         verbose_name = 'Verifiable Credential'
         verbose_name_plural = 'Verifiable Credentials'
+        indexes = [
+            models.Index(fields=['profile', 'updated_at'], name='credential_profile_updated_idx'),
+        ]
 
     def __str__(self):
         return f"VC for {self.profile.name} issued by {self.issuer_did}"
@@ -205,12 +340,18 @@ class CommunityMembership(models.Model):
         verbose_name = 'Community Membership'
         verbose_name_plural = 'Community Memberships'
         unique_together = ['profile', 'world']
+        indexes = [
+            models.Index(fields=['world', '-joined_at', '-id'], name='membership_world_joined_idx'),
+            models.Index(fields=['profile', 'updated_at'], name='membership_profile_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.profile.name} in {self.world.name} ({self.role})"
 
 
-class Proposal(models.Model):
+class Proposal(CounterCacheMixin, models.Model):
+    counter_fields = ('vote_count', 'agree_count', 'disagree_count', 'abstain_count')
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -224,6 +365,12 @@ class Proposal(models.Model):
         on_delete=models.CASCADE, 
         related_name='proposals_created'
     )
+    # Denormalized count of Votes, in total and per choice, maintained by
+    # core.counters.
+    vote_count = models.PositiveIntegerField(default=0, editable=False)
+    agree_count = models.PositiveIntegerField(default=0, editable=False)
+    disagree_count = models.PositiveIntegerField(default=0, editable=False)
+    abstain_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -232,10 +379,24 @@ class Proposal(models.Model):
         verbose_name = 'Proposal'
         verbose_name_plural = 'Proposals'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='proposal_created_idx'),
+            models.Index(fields=['world', '-created_at', '-id'], name='proposal_world_created_idx'),
+            models.Index(fields=['creator', 'updated_at'], name='proposal_creator_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} in {self.world.name}"
 
+    @property
+    def tally(self):
+        return {
+            'agree': self.agree_count,
+            'disagree': self.disagree_count,
+            'abstain': self.abstain_count,
+            'total': self.vote_count,
+        }
+
 
 class Vote(models.Model):
     CHOICE_CHOICES = [
@@ -257,29 +418,188 @@ class Vote(models.Model):
     )
     choice = models.CharField(max_length=10, choices=CHOICE_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'vote'
         verbose_name = 'Vote'
         verbose_name_plural = 'Votes'
         unique_together = ['proposal', 'voter']
+        indexes = [
+            models.Index(fields=['voter', 'updated_at'], name='vote_voter_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.voter.username} voted {self.choice} on {self.proposal.title}"
 
 
+class FundingRound(models.Model):
+    """
+    A plural voting or funding round over the proposals of a LivingWorld.
+
+    Members make Contributions to proposals, which core.quadratic
+    combines quadratically. In a ``voting`` round contributions are
+    voice credits, at most ``credit_budget`` per member, and a proposal
+    receives the square root of each member's credits as votes. In a
+    ``funding`` round they are donations, matched from ``matching_pool``
+    by the quadratic funding formula, with no proposal receiving more
+    than ``max_match_share`` of the pool. Closing a round stores its
+    final ``results``.
+    """
+    MECHANISM_CHOICES = [
+        ('voting', 'Quadratic Voting'),
+        ('funding', 'Quadratic Funding'),
+    ]
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('closed', 'Closed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    world = models.ForeignKey(
+        LivingWorld,
+        on_delete=models.CASCADE,
+        related_name='funding_rounds'
+    )
+    creator = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='funding_rounds_created'
+    )
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    mechanism = models.CharField(max_length=10, choices=MECHANISM_CHOICES, default='funding')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    matching_pool = models.DecimalField(
+        max_digits=18, decimal_places=2, default=0,
+        validators=[MinValueValidator(0)]
+    )
+    credit_budget = models.PositiveIntegerField(default=100)
+    max_match_share = models.FloatField(
+        default=1.0,
+        validators=[MinValueValidator(0.0), MaxValueValidator(1.0)]
+    )
+    results = models.JSONField(null=True, blank=True, editable=False)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'funding_round'
+        verbose_name = 'Funding Round'
+        verbose_name_plural = 'Funding Rounds'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['world', '-created_at'], name='funding_round_world_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} in {self.world.name}"
+
+
+class Contribution(models.Model):
+    """
+    A member's voice credits or donation to a proposal in a FundingRound.
+    One per member and proposal; contributing again replaces the amount.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    round = models.ForeignKey(
+        FundingRound,
+        on_delete=models.CASCADE,
+        related_name='contributions'
+    )
+    proposal = models.ForeignKey(
+        Proposal,
+        on_delete=models.CASCADE,
+        related_name='contributions'
+    )
+    contributor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='contributions'
+    )
+    amount = models.DecimalField(max_digits=18, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'contribution'
+        verbose_name = 'Contribution'
+        verbose_name_plural = 'Contributions'
+        unique_together = ['round', 'proposal', 'contributor']
+        indexes = [
+            models.Index(fields=['round', 'contributor'], name='contribution_contributor_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.contributor.username} gave {self.amount} to {self.proposal.title}"
+
+
+class OpinionAnalysis(models.Model):
+    """
+    The opinion groups and consensus found in a LivingWorld's votes.
+
+    Produced in batch by core.opinions and served as-is. ``state`` keeps
+    the model the result came from, so the next run can start from it
+    and a single voter can be placed among the groups.
+    """
+    world = models.OneToOneField(
+        LivingWorld,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='opinion_analysis'
+    )
+    result = models.JSONField(default=dict)
+    state = models.JSONField(default=dict)
+    # The newest vote change and the number of votes analyzed; the world
+    # is analyzed again when either moves.
+    vote_watermark = models.DateTimeField(null=True, blank=True)
+    votes_analyzed = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'opinion_analysis'
+        verbose_name = 'Opinion Analysis'
+        verbose_name_plural = 'Opinion Analyses'
+
+    def __str__(self):
+        return f"Opinions in {self.world.name} at {self.computed_at}"
+
+
 class DataExport(models.Model):
+    """
+    A user's data export, uploaded to IPFS.
+
+    A full export is a single gzipped NDJSON file. An incremental export
+    covers only records changed since ``previous`` and is a manifest of
+    content-addressed chunks that links back to the previous export's
+    CID (see core.exports).
+    """
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('in_progress', 'In Progress'),
         ('complete', 'Complete'),
         ('failed', 'Failed'),
     ]
+    KIND_CHOICES = [
+        ('full', 'Full'),
+        ('incremental', 'Incremental'),
+    ]
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='data_exports')
+    kind = models.CharField(max_length=11, choices=KIND_CHOICES, default='full')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     ipfs_cid = models.CharField(max_length=255, null=True, blank=True)
+    previous = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    # Records changed up to this time are covered by this export.
+    watermark = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -287,6 +607,114 @@ class DataExport(models.Model):
         db_table = 'data_export'
         verbose_name = 'Data Export'
         verbose_name_plural = 'Data Exports'
+        indexes = [
+            models.Index(fields=['user', 'status', '-watermark'], name='export_user_watermark_idx'),
+        ]
 
     def __str__(self):
         return f"Export for {self.user.username} at {self.created_at}"
+
+
+class ExportChunk(models.Model):
+    """
+    A chunk listed in an incremental DataExport's manifest.
+
+    Recorded so the chunks can be served to the export's owner alone;
+    the manifest itself lives only on IPFS.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    export = models.ForeignKey(
+        DataExport,
+        on_delete=models.CASCADE,
+        related_name='chunks'
+    )
+    index = models.PositiveIntegerField()
+    cid = models.CharField(max_length=255)
+
+    class Meta:
+        db_table = 'export_chunk'
+        verbose_name = 'Export Chunk'
+        verbose_name_plural = 'Export Chunks'
+        unique_together = ['export', 'index']
+        indexes = [
+            models.Index(fields=['cid'], name='export_chunk_cid_idx'),
+        ]
+
+    def __str__(self):
+        return f"Chunk {self.index} of export {self.export_id}"
+
+
+class PinnedContent(models.Model):
+    """
+    Content this node has uploaded to IPFS, keyed by its local sha256.
+
+    Lets core.pinning skip uploads of content that is already pinned.
+    Objects uploaded as part of a batched directory are pinned through
+    the directory, recorded in ``directory_cid``.
+    """
+    STATE_CHOICES = [
+        ('pinned', 'Pinned'),
+        ('unpinned', 'Unpinned'),
+        ('failed', 'Failed'),
+    ]
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    cid = models.CharField(max_length=255)
+    directory_cid = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField()
+    pin_state = models.CharField(max_length=10, choices=STATE_CHOICES, default='pinned')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'pinned_content'
+        verbose_name = 'Pinned Content'
+        verbose_name_plural = 'Pinned Content'
+        indexes = [
+            models.Index(fields=['cid'], name='pinned_content_cid_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.cid} ({self.pin_state})"
+
+
+class Job(models.Model):
+    """
+    A unit of background work in the database-backed job queue.
+
+    Jobs are claimed by ``manage.py run_jobs`` workers; see core.jobs
+    for claiming, retries and visibility timeouts.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    queue = models.CharField(max_length=50, default='default')
+    priority = models.IntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'job'
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        indexes = [
+            models.Index(fields=['queue', 'status', '-priority', 'run_at'], name='job_claim_idx'),
+            models.Index(fields=['task', 'status'], name='job_task_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} ({self.status})"
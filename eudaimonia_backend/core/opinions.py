@@ -0,0 +1,544 @@
+"""
+Eudaimonia Opinion Analysis
+
+Finds the opinion groups in a LivingWorld from how its members vote on
+its proposals, and the proposals every group agrees on, in the manner
+of Pol.is. Each world's votes are loaded once into a sparse matrix:
+
+    V  participants x proposals   +1 agree, -1 disagree, 0 abstain
+
+Missing votes are taken to be the proposal's average vote, so centering
+``V`` on its column means leaves every missing entry zero and the matrix
+stays sparse. Its first two principal components, found by subspace
+iteration with sparse products, place each participant on a map; their
+coordinates are scaled up by ``sqrt(proposals / votes cast)`` so those
+who voted on little are not all drawn into the middle. Participants
+with fewer than ``MIN_VOTES`` votes are left off the map.
+
+Groups are found by k-means on the map, trying 2 to ``MAX_GROUPS``
+groups and keeping the count with the best silhouette. For each group
+and proposal the agree and disagree probabilities are estimated with
+add-one smoothing; a proposal is
+
+representative of a group
+    when the group agrees (or disagrees) with it much more than everyone
+    else does;
+consensus
+    when every group agrees (or disagrees) with it with probability at
+    least ``CONSENSUS_THRESHOLD``, ranked by the product across groups.
+
+Results are stored per world in OpinionAnalysis and served as-is.
+``analyze_opinions`` only recomputes the worlds whose votes changed
+since their analysis (their newest ``updated_at`` or vote count moved),
+and starts each from the previous run's components and group centers:
+few iterations are needed when a handful of votes arrived, and groups
+keep their ids from one run to the next. ``--full`` starts afresh.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial.distance import cdist
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import Job, OpinionAnalysis, Proposal, Vote
+
+CHOICE_VALUES = {'agree': 1.0, 'disagree': -1.0, 'abstain': 0.0}
+
+# Votes a participant needs to be placed in a group (fewer if the world
+# has fewer proposals).
+MIN_VOTES = 7
+
+# Largest number of opinion groups.
+MAX_GROUPS = 5
+
+# Extra directions iterated alongside the two components, which speeds
+# up convergence when the second and third are close.
+OVERSAMPLING = 4
+
+# Subspace iteration stops when the components move less than this, or
+# after MAX_ITERATIONS.
+TOLERANCE = 1e-8
+MAX_ITERATIONS = 200
+
+KMEANS_ITERATIONS = 100
+
+# Participants sampled to score each group count; the silhouette is
+# quadratic in the sample.
+SILHOUETTE_SAMPLE = 1000
+
+# Probability with which every group must agree (or disagree).
+CONSENSUS_THRESHOLD = 0.6
+
+REPRESENTATIVE_PROPOSALS = 3
+CONSENSUS_PROPOSALS = 10
+
+# Participants drawn on the map, sampled when there are more.
+MAX_POINTS = 2000
+
+
+class VoteMatrix:
+    """
+    Sparse participants x proposals matrix of a world's votes.
+    Abstentions are stored as explicit zeros, so the sparsity pattern is
+    exactly the votes cast.
+    """
+
+    def __init__(self, votes, proposal_ids=()):
+        participant_index = {}
+        proposal_index = {pk: index for index, pk in enumerate(proposal_ids)}
+
+        rows = np.fromiter(
+            (participant_index.setdefault(v, len(participant_index)) for v, _, _ in votes),
+            dtype=np.int64, count=len(votes)
+        )
+        cols = np.fromiter(
+            (proposal_index.setdefault(p, len(proposal_index)) for _, p, _ in votes),
+            dtype=np.int64, count=len(votes)
+        )
+        values = np.fromiter(
+            (CHOICE_VALUES[choice] for _, _, choice in votes), dtype=np.float64, count=len(votes)
+        )
+
+        self.participant_ids = list(participant_index)
+        self.proposal_ids = list(proposal_index)
+        self.matrix = sparse.csr_matrix(
+            (values, (rows, cols)), shape=(len(participant_index), len(proposal_index))
+        )
+        self.matrix.sort_indices()
+
+    @classmethod
+    def load(cls, world_id):
+        votes = list(
+            Vote.objects.filter(proposal__world_id=world_id)
+            .values_list('voter_id', 'proposal_id', 'choice').iterator()
+        )
+        proposal_ids = Proposal.objects.filter(world_id=world_id).order_by(
+            'created_at', 'id'
+        ).values_list('pk', flat=True)
+        return cls(votes, list(proposal_ids))
+
+
+def _with_data(matrix, data):
+    # ``matrix``'s sparsity pattern with other values.
+    return sparse.csr_matrix((data, matrix.indices, matrix.indptr), shape=matrix.shape)
+
+
+def principal_components(centered, count, start=None, rng=None):
+    """
+    The first ``count`` principal components of ``centered`` (as
+    columns) and their singular values, by subspace iteration from the
+    columns of ``start``. Returns ``(components, singular_values,
+    iterations)``.
+    """
+    rng = rng or np.random.default_rng(0)
+    width = min(count + OVERSAMPLING, centered.shape[1])
+    basis = rng.standard_normal((centered.shape[1], width))
+    if start is not None:
+        basis[:, :start.shape[1]] = start
+    basis, _ = np.linalg.qr(basis)
+
+    transposed = centered.T.tocsr()
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        following, _ = np.linalg.qr(transposed @ (centered @ basis))
+        # Cosines of the angles between the leading subspaces.
+        overlap = np.linalg.svd(
+            basis[:, :count].T @ following[:, :count], compute_uv=False
+        )
+        basis = following
+        if overlap.min() > 1 - TOLERANCE:
+            break
+
+    # Rotate within the subspace onto the principal directions.
+    _, values, rotation = np.linalg.svd(centered @ basis, full_matrices=False)
+    components = basis @ rotation[:count].T
+    return components, values[:count], iteration
+
+
+def kmeans(points, centers, iterations=KMEANS_ITERATIONS):
+    """
+    Lloyd's k-means from ``centers``. Returns ``(labels, centers)``; a
+    center left without points keeps its position.
+    """
+    centers = centers.copy()
+    for _ in range(iterations):
+        labels = cdist(points, centers, 'sqeuclidean').argmin(axis=1)
+        counts = np.bincount(labels, minlength=len(centers))
+        sums = np.stack([
+            np.bincount(labels, weights=points[:, axis], minlength=len(centers))
+            for axis in range(points.shape[1])
+        ], axis=1)
+        moved = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        if np.allclose(moved, centers, rtol=0, atol=1e-10):
+            break
+        centers = moved
+    labels = cdist(points, centers, 'sqeuclidean').argmin(axis=1)
+    return labels, centers
+
+
+def kmeans_plus_plus(points, count, rng):
+    """
+    ``count`` initial centers chosen by k-means++.
+    """
+    centers = [points[rng.integers(len(points))]]
+    distances = ((points - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, count):
+        total = distances.sum()
+        if total <= 0:
+            index = rng.integers(len(points))
+        else:
+            index = rng.choice(len(points), p=distances / total)
+        centers.append(points[index])
+        distances = np.minimum(distances, ((points - points[index]) ** 2).sum(axis=1))
+    return np.array(centers)
+
+
+def silhouette(points, labels, count):
+    """
+    Mean silhouette of ``labels`` over ``points``.
+    """
+    distances = cdist(points, points)
+    members = np.eye(count)[labels]
+    sizes = members.sum(axis=0)
+    totals = distances @ members
+    index = np.arange(len(points))
+    own_size = sizes[labels] - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        within = totals[index, labels] / own_size
+        between = totals / sizes
+    between[index, labels] = np.inf
+    between[:, sizes == 0] = np.inf
+    nearest = between.min(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = (nearest - within) / np.maximum(within, nearest)
+    # Members of singleton groups score zero.
+    scores[(own_size == 0) | ~np.isfinite(scores)] = 0.0
+    return float(scores.mean())
+
+
+def find_groups(points, previous_centers=None, rng=None):
+    """
+    Cluster ``points`` into the number of groups (2 to ``MAX_GROUPS``)
+    with the best silhouette. A count matching ``previous_centers``
+    starts from them. Returns ``(labels, centers)``.
+    """
+    rng = rng or np.random.default_rng(0)
+    if len(points) < 3 or np.ptp(points, axis=0).max() < 1e-9:
+        return np.zeros(len(points), dtype=np.int64), points.mean(axis=0, keepdims=True)
+
+    sample = np.arange(len(points))
+    if len(points) > SILHOUETTE_SAMPLE:
+        sample = np.sort(rng.choice(len(points), SILHOUETTE_SAMPLE, replace=False))
+
+    best = None
+    for count in range(2, min(MAX_GROUPS, len(points) - 1) + 1):
+        if previous_centers is not None and len(previous_centers) == count:
+            start = previous_centers
+        else:
+            start = kmeans_plus_plus(points, count, rng)
+        labels, centers = kmeans(points, start)
+        # Drop empty groups.
+        used = np.unique(labels)
+        labels = np.searchsorted(used, labels)
+        centers = centers[used]
+        if len(used) < 2:
+            continue
+        score = silhouette(points[sample], labels[sample], len(used))
+        if best is None or score > best[0]:
+            best = (score, labels, centers)
+
+    if best is None:
+        return np.zeros(len(points), dtype=np.int64), points.mean(axis=0, keepdims=True)
+    return best[1], best[2]
+
+
+def stable_group_ids(centers, previous_groups):
+    """
+    Ids for the groups at ``centers``: each takes the id of the previous
+    group it is matched to (minimizing total distance), the rest new ids.
+    """
+    ids = [None] * len(centers)
+    if previous_groups:
+        previous = np.array([group['center'] for group in previous_groups])
+        rows, cols = linear_sum_assignment(cdist(centers, previous))
+        for row, col in zip(rows, cols):
+            ids[row] = previous_groups[col]['id']
+    next_id = max((group['id'] for group in previous_groups or ()), default=-1) + 1
+    for index, group_id in enumerate(ids):
+        if group_id is None:
+            ids[index] = next_id
+            next_id += 1
+    return ids
+
+
+def _previous_components(count, proposal_ids, previous):
+    """
+    The previous run's ``count`` components reindexed to ``proposal_ids``
+    (as columns, zero for new proposals), or None.
+    """
+    if not previous or not previous.get('components'):
+        return None
+    index = {pk: i for i, pk in enumerate(previous['proposal_ids'])}
+    old = np.asarray(previous['components'])
+    if len(old) != count:
+        return None
+    start = np.zeros((len(proposal_ids), len(old)))
+    for row, pk in enumerate(proposal_ids):
+        column = index.get(pk)
+        if column is not None:
+            start[row] = old[:, column]
+    if not np.abs(start).sum(axis=0).all():
+        return None
+    return start
+
+
+def group_statistics(votes, labels, count):
+    """
+    Per group and proposal counts of ``(agree, disagree, seen)``, as
+    ``count x proposals`` arrays.
+    """
+    members = sparse.csr_matrix(
+        (np.ones(len(labels)), (labels, np.arange(len(labels)))), shape=(count, len(labels))
+    )
+    return tuple(
+        np.asarray((members @ _with_data(votes, data)).todense())
+        for data in ((votes.data == 1).astype(float), (votes.data == -1).astype(float),
+                     np.ones_like(votes.data))
+    )
+
+
+def _representative(agree, disagree, seen, group, proposal_ids):
+    rest_agree = agree.sum(axis=0) - agree[group]
+    rest_disagree = disagree.sum(axis=0) - disagree[group]
+    rest_seen = seen.sum(axis=0) - seen[group]
+    p_agree = (agree[group] + 1) / (seen[group] + 2)
+    p_disagree = (disagree[group] + 1) / (seen[group] + 2)
+    agree_ratio = p_agree / ((rest_agree + 1) / (rest_seen + 2))
+    disagree_ratio = p_disagree / ((rest_disagree + 1) / (rest_seen + 2))
+
+    agrees = agree_ratio * p_agree >= disagree_ratio * p_disagree
+    probability = np.where(agrees, p_agree, p_disagree)
+    ratio = np.where(agrees, agree_ratio, disagree_ratio)
+    score = np.where(probability > 0.5, ratio * probability, 0.0)
+    order = np.argsort(-score, kind='stable')[:REPRESENTATIVE_PROPOSALS]
+    return [
+        {
+            'proposal_id': str(proposal_ids[i]),
+            'direction': 'agree' if agrees[i] else 'disagree',
+            'probability': round(float(probability[i]), 3),
+            'representativeness': round(float(ratio[i]), 3),
+        }
+        for i in order if score[i] > 0
+    ]
+
+
+def _consensus(agree, disagree, seen, proposal_ids):
+    entries = []
+    for direction, counts in (('agree', agree), ('disagree', disagree)):
+        probabilities = (counts + 1) / (seen + 2)
+        score = probabilities.prod(axis=0)
+        for i in np.flatnonzero(probabilities.min(axis=0) >= CONSENSUS_THRESHOLD):
+            entries.append({
+                'proposal_id': str(proposal_ids[i]),
+                'direction': direction,
+                'score': round(float(score[i]), 4),
+            })
+    entries.sort(key=lambda entry: -entry['score'])
+    return entries[:CONSENSUS_PROPOSALS]
+
+
+def analyze(votes, previous=None, seed=0):
+    """
+    Analyze a VoteMatrix. Returns ``(result, state)``: the JSON served
+    to clients and the model the next run starts from. ``previous`` is
+    the state of the previous run, if any.
+    """
+    rng = np.random.default_rng(seed)
+    matrix = votes.matrix
+    participants, proposals = matrix.shape
+    proposal_ids = [str(pk) for pk in votes.proposal_ids]
+    result = {
+        'participants': participants,
+        'clustered': 0,
+        'proposals': proposals,
+        'votes': int(matrix.nnz),
+        'explained_variance': [],
+        'groups': [],
+        'consensus': [],
+        'points': [],
+    }
+
+    cast = np.diff(matrix.indptr)
+    min_votes = min(MIN_VOTES, proposals)
+    clustered = np.flatnonzero((cast >= min_votes) & (cast > 0))
+    if proposals < 2 or len(clustered) < 2:
+        return result, {}
+
+    seen = np.bincount(matrix.indices, minlength=proposals)
+    means = np.bincount(matrix.indices, weights=matrix.data, minlength=proposals) / np.maximum(seen, 1)
+    kept = matrix[clustered]
+    centered = _with_data(kept, kept.data - means[kept.indices])
+
+    count = min(2, proposals, len(clustered))
+    start = _previous_components(count, proposal_ids, previous)
+    components, values, _ = principal_components(centered, count, start, rng)
+    if start is not None:
+        # Keep the map's orientation from one run to the next.
+        signs = np.sign((components * start).sum(axis=0))
+        components *= np.where(signs == 0, 1.0, signs)
+    else:
+        components *= np.sign(components[np.abs(components).argmax(axis=0), np.arange(count)])
+
+    points = np.asarray(centered @ components)
+    points *= np.sqrt(proposals / cast[clustered])[:, None]
+    if count < 2:
+        points = np.hstack([points, np.zeros((len(points), 1))])
+
+    previous_groups = (previous or {}).get('groups') or []
+    previous_centers = np.array([group['center'] for group in previous_groups]) if previous_groups else None
+    labels, centers = find_groups(points, previous_centers, rng)
+    group_ids = stable_group_ids(centers, previous_groups)
+
+    agree, disagree, seen_by_group = group_statistics(kept, labels, len(centers))
+    sizes = np.bincount(labels, minlength=len(centers))
+    total = float((centered.data ** 2).sum())
+
+    groups = [
+        {
+            'id': group_ids[group],
+            'size': int(sizes[group]),
+            'center': [round(float(c), 4) for c in centers[group]],
+            'representative': _representative(agree, disagree, seen_by_group, group, proposal_ids),
+        }
+        for group in np.argsort(group_ids)
+    ]
+
+    shown = np.arange(len(points))
+    if len(points) > MAX_POINTS:
+        shown = np.sort(rng.choice(len(points), MAX_POINTS, replace=False))
+
+    result.update(
+        clustered=len(clustered),
+        explained_variance=[round(float(v * v / total), 4) if total else 0.0 for v in values],
+        groups=groups,
+        consensus=_consensus(agree, disagree, seen_by_group, proposal_ids),
+        points=[
+            [round(float(points[i, 0]), 3), round(float(points[i, 1]), 3), group_ids[labels[i]]]
+            for i in shown
+        ],
+    )
+    state = {
+        'proposal_ids': proposal_ids,
+        'means': means.round(6).tolist(),
+        'components': components.T.round(8).tolist(),
+        'groups': [{'id': group['id'], 'center': group['center']} for group in groups],
+        'min_votes': min_votes,
+    }
+    return result, state
+
+
+def place_participant(analysis, user):
+    """
+    Where ``user``'s votes put them on ``analysis``'s map: ``x``, ``y``,
+    the nearest ``group`` (None with too few votes) and ``votes`` cast.
+    None if they have not voted on an analyzed proposal.
+    """
+    state = analysis.state
+    if not state.get('components'):
+        return None
+    index = {pk: i for i, pk in enumerate(state['proposal_ids'])}
+    cols, values = [], []
+    for proposal_id, choice in Vote.objects.filter(
+        voter=user, proposal__world_id=analysis.world_id
+    ).values_list('proposal_id', 'choice'):
+        column = index.get(str(proposal_id))
+        if column is not None:
+            cols.append(column)
+            values.append(CHOICE_VALUES[choice])
+    if not cols:
+        return None
+
+    components = np.asarray(state['components'])
+    centered = np.asarray(values) - np.asarray(state['means'])[cols]
+    point = components[:, cols] @ centered * np.sqrt(len(index) / len(cols))
+    if len(point) < 2:
+        point = np.append(point, 0.0)
+
+    group = None
+    if len(cols) >= state['min_votes'] and state['groups']:
+        centers = np.array([g['center'] for g in state['groups']])
+        group = state['groups'][int(((centers - point) ** 2).sum(axis=1).argmin())]['id']
+    return {
+        'x': round(float(point[0]), 3),
+        'y': round(float(point[1]), 3),
+        'group': group,
+        'votes': len(cols),
+    }
+
+
+def vote_versions(world_ids=None):
+    """
+    ``{world_id: (newest vote updated_at, vote count)}`` for the worlds
+    with votes.
+    """
+    votes = Vote.objects.values('proposal__world_id')
+    if world_ids is not None:
+        votes = votes.filter(proposal__world_id__in=world_ids)
+    return {
+        row['proposal__world_id']: (row['latest'], row['count'])
+        for row in votes.annotate(latest=Max('updated_at'), count=Count('id')).order_by()
+    }
+
+
+def analyze_opinions(world_ids=None, full=False):
+    """
+    Analyze the worlds in ``world_ids`` (all by default) whose votes
+    changed since their last analysis, or every one with ``full``.
+    Returns the number of worlds analyzed.
+    """
+    current = vote_versions(world_ids)
+    analyses = OpinionAnalysis.objects.all()
+    if world_ids is not None:
+        analyses = analyses.filter(world_id__in=world_ids)
+    previous = {
+        analysis.world_id: analysis
+        for analysis in analyses.only('world_id', 'state', 'vote_watermark', 'votes_analyzed')
+    }
+
+    worlds = set(current) | set(previous)
+    if not full:
+        worlds = {
+            world_id for world_id in worlds
+            if world_id not in previous
+            or current.get(world_id, (None, 0))
+            != (previous[world_id].vote_watermark, previous[world_id].votes_analyzed)
+        }
+
+    for world_id in worlds:
+        watermark, count = current.get(world_id, (None, 0))
+        analysis = previous.get(world_id)
+        result, state = analyze(
+            VoteMatrix.load(world_id), None if full or analysis is None else analysis.state
+        )
+        OpinionAnalysis.objects.update_or_create(world_id=world_id, defaults={
+            'result': result,
+            'state': state,
+            'vote_watermark': watermark,
+            'votes_analyzed': count,
+            'computed_at': timezone.now(),
+        })
+    return len(worlds)
+
+
+def schedule_analysis():
+    """
+    Queue an analysis run in ``OPINION_ANALYSIS_DELAY`` seconds, unless
+    one is already queued; votes cast meanwhile share it.
+    """
+    if not Job.objects.filter(task='core.analyze_opinions', status='queued').exists():
+        enqueue('core.analyze_opinions', delay=timedelta(seconds=settings.OPINION_ANALYSIS_DELAY))
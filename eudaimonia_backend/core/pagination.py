@@ -0,0 +1,184 @@
+"""
+Eudaimonia Core Pagination
+
+This module provides keyset (cursor) pagination for the API. Instead of
+OFFSET/LIMIT with a COUNT(*) per request, pages are addressed by the
+position of their boundary row, ordered by a timestamp and the primary
+key as a tie-breaker. The cost of fetching a page is therefore the same
+on page 1 and page 10,000 of a busy LivingWorld.
+"""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination keyed on ``(cursor_field, pk)``, newest first.
+
+    Cursors are opaque, URL-safe tokens holding the boundary row's
+    position, so they stay valid while new rows are inserted ahead of
+    them. No COUNT query is ever issued. The cursor field defaults to
+    ``created_at`` and can be overridden per view with a ``cursor_field``
+    attribute, or per call by passing ``cursor_field`` to the constructor.
+    """
+    cursor_query_param = 'cursor'
+    cursor_query_description = _('The pagination cursor value.')
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    page_size_query_description = _('Number of results to return per page.')
+    max_page_size = 100
+    cursor_field = 'created_at'
+    invalid_cursor_message = _('Invalid cursor')
+
+    def __init__(self, cursor_field=None):
+        self._cursor_field_override = cursor_field
+
+    def get_cursor_field(self, view):
+        return (
+            self._cursor_field_override
+            or getattr(view, 'cursor_field', None)
+            or self.cursor_field
+        )
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.field = self.get_cursor_field(view)
+        cursor = self.decode_cursor(request, queryset.model)
+
+        if cursor is None:
+            reverse = False
+            queryset = queryset.order_by(f'-{self.field}', '-pk')
+        else:
+            value, pk, reverse = cursor
+            if reverse:
+                queryset = queryset.filter(
+                    **{f'{self.field}__gte': value}
+                ).filter(
+                    Q(**{f'{self.field}__gt': value}) | Q(pk__gt=pk)
+                ).order_by(self.field, 'pk')
+            else:
+                queryset = queryset.filter(
+                    **{f'{self.field}__lte': value}
+                ).filter(
+                    Q(**{f'{self.field}__lt': value}) | Q(pk__lt=pk)
+                ).order_by(f'-{self.field}', '-pk')
+
+        # Fetch one extra row to learn whether another page follows.
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request, model):
+        """
+        Return ``(value, pk, reverse)`` for the request's cursor, or None.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            value = parse_datetime(payload['v'])
+            pk = model._meta.pk.to_python(payload['pk'])
+            reverse = bool(payload.get('r', False))
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error,
+                ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk, reverse
+
+    def encode_cursor(self, obj, reverse):
+        payload = {'v': getattr(obj, self.field).isoformat(), 'pk': str(obj.pk)}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':')).encode('ascii')
+        ).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': str(self.cursor_query_description),
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': str(self.page_size_query_description),
+                'schema': {'type': 'integer'},
+            },
+        ]
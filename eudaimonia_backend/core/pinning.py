@@ -0,0 +1,174 @@
+"""
+Eudaimonia IPFS Pinning
+
+Deduplicated, batched uploads to IPFS. Content is hashed locally
+(sha256) before upload and looked up in ``PinnedContent``; content that
+is already pinned is not sent again, so uploading unchanged data costs
+one database lookup and no network I/O.
+
+Small objects are uploaded together, one directory per batch (a single
+add request, pinned through the directory root), instead of one request
+each. Large objects and file streams are uploaded on their own.
+
+Pin state is tracked in the database and can drift if pins are removed
+on the node directly; ``sync_pin_state`` re-reads it from the node.
+"""
+
+import hashlib
+
+from .ipfs_service import IPFSService
+from .models import PinnedContent
+
+# Objects smaller than this are uploaded in batched directories.
+BATCH_THRESHOLD = 256 * 1024
+
+# Upper bounds for a single batched directory upload.
+BATCH_MAX_BYTES = 8 * 1024 * 1024
+BATCH_MAX_FILES = 500
+
+# Bytes read per step when hashing a stream.
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_of(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_of_stream(fileobj):
+    """
+    Return ``(hex digest, size)`` of the rest of ``fileobj``, leaving its
+    position unchanged.
+    """
+    start = fileobj.tell()
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(start)
+    return digest.hexdigest(), size
+
+
+class PinningManager:
+    """
+    Uploads content to IPFS at most once, recording what is pinned.
+
+    The IPFS service is only created when something actually has to be
+    uploaded, so fully deduplicated work needs no node at all.
+    """
+
+    def __init__(self, ipfs=None, batch_threshold=BATCH_THRESHOLD,
+                 batch_max_bytes=BATCH_MAX_BYTES, batch_max_files=BATCH_MAX_FILES):
+        self._ipfs = ipfs
+        self.batch_threshold = batch_threshold
+        self.batch_max_bytes = batch_max_bytes
+        self.batch_max_files = batch_max_files
+
+    @property
+    def ipfs(self):
+        if self._ipfs is None:
+            self._ipfs = IPFSService()
+        return self._ipfs
+
+    def known(self, digests):
+        """
+        Map each digest in ``digests`` that is already pinned to its CID.
+        """
+        return dict(
+            PinnedContent.objects.filter(
+                sha256__in=list(digests), pin_state='pinned'
+            ).values_list('sha256', 'cid')
+        )
+
+    def add_bytes(self, data):
+        return self.add_many([data])[0]
+
+    def add_many(self, blobs):
+        """
+        Upload every blob not already pinned and return all their CIDs,
+        in the order given.
+        """
+        digests = [sha256_of(blob) for blob in blobs]
+        cids = self.known(digests)
+
+        missing = {}
+        for digest, blob in zip(digests, blobs):
+            if digest not in cids:
+                missing.setdefault(digest, blob)
+
+        records = []
+        try:
+            small = []
+            for digest, blob in missing.items():
+                if len(blob) < self.batch_threshold:
+                    small.append((digest, blob))
+                    continue
+                records.append(PinnedContent(
+                    sha256=digest, cid=self.ipfs.add_file(blob), size=len(blob)
+                ))
+            for batch in self._batches(small):
+                directory_cid, batch_cids = self.ipfs.add_directory(dict(batch))
+                records.extend(
+                    PinnedContent(
+                        sha256=digest, cid=batch_cids[digest],
+                        directory_cid=directory_cid, size=len(blob)
+                    )
+                    for digest, blob in batch
+                )
+        finally:
+            # Keep whatever made it to the node even if a later batch failed.
+            self._record(records)
+
+        cids.update((record.sha256, record.cid) for record in records)
+        return [cids[digest] for digest in digests]
+
+    def add_stream(self, fileobj):
+        """
+        Upload a seekable file object unless its content is already
+        pinned. Returns the CID.
+        """
+        digest, size = sha256_of_stream(fileobj)
+        cid = self.known([digest]).get(digest)
+        if cid is None:
+            cid = self.ipfs.add_stream(fileobj)
+            self._record([PinnedContent(sha256=digest, cid=cid, size=size)])
+        return cid
+
+    def _batches(self, items):
+        batch, batch_bytes = [], 0
+        for digest, blob in items:
+            if batch and (
+                len(batch) >= self.batch_max_files
+                or batch_bytes + len(blob) > self.batch_max_bytes
+            ):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append((digest, blob))
+            batch_bytes += len(blob)
+        if batch:
+            yield batch
+
+    def _record(self, records):
+        if not records:
+            return
+        PinnedContent.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=['sha256'],
+            update_fields=['cid', 'directory_cid', 'size', 'pin_state', 'updated_at'],
+        )
+
+    def sync_pin_state(self):
+        """
+        Reconcile ``pin_state`` with the node's recursive pins. Returns
+        the number of rows whose state changed.
+        """
+        pinned = self.ipfs.pinned()
+        changed = 0
+        for row in PinnedContent.objects.only('sha256', 'cid', 'directory_cid', 'pin_state').iterator():
+            state = 'pinned' if (row.directory_cid or row.cid) in pinned else 'unpinned'
+            if state != row.pin_state:
+                row.pin_state = state
+                row.save(update_fields=['pin_state', 'updated_at'])
+                changed += 1
+        return changed
@@ -0,0 +1,280 @@
+"""
+Eudaimonia Post Index
+
+Vector index over ``Post.content`` for retrieval by the AI companion.
+Vectors come from the configured embedder (see core.embeddings) and are
+stored on disk in one shard per LivingWorld, as two flat files under
+``POST_INDEX_DIR/<embedder name>/``:
+
+    <world_id>.f32   rows of ``dim`` float32, unit length
+    <world_id>.ids   the matching post UUIDs, 16 bytes each
+
+Readers memory-map the shards, so every process on a host shares one
+copy of the vectors in the page cache, and a search over the worlds a
+user belongs to is one matrix-vector product per world.
+
+``index_posts`` brings the index up to date. Incremental runs embed the
+posts updated since the previous run (a watermark in ``state.json``):
+new posts are appended to their shard, edited ones overwritten in place.
+A post moved to another world has its old row zeroed, which no query can
+match. Deletions carry no timestamp; retrieval skips posts that no
+longer exist and a periodic ``--full`` rebuild drops their rows. Only
+one indexer may run at a time (the ``core.index_posts`` task has
+concurrency 1); readers may search while it runs.
+"""
+
+import json
+import os
+import shutil
+import uuid
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .embeddings import get_embedder
+from .jobs import enqueue
+from .models import Job, Post
+
+# Posts embedded per batch.
+BATCH_SIZE = 512
+
+# Posts updated this long before the previous run are embedded again, so
+# rows committed late by a long transaction are not missed.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Retrieved posts scoring below this cosine similarity are dropped.
+MIN_SIMILARITY = 0.1
+
+# Raw 16-byte UUIDs (not 'S16', which would strip trailing NUL bytes).
+ID_DTYPE = np.dtype((np.void, 16))
+
+
+class PostIndex:
+    """
+    The on-disk post index for one embedder.
+    """
+
+    def __init__(self, directory=None, embedder=None):
+        self.embedder = embedder or get_embedder()
+        root = directory or settings.POST_INDEX_DIR
+        self.directory = os.path.join(root, self.embedder.name)
+        self._shards = {}
+
+    def _path(self, world_id, suffix, directory=None):
+        return os.path.join(directory or self.directory, f'{world_id}.{suffix}')
+
+    def _shard(self, world_id):
+        """
+        ``(vectors, ids)`` memory maps for ``world_id``, or None if the
+        world has no indexed posts. Remapped when the shard grows or is
+        replaced by a rebuild.
+        """
+        path, ids_path = self._path(world_id, 'f32'), self._path(world_id, 'ids')
+        try:
+            stat, ids_stat = os.stat(path), os.stat(ids_path)
+        except FileNotFoundError:
+            # No posts, or the first batch for this world is being written.
+            return None
+        signature = (stat.st_ino, stat.st_size, ids_stat.st_size)
+        cached = self._shards.get(world_id)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        ids = np.fromfile(ids_path, dtype=ID_DTYPE)
+        rows = min(stat.st_size // (4 * self.embedder.dim), len(ids))
+        if not rows:
+            return None
+        vectors = np.memmap(path, dtype=np.float32, mode='r', shape=(rows, self.embedder.dim))
+        shard = (vectors, ids[:rows])
+        self._shards[world_id] = (signature, shard)
+        return shard
+
+    def search(self, vector, world_ids, k=5):
+        """
+        Return the ``k`` best ``(score, post_id, world_id)`` matches for
+        ``vector`` among the posts of ``world_ids``, best first.
+        """
+        results = []
+        for world_id in world_ids:
+            shard = self._shard(world_id)
+            if shard is None:
+                continue
+            vectors, ids = shard
+            scores = vectors @ vector
+            if len(scores) > k:
+                top = np.argpartition(scores, -k)[-k:]
+            else:
+                top = np.arange(len(scores))
+            results.extend(
+                (float(scores[row]), uuid.UUID(bytes=ids[row].tobytes()), world_id) for row in top
+            )
+        results.sort(key=lambda result: result[0], reverse=True)
+        return results[:k]
+
+    def watermark(self):
+        try:
+            with open(os.path.join(self.directory, 'state.json')) as f:
+                return parse_datetime(json.load(f)['watermark'])
+        except FileNotFoundError:
+            return None
+
+    def writer(self, full=False):
+        return _IndexWriter(self, full)
+
+
+class _IndexWriter:
+    """
+    Applies embedded posts to the shards. A full rebuild writes a fresh
+    directory and swaps it in when committed.
+    """
+
+    def __init__(self, index, full):
+        self.index = index
+        self.full = full
+        self.directory = index.directory + '.new' if full else index.directory
+        if full:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+        # post id -> (world id, row), loaded lazily for incremental runs.
+        self._locations = {} if full else None
+
+    def _load_locations(self):
+        locations = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith('.ids'):
+                continue
+            world_id = name[:-len('.ids')]
+            ids = np.fromfile(os.path.join(self.directory, name), dtype=ID_DTYPE)
+            for row, post_id in enumerate(ids):
+                locations[post_id.tobytes()] = (world_id, row)
+        return locations
+
+    def _overwrite(self, world_id, row, vector):
+        with open(self.index._path(world_id, 'f32', self.directory), 'r+b') as f:
+            f.seek(row * vector.nbytes)
+            f.write(vector.tobytes())
+
+    def upsert(self, post_ids, world_ids, vectors):
+        if self._locations is None:
+            self._locations = self._load_locations()
+        appends = {}
+        for post_id, world_id, vector in zip(post_ids, world_ids, vectors):
+            key, world_id = post_id.bytes, str(world_id)
+            location = self._locations.get(key)
+            if location is not None and location[0] == world_id:
+                self._overwrite(world_id, location[1], vector)
+                continue
+            if location is not None:
+                self._overwrite(location[0], location[1], np.zeros_like(vector))
+            appends.setdefault(world_id, []).append((key, vector))
+
+        for world_id, rows in appends.items():
+            ids_path = self.index._path(world_id, 'ids', self.directory)
+            start = os.path.getsize(ids_path) // ID_DTYPE.itemsize if os.path.exists(ids_path) else 0
+            # Vectors first: readers only use rows that have an id.
+            with open(self.index._path(world_id, 'f32', self.directory), 'ab') as f:
+                f.write(np.stack([vector for _, vector in rows]).astype(np.float32).tobytes())
+            with open(ids_path, 'ab') as f:
+                f.write(b''.join(key for key, _ in rows))
+            for offset, (key, _) in enumerate(rows):
+                self._locations[key] = (world_id, start + offset)
+
+    def commit(self, watermark):
+        with open(os.path.join(self.directory, 'state.json'), 'w') as f:
+            json.dump({'watermark': watermark.isoformat()}, f)
+        if self.full:
+            retired = self.index.directory + '.old'
+            shutil.rmtree(retired, ignore_errors=True)
+            if os.path.exists(self.index.directory):
+                os.replace(self.index.directory, retired)
+            os.replace(self.directory, self.index.directory)
+            shutil.rmtree(retired, ignore_errors=True)
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def index_posts(full=False, batch_size=BATCH_SIZE, index=None):
+    """
+    Embed posts changed since the previous run (all posts if ``full`` or
+    on the first run) into the index. Returns the number embedded.
+    """
+    index = index or get_post_index()
+    since = None if full else index.watermark()
+    started = timezone.now()
+
+    posts = Post.objects.order_by('updated_at', 'pk').values_list('pk', 'world_id', 'content')
+    if since is not None:
+        posts = posts.filter(updated_at__gte=since - WATERMARK_OVERLAP)
+
+    writer = index.writer(full=full or since is None)
+    count = 0
+    for batch in _batches(posts.iterator(chunk_size=batch_size), batch_size):
+        post_ids, world_ids, contents = zip(*batch)
+        writer.upsert(post_ids, world_ids, index.embedder.embed(contents))
+        count += len(batch)
+    writer.commit(started)
+    return count
+
+
+def schedule_indexing():
+    """
+    Queue an incremental index run in ``POST_INDEX_DELAY`` seconds,
+    unless one is already queued; posts created meanwhile share it.
+    """
+    if not Job.objects.filter(task='core.index_posts', status='queued').exists():
+        enqueue('core.index_posts', delay=timedelta(seconds=settings.POST_INDEX_DELAY))
+
+
+def retrieve_posts(query, world_ids, k=5, exclude_author=None, index=None):
+    """
+    Return up to ``k`` ``(score, post)`` pairs for the posts in
+    ``world_ids`` most similar to ``query``, best first.
+    """
+    if not world_ids or not query.strip():
+        return []
+    index = index or get_post_index()
+    vector = index.embedder.embed([query])[0]
+    # Ask for extra matches to make up for deleted and excluded posts.
+    matches = [
+        match for match in index.search(vector, [str(pk) for pk in world_ids], k * 2)
+        if match[0] >= MIN_SIMILARITY
+    ]
+    if not matches:
+        return []
+
+    posts = Post.objects.filter(pk__in=[post_id for _, post_id, _ in matches])
+    if exclude_author is not None:
+        posts = posts.exclude(author=exclude_author)
+    posts = {
+        post.pk: post
+        for post in posts.select_related('author', 'world').only(
+            'content', 'created_at', 'author__username', 'world__name'
+        )
+    }
+    return [(score, posts[post_id]) for score, post_id, _ in matches if post_id in posts][:k]
+
+
+_indexes = {}
+
+
+def get_post_index():
+    """
+    Return the process-wide PostIndex for the configured embedder.
+    """
+    embedder = get_embedder()
+    index = _indexes.get(embedder.name)
+    if index is None:
+        index = _indexes[embedder.name] = PostIndex(embedder=embedder)
+    return index
@@ -0,0 +1,118 @@
+"""
+Eudaimonia Query Planning for Serializers
+
+Nested serializers walk relations object by object, which turns a list
+endpoint into one query per row per relation. This module derives the
+``select_related``/``prefetch_related`` lookups a serializer needs from
+its declared fields, so viewsets can fetch everything a page renders in
+a bounded number of queries regardless of page size.
+
+Nested serializer fields declare their needs implicitly. Relations read
+by ``SerializerMethodField``s or other custom code can be declared on
+the serializer's ``Meta`` as ``select_related`` / ``prefetch_related``.
+"""
+
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def _relation_kind(model, path):
+    """
+    Classify a dotted relation ``path`` on ``model``.
+
+    Returns ``'select'`` when every hop is single-valued, ``'prefetch'``
+    when any hop is multi-valued, and None when the path is not a chain
+    of relations (e.g. a property or a plain column).
+    """
+    kind = 'select'
+    for name in path:
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not field.is_relation or field.related_model is None:
+            return None
+        if field.many_to_many or field.one_to_many:
+            kind = 'prefetch'
+        model = field.related_model
+    return kind
+
+
+def _collect(serializer, model, prefix, select, prefetch, in_prefetch):
+    meta = getattr(serializer, 'Meta', None)
+    for lookup in getattr(meta, 'select_related', ()):
+        (prefetch if in_prefetch else select).add(prefix + lookup)
+    for lookup in getattr(meta, 'prefetch_related', ()):
+        prefetch.add(prefix + lookup)
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        many = isinstance(field, serializers.ListSerializer)
+        nested = field.child if many else field
+        if not isinstance(nested, serializers.ModelSerializer):
+            continue
+        if not field.source_attrs or field.source == '*':
+            continue
+
+        kind = _relation_kind(model, field.source_attrs)
+        if kind is None:
+            continue
+
+        lookup = prefix + '__'.join(field.source_attrs)
+        child_in_prefetch = in_prefetch or kind == 'prefetch'
+        (prefetch if child_in_prefetch else select).add(lookup)
+        _collect(
+            nested, nested.Meta.model, lookup + '__',
+            select, prefetch, child_in_prefetch
+        )
+
+
+@lru_cache(maxsize=None)
+def related_lookups(serializer_class):
+    """
+    Return ``(select_related, prefetch_related)`` tuples for a serializer.
+
+    Lookups are computed once per serializer class.
+    """
+    select, prefetch = set(), set()
+    serializer = serializer_class()
+    _collect(serializer, serializer.Meta.model, '', select, prefetch, False)
+
+    # select_related('a__b') already implies 'a'; keep the longest paths.
+    select = {
+        lookup for lookup in select
+        if not any(other.startswith(lookup + '__') for other in select)
+    }
+    return tuple(sorted(select)), tuple(sorted(prefetch))
+
+
+def optimize_queryset(queryset, serializer_class):
+    """
+    Apply the serializer's relation needs to ``queryset``.
+    """
+    if not issubclass(serializer_class, serializers.ModelSerializer):
+        return queryset
+    select, prefetch = related_lookups(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class OptimizedQuerySetMixin:
+    """
+    ViewSet mixin that plans the queryset from ``get_serializer_class()``.
+
+    Hooks ``filter_queryset`` so it applies to list, retrieve and the
+    object lookups of write actions alike, including viewsets that
+    override ``get_queryset``.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return optimize_queryset(queryset, self.get_serializer_class())
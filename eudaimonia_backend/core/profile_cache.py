@@ -0,0 +1,153 @@
+"""
+Eudaimonia Faceted Profile Cache
+
+The faceted profile (a user plus their memberships across LivingWorlds)
+is read on every profile view and every AI companion request, but only
+changes when a membership, SmartProfile, world name/description or the
+user's own details change. This module serves it from a cache and
+invalidates it precisely on those events.
+
+Each user has a profile *version* token stored in the cache; documents
+are stored under a key that includes the version, so invalidation is a
+single write of a fresh token and stale documents simply age out. The
+version is also usable by other caches derived from the profile (e.g.
+prompt context) as part of their own keys.
+
+The backend is the ``profiles`` entry of ``CACHES`` (see settings), so
+tests can use locmem or file caches and production a shared cache.
+Bulk queryset ``update()``/``delete()`` calls bypass the signals below
+and must call ``invalidate_profiles`` themselves.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import CommunityMembership, LivingWorld, SmartProfile
+from .serializers import FacetedProfileSerializer
+
+User = get_user_model()
+
+# Bump when the shape of FacetedProfileSerializer output changes.
+DOCUMENT_SCHEMA = 1
+
+# User fields that appear in the faceted profile document.
+PROFILE_USER_FIELDS = {'username', 'email', 'date_joined'}
+
+# LivingWorld fields that appear in the faceted profile document.
+PROFILE_WORLD_FIELDS = ('name', 'description')
+
+
+def get_profile_cache():
+    return caches[getattr(settings, 'PROFILE_CACHE_ALIAS', 'profiles')]
+
+
+def _version_key(user_id):
+    return f'faceted-profile:{DOCUMENT_SCHEMA}:version:{user_id}'
+
+
+def _document_key(user_id, version):
+    return f'faceted-profile:{DOCUMENT_SCHEMA}:{user_id}:{version}'
+
+
+def get_profile_version(user_id):
+    """
+    Return the current profile version token for ``user_id``.
+    """
+    cache = get_profile_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_faceted_profile(user):
+    """
+    Return the faceted profile document for ``user``, from cache if current.
+    """
+    cache = get_profile_cache()
+    key = _document_key(user.pk, get_profile_version(user.pk))
+    document = cache.get(key)
+    if document is None:
+        document = FacetedProfileSerializer(user).data
+        cache.set(key, document)
+    return document
+
+
+def invalidate_profiles(user_ids):
+    """
+    Invalidate the faceted profiles of ``user_ids`` once the current
+    transaction commits, so readers never cache uncommitted state under
+    the new version.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+
+    def bump():
+        get_profile_cache().set_many(
+            {_version_key(user_id): uuid.uuid4().hex for user_id in user_ids},
+            timeout=None
+        )
+
+    transaction.on_commit(bump)
+
+
+def _membership_owner(membership):
+    if CommunityMembership.profile.is_cached(membership):
+        return membership.profile.user_id
+    return SmartProfile.objects.filter(
+        pk=membership.profile_id
+    ).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=CommunityMembership)
+@receiver(post_delete, sender=CommunityMembership)
+def membership_changed(sender, instance, **kwargs):
+    invalidate_profiles([_membership_owner(instance)])
+
+
+@receiver(post_save, sender=SmartProfile)
+@receiver(post_delete, sender=SmartProfile)
+def smart_profile_changed(sender, instance, **kwargs):
+    invalidate_profiles([instance.user_id])
+
+
+@receiver(pre_save, sender=LivingWorld)
+def world_about_to_change(sender, instance, update_fields=None, **kwargs):
+    instance._profile_fields_changed = False
+    if instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(PROFILE_WORLD_FIELDS):
+        return
+    previous = LivingWorld.objects.filter(pk=instance.pk).values(*PROFILE_WORLD_FIELDS).first()
+    instance._profile_fields_changed = previous is not None and any(
+        previous[field] != getattr(instance, field) for field in PROFILE_WORLD_FIELDS
+    )
+
+
+@receiver(post_save, sender=LivingWorld)
+def world_changed(sender, instance, created, **kwargs):
+    if created or not getattr(instance, '_profile_fields_changed', False):
+        return
+    invalidate_profiles(
+        SmartProfile.objects.filter(
+            community_memberships__world=instance
+        ).values_list('user_id', flat=True).distinct()
+    )
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not set(update_fields) & PROFILE_USER_FIELDS:
+        return
+    invalidate_profiles([instance.pk])
@@ -0,0 +1,237 @@
+"""
+Eudaimonia Quadratic Voting and Funding
+
+Computes the results of a FundingRound from its contributions, loaded
+once into a sparse matrix:
+
+    C  contributors x proposals   amount each contributor gave each proposal
+
+Quadratic voting
+    A contributor spending ``c`` voice credits on a proposal casts
+    ``sqrt(c)`` votes for it, so a proposal's votes are the column sums
+    of ``sqrt(C)``. Contributors over the round's credit budget have
+    their credits scaled down to it.
+
+Quadratic funding
+    A proposal's ideal match is ``(sum of sqrt(c))^2 - sum of c`` over
+    its contributors: broad support is matched far more than the same
+    total from a few. Ideal matches are scaled by one common factor to
+    fit the matching pool, with no proposal receiving more than
+    ``max_share`` of it; what a capped proposal cannot take goes to the
+    others.
+
+Both are a handful of vectorized operations over the nonzero entries,
+so a round with tens of thousands of contributors is computed in a few
+milliseconds; loading the contributions dominates.
+"""
+
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Contribution, FundingRound, Proposal
+
+
+class ContributionMatrix:
+    """
+    Sparse contributors x proposals matrix of contribution amounts.
+    Repeated (contributor, proposal) pairs are summed.
+    """
+
+    def __init__(self, contributions, proposal_ids=()):
+        contributor_index = {}
+        proposal_index = {pk: index for index, pk in enumerate(proposal_ids)}
+
+        rows = np.fromiter(
+            (contributor_index.setdefault(c, len(contributor_index)) for c, _, _ in contributions),
+            dtype=np.int64, count=len(contributions)
+        )
+        cols = np.fromiter(
+            (proposal_index.setdefault(p, len(proposal_index)) for _, p, _ in contributions),
+            dtype=np.int64, count=len(contributions)
+        )
+        amounts = np.fromiter(
+            (amount for _, _, amount in contributions), dtype=np.float64, count=len(contributions)
+        )
+
+        self.proposal_ids = np.empty(len(proposal_index), dtype=object)
+        for pk, index in proposal_index.items():
+            self.proposal_ids[index] = pk
+        self.matrix = sparse.csr_matrix(
+            (amounts, (rows, cols)), shape=(len(contributor_index), len(proposal_index))
+        )
+        self.matrix.sum_duplicates()
+        self.matrix.eliminate_zeros()
+
+    @classmethod
+    def from_arrays(cls, rows, cols, amounts, shape):
+        """
+        Build a matrix from index arrays directly (for benchmarks).
+        """
+        instance = cls.__new__(cls)
+        instance.proposal_ids = np.arange(shape[1])
+        instance.matrix = sparse.csr_matrix((amounts, (rows, cols)), shape=shape)
+        instance.matrix.sum_duplicates()
+        instance.matrix.eliminate_zeros()
+        return instance
+
+    @classmethod
+    def load(cls, funding_round):
+        contributions = list(
+            Contribution.objects.filter(round=funding_round)
+            .values_list('contributor_id', 'proposal_id', 'amount').iterator()
+        )
+        proposal_ids = Proposal.objects.filter(world_id=funding_round.world_id).values_list('pk', flat=True)
+        return cls(contributions, list(proposal_ids))
+
+
+def _column(values):
+    return np.asarray(values).ravel()
+
+
+def _supporters(matrix):
+    # Nonzero entries per column, without converting to CSC.
+    return np.bincount(matrix.indices, minlength=matrix.shape[1])
+
+
+def clamp_budgets(matrix, budget):
+    """
+    Scale down the rows of ``matrix`` whose total exceeds ``budget``.
+    """
+    totals = _column(matrix.sum(axis=1))
+    over = totals > budget
+    if not over.any():
+        return matrix
+    scale = np.ones_like(totals)
+    scale[over] = budget / totals[over]
+    clamped = matrix.copy()
+    clamped.data *= np.repeat(scale, np.diff(matrix.indptr))
+    return clamped
+
+
+def quadratic_votes(contributions, budget=None):
+    """
+    Quadratic voting totals per proposal: ``voters``, ``credits`` spent
+    and ``votes`` (the sum of the square roots of the credits).
+    """
+    matrix = contributions.matrix
+    if budget is not None:
+        matrix = clamp_budgets(matrix, budget)
+    return {
+        'voters': _supporters(matrix),
+        'credits': _column(matrix.sum(axis=0)),
+        'votes': _column(matrix.sqrt().sum(axis=0)),
+    }
+
+
+def allocate_matching(ideal, pool, max_share=1.0):
+    """
+    Scale ``ideal`` matches by a common factor (at most 1) to spend
+    ``pool``, no entry exceeding ``max_share * pool``.
+    """
+    ideal = np.asarray(ideal, dtype=np.float64)
+    cap = max_share * pool
+    if not len(ideal) or pool <= 0:
+        return np.zeros_like(ideal)
+    if np.minimum(ideal, cap).sum() <= pool:
+        return np.minimum(ideal, cap)
+
+    # As the factor grows, entries reach the cap largest ideal first.
+    # With the k largest capped, the factor spending the pool exactly
+    # is (pool - k * cap) / (sum of the other ideals); the right k is
+    # the first whose factor stays below the next entry's breakpoint.
+    order = np.argsort(-ideal)
+    ranked = ideal[order]
+    with np.errstate(divide='ignore'):
+        breakpoints = np.where(ranked > 0, cap / ranked, np.inf)
+    remaining = np.concatenate([np.cumsum(ranked[::-1])[::-1], [0.0]])
+    capped = np.arange(len(ranked) + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factors = (pool - capped * cap) / remaining
+    upper = np.concatenate([breakpoints, [np.inf]])
+    k = int(np.argmax(factors <= upper))
+    return np.minimum(factors[k] * ideal, cap)
+
+
+def quadratic_funding(contributions, pool, max_share=1.0):
+    """
+    Quadratic funding totals per proposal: ``contributors``,
+    ``contributed``, the ``ideal`` match and the ``match`` paid from
+    ``pool``.
+    """
+    matrix = contributions.matrix
+    contributed = _column(matrix.sum(axis=0))
+    ideal = np.maximum(_column(matrix.sqrt().sum(axis=0)) ** 2 - contributed, 0.0)
+    return {
+        'contributors': _supporters(matrix),
+        'contributed': contributed,
+        'ideal': ideal,
+        'match': allocate_matching(ideal, pool, max_share),
+    }
+
+
+def compute_results(funding_round, contributions=None):
+    """
+    The results of ``funding_round``: one entry per proposal of its
+    world, best first.
+    """
+    contributions = contributions or ContributionMatrix.load(funding_round)
+    proposal_ids = contributions.proposal_ids
+
+    if funding_round.mechanism == 'voting':
+        totals = quadratic_votes(contributions, funding_round.credit_budget)
+        order = np.argsort(-totals['votes'], kind='stable')
+        proposals = [
+            {
+                'proposal_id': str(proposal_ids[i]),
+                'voters': int(totals['voters'][i]),
+                'credits': round(float(totals['credits'][i]), 2),
+                'votes': round(float(totals['votes'][i]), 4),
+            }
+            for i in order
+        ]
+    else:
+        totals = quadratic_funding(
+            contributions, float(funding_round.matching_pool), funding_round.max_match_share
+        )
+        order = np.argsort(-(totals['contributed'] + totals['match']), kind='stable')
+        proposals = [
+            {
+                'proposal_id': str(proposal_ids[i]),
+                'contributors': int(totals['contributors'][i]),
+                'contributed': round(float(totals['contributed'][i]), 2),
+                'match': round(float(totals['match'][i]), 2),
+                'total': round(float(totals['contributed'][i] + totals['match'][i]), 2),
+            }
+            for i in order
+        ]
+
+    return {
+        'mechanism': funding_round.mechanism,
+        'contributors': contributions.matrix.shape[0],
+        'proposals': proposals,
+    }
+
+
+def get_results(funding_round):
+    """
+    Stored results of a closed round, or live results of an open one.
+    """
+    if funding_round.status == 'closed' and funding_round.results is not None:
+        return funding_round.results
+    return compute_results(funding_round)
+
+
+def close_round(funding_round):
+    """
+    Close ``funding_round`` and store its final results.
+    """
+    with transaction.atomic():
+        funding_round = FundingRound.objects.select_for_update().get(pk=funding_round.pk)
+        if funding_round.status != 'closed':
+            funding_round.results = compute_results(funding_round)
+            funding_round.status = 'closed'
+            funding_round.closed_at = timezone.now()
+            funding_round.save(update_fields=['results', 'status', 'closed_at', 'updated_at'])
+    return funding_round
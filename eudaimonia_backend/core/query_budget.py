@@ -0,0 +1,229 @@
+"""
+Eudaimonia Query Budgets
+
+This module measures the SQL each request issues: how many queries,
+how long they took in total, and which query shapes were repeated (the
+signature of an N+1 pattern). ``QueryBudgetMiddleware`` reports these
+figures for every request and compares them against the budget a view
+declares with a ``query_budget`` attribute:
+
+    class PostViewSet(viewsets.ModelViewSet):
+        query_budget = {'list': 4, 'retrieve': 4}
+
+A budget is either an int applying to the whole view, or a dict keyed by
+ViewSet action name (or lowercase HTTP method for plain views).
+
+With ``DEBUG`` on, figures are returned as ``X-Query-*`` response
+headers; otherwise they are written as structured JSON log records.
+Setting ``QUERY_BUDGET_STRICT`` raises ``QueryBudgetExceeded`` instead,
+which fails any test that drives the endpoint through the test client.
+``assert_query_budget`` gives tests the same check around arbitrary code.
+"""
+
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_IN_LIST_RE = re.compile(r'\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)', re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised when code issues more queries than its declared budget allows.
+    """
+
+
+def normalize_sql(sql):
+    """
+    Reduce a SQL statement to its shape, ignoring literal values and the
+    length of ``IN (...)`` lists.
+    """
+    shape = _WHITESPACE_RE.sub(' ', sql).strip()
+    shape = _STRING_RE.sub('?', shape)
+    shape = _NUMBER_RE.sub('?', shape)
+    return _IN_LIST_RE.sub('IN (...)', shape)
+
+
+class QueryStats:
+    """
+    Database execute wrapper accumulating per-request query statistics.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[normalize_sql(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """
+        Map of query shape to execution count, for shapes run more than once.
+        """
+        return {shape: n for shape, n in self.shapes.items() if n > 1}
+
+    @property
+    def duplicate_count(self):
+        """
+        Number of executions beyond the first for every repeated shape.
+        """
+        return sum(n - 1 for n in self.shapes.values() if n > 1)
+
+    def as_dict(self):
+        return {
+            'queries': self.count,
+            'sql_time_ms': round(self.duration * 1000, 2),
+            'duplicate_queries': self.duplicate_count,
+        }
+
+
+@contextmanager
+def record_queries(using=None):
+    """
+    Record queries issued inside the block on ``using`` (default: all
+    configured databases).
+    """
+    stats = QueryStats()
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(stats))
+        yield stats
+
+
+@contextmanager
+def assert_query_budget(max_queries, max_duplicates=None, using=None):
+    """
+    Fail with ``QueryBudgetExceeded`` if the block issues more than
+    ``max_queries`` queries, or more than ``max_duplicates`` repeated ones.
+    """
+    with record_queries(using) as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(
+            f'{stats.count} queries issued, budget is {max_queries}.\n'
+            + _format_duplicates(stats)
+        )
+    if max_duplicates is not None and stats.duplicate_count > max_duplicates:
+        raise QueryBudgetExceeded(
+            f'{stats.duplicate_count} duplicated queries issued, '
+            f'budget is {max_duplicates}.\n' + _format_duplicates(stats)
+        )
+
+
+def _format_duplicates(stats):
+    return '\n'.join(
+        f'  {n}x {shape}' for shape, n in
+        sorted(stats.duplicates.items(), key=lambda item: -item[1])
+    )
+
+
+def resolve_budget(view_func, method):
+    """
+    Return the query budget a resolved view declares for ``method``, or None.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if not isinstance(budget, dict):
+        return budget
+
+    actions = getattr(view_func, 'actions', None) or {}
+    key = actions.get(method.lower(), method.lower())
+    return budget.get(key)
+
+
+class QueryBudgetMiddleware:
+    """
+    Record SQL statistics per request and enforce declared query budgets.
+
+    Runs natively under both WSGI and ASGI, so async views are not pushed
+    onto a worker thread. Database connections are thread-local; under
+    ASGI a request's ``sync_to_async`` calls share one thread, so the
+    recorder is installed on that thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.query_budget = None
+        with record_queries() as stats:
+            response = self.get_response(request)
+        return self._report(request, response, stats)
+
+    async def __acall__(self, request):
+        request.query_budget = None
+        recorder = record_queries()
+        stats = await sync_to_async(recorder.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recorder.__exit__)(None, None, None)
+        return self._report(request, response, stats)
+
+    def _report(self, request, response, stats):
+        budget = request.query_budget
+        over_budget = budget is not None and stats.count > budget
+        threshold = getattr(settings, 'QUERY_BUDGET_DUPLICATE_THRESHOLD', 5)
+        suspected_n_plus_one = {
+            shape: n for shape, n in stats.duplicates.items() if n >= threshold
+        }
+
+        if over_budget and getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(
+                f'{request.method} {request.path} issued {stats.count} queries, '
+                f'budget is {budget}.\n' + _format_duplicates(stats)
+            )
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(stats.count)
+            response['X-Query-Time-Ms'] = f'{stats.duration * 1000:.2f}'
+            response['X-Query-Duplicates'] = str(stats.duplicate_count)
+            if budget is not None:
+                response['X-Query-Budget'] = str(budget)
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'budget': budget,
+            **stats.as_dict(),
+        }
+        if over_budget or suspected_n_plus_one:
+            record['over_budget'] = over_budget
+            record['repeated_shapes'] = suspected_n_plus_one
+            logger.warning('query_budget %s', json.dumps(record))
+        elif not settings.DEBUG:
+            logger.info('query_budget %s', json.dumps(record))
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = resolve_budget(view_func, request.method)
+        return None
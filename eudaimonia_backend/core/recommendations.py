@@ -0,0 +1,232 @@
+"""
+Eudaimonia Connection Recommendations
+
+Batch engine for "people you may know". The social graph is loaded once
+into two sparse matrices:
+
+    A  users x users   accepted friendships (from FriendshipEdge)
+    M  users x worlds  CommunityMembership, one entry per user and world
+
+For a block of users R, ``A[R] @ A`` counts mutual friends and
+``M[R] @ M.T`` counts shared LivingWorlds for every candidate at once.
+Shared worlds are weighted by ``1 / log2(1 + world size)`` so that
+belonging to the same small community says more than belonging to the
+same huge one. Existing friends and the user themself are masked out,
+and the top N candidates per user are stored as ConnectionRecommendation
+rows for the API to serve.
+
+Incremental refreshes recompute only users whose neighbourhood gained
+an edge or membership since the previous run. Removals carry no
+timestamp, so schedule a periodic ``--full`` refresh as well.
+"""
+
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    CommunityMembership, ConnectionRecommendation, FriendshipEdge,
+    RecommendationRun
+)
+
+MUTUAL_FRIEND_WEIGHT = 1.0
+SHARED_WORLD_WEIGHT = 0.5
+DEFAULT_TOP_N = 20
+DEFAULT_BATCH_SIZE = 500
+
+
+class SocialGraph:
+    """
+    Sparse matrix view of friendships and world memberships.
+    """
+
+    def __init__(self, edges, memberships):
+        user_ids = {}
+        world_ids = {}
+
+        def user_index(pk):
+            return user_ids.setdefault(pk, len(user_ids))
+
+        def world_index(pk):
+            return world_ids.setdefault(pk, len(world_ids))
+
+        edge_rows = np.fromiter(
+            (user_index(u) for u, _ in edges), dtype=np.int64, count=len(edges)
+        )
+        edge_cols = np.fromiter(
+            (user_index(f) for _, f in edges), dtype=np.int64, count=len(edges)
+        )
+        member_rows = np.fromiter(
+            (user_index(u) for u, _ in memberships), dtype=np.int64, count=len(memberships)
+        )
+        member_cols = np.fromiter(
+            (world_index(w) for _, w in memberships), dtype=np.int64, count=len(memberships)
+        )
+
+        n_users = len(user_ids)
+        n_worlds = len(world_ids)
+        self.user_ids = np.empty(n_users, dtype=object)
+        for pk, index in user_ids.items():
+            self.user_ids[index] = pk
+        self.index = user_ids
+        self.world_index = world_ids
+
+        self.friends = sparse.csr_matrix(
+            (np.ones(len(edge_rows), dtype=np.float32), (edge_rows, edge_cols)),
+            shape=(n_users, n_users)
+        )
+        self.memberships = sparse.csr_matrix(
+            (np.ones(len(member_rows), dtype=np.float32), (member_rows, member_cols)),
+            shape=(n_users, n_worlds)
+        )
+        # Duplicate (user, world) pairs collapse to 1 in the binary matrix.
+        self.memberships.data[:] = 1
+
+        world_sizes = np.asarray(self.memberships.sum(axis=0)).ravel()
+        weights = 1.0 / np.log2(1.0 + np.maximum(world_sizes, 1.0))
+        self.weighted_memberships = self.memberships @ sparse.diags(
+            weights.astype(np.float32), 0, shape=(n_worlds, n_worlds)
+        )
+
+    @classmethod
+    def load(cls):
+        edges = list(FriendshipEdge.objects.values_list('user_id', 'friend_id').iterator())
+        memberships = list(
+            CommunityMembership.objects.values_list('profile__user_id', 'world_id').distinct().iterator()
+        )
+        return cls(edges, memberships)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def neighbourhood(self, rows, world_pks=()):
+        """
+        Rows whose recommendations depend on ``rows``: the users themselves,
+        their friends, and every member of ``world_pks``.
+        """
+        rows = np.asarray(sorted(rows), dtype=np.int64)
+        affected = set(rows.tolist())
+        if len(rows):
+            affected.update(self.friends[rows].indices.tolist())
+        world_cols = [self.world_index[pk] for pk in world_pks if pk in self.world_index]
+        if world_cols:
+            affected.update(self.memberships[:, world_cols].tocoo().row.tolist())
+        return affected
+
+    def score(self, rows, top_n):
+        """
+        Yield ``(row, candidate_rows, scores, mutual, shared)`` for ``rows``.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        friend_block = self.friends[rows]
+        mutual = (friend_block @ self.friends).tocsr()
+        shared = (self.memberships[rows] @ self.memberships.T).tocsr()
+        weighted_shared = (self.weighted_memberships[rows] @ self.memberships.T).tocsr()
+        scores = (
+            MUTUAL_FRIEND_WEIGHT * mutual + SHARED_WORLD_WEIGHT * weighted_shared
+        ).tocsr()
+
+        for offset, row in enumerate(rows):
+            start, end = scores.indptr[offset], scores.indptr[offset + 1]
+            candidates = scores.indices[start:end]
+            values = scores.data[start:end]
+
+            excluded = friend_block.indices[friend_block.indptr[offset]:friend_block.indptr[offset + 1]]
+            keep = (candidates != row) & ~np.isin(candidates, excluded) & (values > 0)
+            candidates, values = candidates[keep], values[keep]
+            if not len(candidates):
+                continue
+
+            if len(candidates) > top_n:
+                top = np.argpartition(-values, top_n - 1)[:top_n]
+                candidates, values = candidates[top], values[top]
+            order = np.argsort(-values, kind='stable')
+            candidates, values = candidates[order], values[order]
+
+            yield (
+                row, candidates, values,
+                _row_lookup(mutual, offset, candidates),
+                _row_lookup(shared, offset, candidates),
+            )
+
+
+def _row_lookup(matrix, offset, columns):
+    """
+    Values of CSR ``matrix`` row ``offset`` at ``columns`` (0 where absent).
+    """
+    start, end = matrix.indptr[offset], matrix.indptr[offset + 1]
+    row = dict(zip(matrix.indices[start:end].tolist(), matrix.data[start:end].tolist()))
+    return [row.get(column, 0) for column in columns.tolist()]
+
+
+def changed_since(graph, since):
+    """
+    Return ``(rows, world_pks)`` for users who gained a friendship or
+    membership after ``since``, and the worlds they joined.
+    """
+    user_pks = set(
+        FriendshipEdge.objects.filter(created_at__gt=since).values_list('user_id', flat=True)
+    )
+    joined = CommunityMembership.objects.filter(
+        Q(joined_at__gt=since) | Q(updated_at__gt=since)
+    ).values_list('profile__user_id', 'world_id')
+    world_pks = set()
+    for user_pk, world_pk in joined:
+        user_pks.add(user_pk)
+        world_pks.add(world_pk)
+    rows = {graph.index[pk] for pk in user_pks if pk in graph.index}
+    return rows, world_pks
+
+
+def refresh_recommendations(full=False, top_n=DEFAULT_TOP_N, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Recompute stored recommendations.
+
+    With ``full`` (or when no previous run exists) every user is
+    recomputed; otherwise only users affected by changes since the last
+    run. Returns the RecommendationRun describing the refresh.
+    """
+    previous = RecommendationRun.objects.filter(finished_at__isnull=False).first()
+    run = RecommendationRun.objects.create(full=full or previous is None)
+    graph = SocialGraph.load()
+
+    if run.full:
+        rows = range(len(graph))
+    else:
+        changed, world_pks = changed_since(graph, previous.started_at)
+        rows = sorted(graph.neighbourhood(changed, world_pks))
+
+    rows = list(rows)
+    for start in range(0, len(rows), batch_size):
+        _store_block(graph, rows[start:start + batch_size], top_n, run.started_at)
+
+    if run.full:
+        # Users who dropped out of the graph entirely were not rescored.
+        ConnectionRecommendation.objects.filter(computed_at__lt=run.started_at).delete()
+
+    run.users_refreshed = len(rows)
+    run.finished_at = timezone.now()
+    run.save(update_fields=['users_refreshed', 'finished_at'])
+    return run
+
+
+def _store_block(graph, rows, top_n, computed_at):
+    recommendations = []
+    for row, candidates, scores, mutual, shared in graph.score(rows, top_n):
+        user_pk = graph.user_ids[row]
+        for candidate, score, n_mutual, n_shared in zip(candidates, scores, mutual, shared):
+            recommendations.append(ConnectionRecommendation(
+                user_id=user_pk,
+                candidate_id=graph.user_ids[candidate],
+                score=float(score),
+                mutual_friends=int(n_mutual),
+                shared_worlds=int(n_shared),
+                computed_at=computed_at,
+            ))
+
+    user_pks = [graph.user_ids[row] for row in rows]
+    with transaction.atomic():
+        ConnectionRecommendation.objects.filter(user_id__in=user_pks).delete()
+        ConnectionRecommendation.objects.bulk_create(recommendations, batch_size=1000)
@@ -7,11 +7,16 @@ are designed to reflect the community-centric architecture and faceted identity
 concepts outlined in the project principles.
 """
 
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from .models import (
     LivingWorld, Post, Friendship, CommunityMembership,
-    Proposal, Vote, SmartProfile, VerifiableCredential
+    Proposal, Vote, SmartProfile, VerifiableCredential,
+    ConnectionRecommendation, DataExport, FundingRound, Contribution
 )
 
 User = get_user_model()
@@ -30,6 +35,29 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'date_joined']
 
 
+class FriendSerializer(UserSerializer):
+    """
+    User serializer annotated with the number of friends in common
+    with the requesting user.
+    """
+    mutual_friends = serializers.IntegerField(read_only=True)
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ['mutual_friends']
+
+
+class ConnectionRecommendationSerializer(serializers.ModelSerializer):
+    """
+    Precomputed connection suggestion with the signals behind its score.
+    """
+    candidate = UserSerializer(read_only=True)
+
+    class Meta:
+        model = ConnectionRecommendation
+        fields = ['candidate', 'score', 'mutual_friends', 'shared_worlds', 'computed_at']
+        read_only_fields = fields
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """
     User registration serializer with password validation.
@@ -63,7 +91,6 @@ class LivingWorldSerializer(serializers.ModelSerializer):
     a complete view of a LivingWorld's structure and theme.
     """
     owner = UserSerializer(read_only=True)
-    member_count = serializers.SerializerMethodField()
     
     class Meta:
         model = LivingWorld
@@ -71,10 +98,7 @@ class LivingWorldSerializer(serializers.ModelSerializer):
             'id', 'name', 'description', 'theme_data',
             'owner', 'created_at', 'member_count'
         ]
-        read_only_fields = ['id', 'owner', 'created_at']
-    
-    def get_member_count(self, obj):
-        return obj.memberships.count()
+        read_only_fields = ['id', 'owner', 'created_at', 'member_count']
 
 
 class PostSerializer(serializers.ModelSerializer):
@@ -133,10 +157,10 @@ class FriendshipSerializer(serializers.ModelSerializer):
         validated_data['user1'] = self.context['request'].user
         validated_data['user2'] = user2
         
-        # Check if friendship already exists
+        # Check if friendship already exists, in either direction
         if Friendship.objects.filter(
-            user1=validated_data['user1'],
-            user2=validated_data['user2']
+            Q(user1=validated_data['user1'], user2=validated_data['user2'])
+            | Q(user1=validated_data['user2'], user2=validated_data['user1'])
         ).exists():
             raise serializers.ValidationError("Friendship request already exists")
         
@@ -193,6 +217,7 @@ class CommunityMembershipSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'profile', 'role', 'reputation', 'joined_at']
 
+    @transaction.atomic
     def create(self, validated_data):
         validated_data['profile'] = SmartProfile.objects.get(
             id=validated_data.pop('profile_id'),
@@ -222,18 +247,15 @@ class ProposalSerializer(serializers.ModelSerializer):
     creator = UserSerializer(read_only=True)
     world = LivingWorldSerializer(read_only=True)
     world_id = serializers.UUIDField(write_only=True)
-    vote_count = serializers.SerializerMethodField()
+    tally = serializers.DictField(child=serializers.IntegerField(), read_only=True)
     
     class Meta:
         model = Proposal
         fields = [
             'id', 'title', 'description', 'creator', 'world',
-            'world_id', 'created_at', 'vote_count'
+            'world_id', 'created_at', 'vote_count', 'tally'
         ]
-        read_only_fields = ['id', 'creator', 'created_at']
-    
-    def get_vote_count(self, obj):
-        return obj.votes.count()
+        read_only_fields = ['id', 'creator', 'created_at', 'vote_count', 'tally']
     
     def create(self, validated_data):
         validated_data['creator'] = self.context['request'].user
@@ -268,16 +290,87 @@ class VoteSerializer(serializers.ModelSerializer):
             id=validated_data.pop('proposal_id')
         )
         
-        # Check if user has already voted
-        if Vote.objects.filter(
-            voter=validated_data['voter'],
-            proposal=validated_data['proposal']
-        ).exists():
+        # The (proposal, voter) unique constraint rejects a second vote,
+        # even one racing this request.
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
             raise serializers.ValidationError("Already voted on this proposal")
-        
+
+
+class BallotSerializer(serializers.Serializer):
+    """
+    One vote of a bulk vote request.
+    """
+    proposal_id = serializers.UUIDField()
+    choice = serializers.ChoiceField(choices=Vote.CHOICE_CHOICES)
+
+
+class FundingRoundSerializer(serializers.ModelSerializer):
+    """
+    FundingRound serializer for quadratic voting and funding rounds.
+    """
+    creator = UserSerializer(read_only=True)
+    world = LivingWorldSerializer(read_only=True)
+    world_id = serializers.UUIDField(write_only=True)
+
+    class Meta:
+        model = FundingRound
+        fields = [
+            'id', 'title', 'description', 'creator', 'world', 'world_id',
+            'mechanism', 'status', 'matching_pool', 'credit_budget',
+            'max_match_share', 'created_at', 'closed_at'
+        ]
+        read_only_fields = ['id', 'creator', 'status', 'created_at', 'closed_at']
+
+    def validate_world_id(self, value):
+        if not LivingWorld.objects.filter(id=value).exists():
+            raise serializers.ValidationError("World not found")
+        return value
+
+    def create(self, validated_data):
+        validated_data['creator'] = self.context['request'].user
+        validated_data['world'] = LivingWorld.objects.get(
+            id=validated_data.pop('world_id')
+        )
         return super().create(validated_data)
 
 
+class ContributionSerializer(serializers.ModelSerializer):
+    """
+    Contribution serializer for a member's credits or donation to a
+    proposal in a FundingRound.
+    """
+    proposal_id = serializers.UUIDField()
+    amount = serializers.DecimalField(max_digits=18, decimal_places=2, min_value=Decimal('0.01'))
+
+    class Meta:
+        model = Contribution
+        fields = ['id', 'round', 'proposal_id', 'amount', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'round', 'created_at', 'updated_at']
+
+
+class DataExportSerializer(serializers.ModelSerializer):
+    """
+    DataExport serializer for requesting and tracking data exports.
+
+    Exports are built in the background; clients poll ``status`` until
+    it is ``complete`` and then fetch the content by ``ipfs_cid``. An
+    ``incremental`` export holds only changes since ``previous``.
+    """
+    class Meta:
+        model = DataExport
+        fields = [
+            'id', 'kind', 'status', 'ipfs_cid', 'previous', 'watermark',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'ipfs_cid', 'previous', 'watermark',
+            'created_at', 'updated_at'
+        ]
+
+
 class FacetedProfileSerializer(serializers.ModelSerializer):
     """
     Faceted Profile serializer - the core of Eudaimonia's identity system.
@@ -0,0 +1,139 @@
+"""
+Eudaimonia Streaming Responses
+
+Helpers for Server-Sent Events responses from async views.
+
+Django 4.2 does not notice a client going away while it streams a
+response under ASGI, and uvicorn silently drops what is sent after a
+disconnect, so a stream would otherwise run to completion for nobody.
+``DisconnectWatcher`` wraps the ASGI application and, once the request
+body has been read, listens for ``http.disconnect``; views wait on
+``client_disconnected(request)`` alongside their own work and stop
+cleanly when it fires.
+
+Backpressure comes from the server: each chunk is sent with
+``await send(...)``, which blocks while the client's socket buffer is
+full, and ``sse_stream`` only asks its source for the next event after
+the previous one has been sent.
+"""
+
+import asyncio
+import json
+
+from django.http import StreamingHttpResponse
+
+# ASGI scope key holding the request's disconnect event.
+SCOPE_KEY = 'eudaimonia.disconnected'
+
+# Seconds between keep-alive comments while the source is idle, so
+# proxies do not time the connection out.
+KEEPALIVE_INTERVAL = 15.0
+
+
+class DisconnectWatcher:
+    """
+    ASGI middleware that sets ``scope[SCOPE_KEY]`` when the client
+    disconnects.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        disconnected = scope[SCOPE_KEY] = asyncio.Event()
+        listener = None
+
+        async def listen():
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    disconnected.set()
+                    return
+
+        async def watched_receive():
+            nonlocal listener
+            if listener is not None:
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+            elif not message.get('more_body', False):
+                # The body is complete; from here on only a disconnect
+                # can arrive.
+                listener = asyncio.ensure_future(listen())
+            return message
+
+        try:
+            await self.app(scope, watched_receive, send)
+        finally:
+            if listener is not None:
+                listener.cancel()
+
+
+def client_disconnected(request):
+    """
+    The asyncio.Event set when the client of ``request`` disconnects.
+    Never set outside ``DisconnectWatcher`` (e.g. in the test client).
+    """
+    scope = getattr(request, 'scope', None) or {}
+    return scope.get(SCOPE_KEY) or asyncio.Event()
+
+
+def format_event(event, data):
+    """
+    Encode one Server-Sent Event with a JSON payload.
+    """
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'.encode()
+
+
+async def sse_stream(request, events, keepalive=KEEPALIVE_INTERVAL):
+    """
+    Relay ``events``, an async iterator of ``(event, data)`` pairs, as
+    encoded Server-Sent Events. Stops, closing ``events``, as soon as
+    the client disconnects.
+    """
+    disconnected = asyncio.ensure_future(client_disconnected(request).wait())
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(events))
+            done, _ = await asyncio.wait(
+                {pending, disconnected}, timeout=keepalive,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnected in done:
+                return
+            if pending not in done:
+                yield b': keep-alive\n\n'
+                continue
+            try:
+                event, data = pending.result()
+            except StopAsyncIteration:
+                return
+            finally:
+                pending = None
+            yield format_event(event, data)
+    finally:
+        disconnected.cancel()
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        await events.aclose()
+
+
+def event_stream_response(request, events, **kwargs):
+    """
+    A streaming ``text/event-stream`` response relaying ``events``.
+    """
+    response = StreamingHttpResponse(
+        sse_stream(request, events, **kwargs), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
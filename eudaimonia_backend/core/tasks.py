@@ -0,0 +1,69 @@
+"""
+Eudaimonia Background Tasks
+
+Task functions run by the job queue (see core.jobs). Payloads are JSON,
+so tasks take primary keys rather than model instances.
+"""
+
+from django.utils import timezone
+
+from .jobs import task
+from .models import DataExport
+
+
+def data_export_failed(export_id):
+    """
+    Mark a DataExport failed once its job has no attempts left.
+    """
+    DataExport.objects.filter(pk=export_id).exclude(status='complete').update(
+        status='failed', updated_at=timezone.now()
+    )
+
+
+@task('core.process_data_export', queue='exports', max_attempts=3,
+      retry_backoff=60, visibility_timeout=1800, concurrency=2,
+      on_failure=data_export_failed)
+def process_data_export(export_id):
+    """
+    Build and upload a pending DataExport. A failed attempt leaves it
+    pending for the retry.
+    """
+    from .exports import run_export
+
+    export = DataExport.objects.select_related('user').get(pk=export_id)
+    if export.status == 'complete':
+        return
+    run_export(export, final_attempt=False)
+
+
+@task('core.index_posts', queue='batch', max_attempts=3,
+      visibility_timeout=1800, concurrency=1)
+def index_posts(full=False):
+    """
+    Embed new and edited posts into the post index (see core.post_index).
+    """
+    from .post_index import index_posts as run_index
+
+    run_index(full=full)
+
+
+@task('core.refresh_recommendations', queue='batch', max_attempts=2,
+      visibility_timeout=3600, concurrency=1)
+def refresh_recommendations(full=False):
+    """
+    Recompute connection recommendations (see core.recommendations).
+    """
+    from .recommendations import refresh_recommendations as refresh
+
+    refresh(full=full)
+
+
+@task('core.analyze_opinions', queue='batch', max_attempts=3,
+      visibility_timeout=1800, concurrency=1)
+def analyze_opinions(full=False):
+    """
+    Analyze opinion groups in worlds with new votes (see core.opinions).
+    """
+    from .opinions import analyze_opinions as analyze
+
+    analyze(full=full)
@@ -0,0 +1,100 @@
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.companion import CompanionError, collect
+from core.companion_cache import cached_answer_fragments, get_response_cache
+
+
+class GatedAnswer:
+    """
+    An answer whose second fragment waits until ``release`` is set.
+    """
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.closed = False
+
+    async def fragments(self, *args):
+        try:
+            yield 'a '
+            await self.release.wait()
+            yield 'b'
+        finally:
+            self.closed = True
+
+
+class SharedGenerationTests(SimpleTestCase):
+    def setUp(self):
+        get_response_cache().clear()
+
+    async def ask(self, answer):
+        with mock.patch('core.companion_cache.answer_fragments', answer.fragments):
+            return await cached_answer_fragments(object(), 'user', 1, 'context', 'What now?')
+
+    def test_joined_request_keeps_generation_alive(self):
+        async def scenario():
+            answer = GatedAnswer()
+            first, source = await self.ask(answer)
+            self.assertEqual(source, 'llm')
+            self.assertEqual(await first.__anext__(), 'a ')
+
+            # B joins but has not read anything when A disconnects.
+            second, source = await self.ask(answer)
+            self.assertEqual(source, 'shared')
+            await first.aclose()
+
+            answer.release.set()
+            self.assertEqual(await collect(second), 'a b')
+            _, source = await self.ask(answer)
+            self.assertEqual(source, 'cache')
+            return answer
+
+        answer = asyncio.run(scenario())
+        self.assertTrue(answer.closed)
+
+    def test_cancelled_generation_is_an_error_not_a_short_answer(self):
+        async def scenario():
+            answer = GatedAnswer()
+            first, _ = await self.ask(answer)
+            second, _ = await self.ask(answer)
+            self.assertEqual(await first.__anext__(), 'a ')
+            self.assertEqual(await second.__anext__(), 'a ')
+            # The generation is cancelled while B waits for more.
+            second._flight._task.cancel()
+            with self.assertRaises(CompanionError):
+                await second.__anext__()
+            await first.aclose()
+            return answer
+
+        answer = asyncio.run(scenario())
+        self.assertTrue(answer.closed)
+
+    def test_generation_stops_when_every_listener_leaves(self):
+        async def scenario():
+            answer = GatedAnswer()
+            first, _ = await self.ask(answer)
+            second, _ = await self.ask(answer)
+            self.assertEqual(await first.__anext__(), 'a ')
+            await first.aclose()
+            await second.aclose()
+            await asyncio.sleep(0)
+            _, source = await self.ask(GatedAnswer())
+            return answer, source
+
+        answer, source = asyncio.run(scenario())
+        self.assertTrue(answer.closed)
+        # Nothing was cached, so the next request generates again.
+        self.assertEqual(source, 'llm')
+
+    def test_completed_answer_is_cached(self):
+        async def scenario():
+            answer = GatedAnswer()
+            answer.release.set()
+            fragments, _ = await self.ask(answer)
+            self.assertEqual(await collect(fragments), 'a b')
+            fragments, source = await self.ask(answer)
+            return source, await collect(fragments)
+
+        self.assertEqual(asyncio.run(scenario()), ('cache', 'a b'))
@@ -0,0 +1,168 @@
+import asyncio
+import importlib.util
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.companion_cache import get_response_cache
+from core.llm_fake import DEFAULT_REPLY, FakeLLMServer
+from core.models import User
+from core.streaming import SCOPE_KEY, DisconnectWatcher, sse_stream
+
+HAS_OPENAI = importlib.util.find_spec('openai') is not None
+
+
+def parse_events(body):
+    events = []
+    for block in body.decode().split('\n\n'):
+        fields = dict(
+            line.split(': ', 1) for line in block.splitlines() if not line.startswith(':')
+        )
+        if fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+@unittest.skipUnless(HAS_OPENAI, 'the openai package is not installed')
+class CompanionStreamTests(TestCase):
+    """
+    Stream companion answers from FakeLLMServer through the async view.
+    """
+
+    def setUp(self):
+        self.llm = FakeLLMServer(token_interval=0.01).start()
+        self.addCleanup(self.llm.stop)
+        settings = override_settings(
+            OPENAI_API_KEY='test', OPENAI_BASE_URL=self.llm.base_url, OPENAI_MAX_RETRIES=0
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        get_response_cache().clear()
+
+        user = User.objects.create_user(username='asker', email='asker@example.com', password='pw')
+        self.token = str(AccessToken.for_user(user))
+
+    async def ask(self, query='What should I do today?', stream=True):
+        headers = {'Authorization': f'Bearer {self.token}'}
+        if stream:
+            headers['Accept'] = 'text/event-stream'
+        return await self.async_client.post(
+            '/api/companion/query/', {'query': query},
+            content_type='application/json', headers=headers
+        )
+
+    async def read_events(self, response):
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return parse_events(b''.join([chunk async for chunk in response.streaming_content]))
+
+    async def wait_for(self, condition, timeout=2.0):
+        for _ in range(int(timeout / 0.02)):
+            if condition():
+                return
+            await asyncio.sleep(0.02)
+        self.fail('condition not met in time')
+
+    async def test_streams_tokens_then_done(self):
+        events = await self.read_events(await self.ask())
+        names = [event for event, _ in events]
+        self.assertEqual(names[-1], 'done')
+        self.assertEqual(set(names[:-1]), {'token'})
+        self.assertGreater(len(names), 2)
+        self.assertEqual(''.join(data['text'] for _, data in events[:-1]), DEFAULT_REPLY)
+        self.assertEqual(events[-1][1]['source'], 'llm')
+        self.assertEqual(self.llm.completed, 1)
+
+    async def test_repeated_question_is_served_from_cache(self):
+        await self.read_events(await self.ask())
+        events = await self.read_events(await self.ask())
+        self.assertEqual(events[-1][1]['source'], 'cache')
+        self.assertEqual(self.llm.requests['stream'], 1)
+
+        response = await self.ask(stream=False)
+        self.assertEqual(response.json()['message'], DEFAULT_REPLY)
+        self.assertTrue(response.json()['cached'])
+
+    async def test_provider_failures_end_the_stream_with_an_error(self):
+        for mode in ('error', 'midstream'):
+            self.llm.fail_next(mode=mode)
+            events = await self.read_events(await self.ask(f'Failing {mode}?'))
+            self.assertEqual(events[-1], ('error', {'error': 'AI companion is unavailable'}))
+
+        self.llm.fail_next(mode='error')
+        response = await self.ask('Failing again?', stream=False)
+        self.assertEqual(response.status_code, 502)
+
+    async def test_disconnect_cancels_the_generation(self):
+        self.llm.token_interval = 0.1
+        # Stands in for DisconnectWatcher, which the test client bypasses.
+        disconnected = asyncio.Event()
+        with mock.patch('core.streaming.client_disconnected', return_value=disconnected):
+            content = (await self.ask()).streaming_content
+            self.assertEqual(parse_events(await anext(content))[0][0], 'token')
+            disconnected.set()
+            self.assertEqual([chunk async for chunk in content], [])
+
+        await self.wait_for(lambda: self.llm.cancelled == 1)
+        self.assertEqual(self.llm.completed, 0)
+        # A cancelled answer is not cached.
+        events = await self.read_events(await self.ask())
+        self.assertEqual(events[-1][1]['source'], 'llm')
+
+
+class StreamingTests(SimpleTestCase):
+    def test_disconnect_watcher_flags_the_request(self):
+        async def scenario():
+            messages = [{'type': 'http.request', 'body': b'{}'}, {'type': 'http.disconnect'}]
+
+            async def receive():
+                return messages.pop(0)
+
+            async def app(scope, receive, send):
+                self.assertEqual(await receive(), {'type': 'http.request', 'body': b'{}'})
+                await asyncio.wait_for(scope[SCOPE_KEY].wait(), 1)
+
+            await DisconnectWatcher(app)({'type': 'http'}, receive, None)
+
+        asyncio.run(scenario())
+
+    def test_stops_when_the_client_disconnects(self):
+        async def scenario():
+            disconnected = asyncio.Event()
+            request = SimpleNamespace(scope={SCOPE_KEY: disconnected})
+            closed = asyncio.Event()
+
+            async def events():
+                try:
+                    yield 'token', {'text': 'a'}
+                    await asyncio.sleep(60)
+                    yield 'token', {'text': 'b'}
+                finally:
+                    closed.set()
+
+            stream = sse_stream(request, events())
+            first = await anext(stream)
+            waiting = asyncio.ensure_future(anext(stream, None))
+            await asyncio.sleep(0.01)
+            disconnected.set()
+            return first, await asyncio.wait_for(waiting, 1), closed.is_set()
+
+        first, rest, closed = asyncio.run(scenario())
+        self.assertEqual(parse_events(first), [('token', {'text': 'a'})])
+        self.assertIsNone(rest)
+        self.assertTrue(closed)
+
+    def test_sends_keepalives_while_idle(self):
+        async def scenario():
+            async def events():
+                await asyncio.sleep(0.05)
+                yield 'done', {}
+
+            return [chunk async for chunk in sse_stream(SimpleNamespace(), events(), keepalive=0.01)]
+
+        chunks = asyncio.run(scenario())
+        self.assertIn(b': keep-alive\n\n', chunks)
+        self.assertEqual(parse_events(chunks[-1]), [('done', {})])
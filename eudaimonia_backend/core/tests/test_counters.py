@@ -0,0 +1,98 @@
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.counters import COUNTERS, find_drift
+from core.models import LivingWorld, Proposal, User, Vote
+
+
+class VoteTallyTests(TestCase):
+    """
+    Vote counters and tallies follow single, changed, deleted and bulk
+    votes made through the API.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pw')
+        cls.voter = User.objects.create_user(username='voter', email='voter@example.com', password='pw')
+        world = LivingWorld.objects.create(name='Commons', description='d', owner=cls.owner)
+        cls.proposals = [
+            Proposal.objects.create(title=f'p{i}', description='d', world=world, creator=cls.owner)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.voter)}'}
+
+    def vote(self, proposal, choice, user=None):
+        return Vote.objects.create(proposal=proposal, voter=user or self.owner, choice=choice)
+
+    def assertTally(self, proposal, agree=0, disagree=0, abstain=0):
+        response = self.client.get(f'/api/proposals/{proposal.pk}/tally/', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'proposal_id': str(proposal.pk), 'agree': agree, 'disagree': disagree,
+            'abstain': abstain, 'total': agree + disagree + abstain,
+        })
+        for model, field, related_model, fk_name, filters in COUNTERS:
+            self.assertFalse(find_drift(model, field, related_model, fk_name, filters).exists(), field)
+
+    def test_single_vote(self):
+        proposal = self.proposals[0]
+        response = self.client.post(
+            '/api/votes/', {'proposal_id': str(proposal.pk), 'choice': 'agree'},
+            content_type='application/json', **self.auth
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTally(proposal, agree=1)
+
+        response = self.client.post(
+            '/api/votes/', {'proposal_id': str(proposal.pk), 'choice': 'disagree'},
+            content_type='application/json', **self.auth
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertTally(proposal, agree=1)
+
+    def test_changed_vote(self):
+        proposal = self.proposals[0]
+        vote = self.vote(proposal, 'agree', self.voter)
+        self.vote(proposal, 'agree')
+        for choice, tally in [
+            ('disagree', {'agree': 1, 'disagree': 1}),
+            ('disagree', {'agree': 1, 'disagree': 1}),
+            ('abstain', {'agree': 1, 'abstain': 1}),
+        ]:
+            response = self.client.patch(
+                f'/api/votes/{vote.pk}/', {'choice': choice},
+                content_type='application/json', **self.auth
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTally(proposal, **tally)
+
+    def test_deleted_vote(self):
+        proposal = self.proposals[0]
+        vote = self.vote(proposal, 'disagree', self.voter)
+        self.vote(proposal, 'disagree')
+        response = self.client.delete(f'/api/votes/{vote.pk}/', **self.auth)
+        self.assertEqual(response.status_code, 204)
+        self.assertTally(proposal, disagree=1)
+
+    def test_bulk_votes(self):
+        first, second, third = self.proposals
+        self.vote(second, 'agree', self.voter)
+        response = self.client.post('/api/votes/bulk/', {'votes': [
+            {'proposal_id': str(first.pk), 'choice': 'agree'},
+            {'proposal_id': str(second.pk), 'choice': 'disagree'},
+            {'proposal_id': str(third.pk), 'choice': 'abstain'},
+            {'proposal_id': str(third.pk), 'choice': 'agree'},
+            {'proposal_id': str(first.pk), 'choice': 'maybe'},
+        ]}, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(
+            [result['status'] for result in response.json()['results']],
+            ['created', 'already_voted', 'created', 'duplicate', 'invalid']
+        )
+        self.assertTally(first, agree=1)
+        self.assertTally(second, agree=1)
+        self.assertTally(third, abstain=1)
@@ -0,0 +1,22 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from core.exports import iter_section_records
+from core.models import SmartProfile, User, VerifiableCredential
+
+
+class IncrementalSectionTests(TestCase):
+    def test_edited_credential_is_in_the_next_incremental_export(self):
+        user = User.objects.create_user(username='holder', email='holder@example.com', password='pw')
+        profile = SmartProfile.objects.create(user=user, name='work')
+        credential = VerifiableCredential.objects.create(
+            profile=profile, credential_data={'level': 1}, issuer_did='did:example:issuer'
+        )
+        since = timezone.now()
+        self.assertEqual(list(iter_section_records(user, since)), [])
+
+        credential.credential_data = {'level': 2}
+        credential.save()
+        records = list(iter_section_records(user, since))
+        self.assertEqual([record['type'] for record in records], ['verifiable_credential'])
+        self.assertEqual(records[0]['credential_data'], {'level': 2})
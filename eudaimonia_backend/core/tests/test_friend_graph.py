@@ -0,0 +1,65 @@
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.friend_graph import friend_edges
+from core.models import Friendship, FriendshipEdge, User
+
+
+class FriendshipEdgeTests(TestCase):
+    """
+    The adjacency index keeps a pair connected while any Friendship
+    between them is accepted, whichever direction it was sent in.
+    """
+
+    def setUp(self):
+        self.ann = User.objects.create_user(username='ann', email='ann@example.com', password='pw')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='pw')
+
+    def friends_of(self, user):
+        return [edge.friend for edge in friend_edges(user)]
+
+    def both_accepted(self):
+        first = Friendship.objects.create(user1=self.ann, user2=self.bob, status='accepted')
+        second = Friendship.objects.create(user1=self.bob, user2=self.ann, status='accepted')
+        return first, second
+
+    def test_accept_and_reject(self):
+        friendship = Friendship.objects.create(user1=self.ann, user2=self.bob)
+        self.assertEqual(self.friends_of(self.ann), [])
+        friendship.status = 'accepted'
+        friendship.save()
+        self.assertEqual(self.friends_of(self.ann), [self.bob])
+        self.assertEqual(self.friends_of(self.bob), [self.ann])
+        friendship.status = 'rejected'
+        friendship.save()
+        self.assertEqual(FriendshipEdge.objects.count(), 0)
+
+    def test_rejecting_one_of_two_accepted_rows_keeps_the_pair(self):
+        first, second = self.both_accepted()
+        first.status = 'rejected'
+        first.save()
+        self.assertEqual(self.friends_of(self.ann), [self.bob])
+        self.assertEqual(self.friends_of(self.bob), [self.ann])
+        self.assertEqual(set(FriendshipEdge.objects.values_list('friendship', flat=True)), {second.pk})
+
+        second.status = 'rejected'
+        second.save()
+        self.assertEqual(FriendshipEdge.objects.count(), 0)
+
+    def test_deleting_one_of_two_accepted_rows_keeps_the_pair(self):
+        first, second = self.both_accepted()
+        first.delete()
+        self.assertEqual(self.friends_of(self.ann), [self.bob])
+        self.assertEqual(self.friends_of(self.bob), [self.ann])
+
+        second.delete()
+        self.assertEqual(FriendshipEdge.objects.count(), 0)
+
+    def test_reverse_request_is_rejected(self):
+        Friendship.objects.create(user1=self.ann, user2=self.bob)
+        response = self.client.post(
+            '/api/friendships/', {'user2_username': 'ann'}, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.bob)}'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Friendship.objects.count(), 1)
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import ipfs_cache
+from core.ipfs_async import AsyncIPFSService
+from core.ipfs_cache import CIDCache
+from core.ipfs_fake import FakeIPFSNode, make_cid
+from core.ipfs_service import IPFSError
+from core.models import DataExport, User
+
+
+class AsyncIPFSServiceTests(SimpleTestCase):
+    def setUp(self):
+        self.node = FakeIPFSNode().start()
+        self.addCleanup(self.node.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = CIDCache(directory.name, max_bytes=1024 ** 2)
+        self.data = os.urandom(200 * 1024)
+        self.cid = self.node.add(self.data)
+
+    def call(self, method, *args, cache=None, **kwargs):
+        """
+        Run one AsyncIPFSService method on a fresh event loop.
+        """
+        async def scenario():
+            async with AsyncIPFSService(self.node.api_addr, cache=cache) as ipfs:
+                return await getattr(ipfs, method)(*args, **kwargs)
+        return asyncio.run(scenario())
+
+    def chunks(self, cid, cache=None, **kwargs):
+        async def scenario():
+            async with AsyncIPFSService(self.node.api_addr, cache=cache) as ipfs:
+                return [chunk async for chunk in ipfs.cat(cid, **kwargs)]
+        return asyncio.run(scenario())
+
+    def cat(self, cid, cache=None, **kwargs):
+        return b''.join(self.chunks(cid, cache, **kwargs))
+
+    def test_cat_streams_chunks(self):
+        chunks = self.chunks(self.cid)
+        self.assertEqual(b''.join(chunks), self.data)
+        self.assertGreater(len(chunks), 1)
+
+    def test_cat_range(self):
+        self.assertEqual(self.cat(self.cid, offset=1000, length=70000), self.data[1000:71000])
+        self.assertEqual(self.cat(self.cid, offset=199 * 1024), self.data[199 * 1024:])
+
+    def test_add_stream_round_trip(self):
+        async def source():
+            yield b'hello '
+            yield b'world'
+
+        cid = self.call('add_stream', source())
+        self.assertEqual(self.node.objects[cid], b'hello world')
+        self.assertIn(cid, self.node.pins)
+
+    def test_get_file_fills_the_cache(self):
+        self.assertEqual(self.call('get_file', self.cid, cache=self.cache), self.data)
+        self.assertEqual(self.cache.get(self.cid), self.data)
+        self.assertEqual(self.call('get_file', self.cid, cache=self.cache), self.data)
+        self.assertEqual(self.node.requests['cat'], 1)
+
+    def test_cached_reads_skip_the_node(self):
+        self.cache.put(self.cid, self.data)
+        self.assertEqual(
+            self.cat(self.cid, self.cache, offset=10, length=100000), self.data[10:100010]
+        )
+        self.assertEqual(self.call('stat_size', self.cid, cache=self.cache), len(self.data))
+        self.assertEqual(self.node.requests['cat'], 0)
+        self.assertEqual(self.node.requests['files/stat'], 0)
+
+    def test_corrupted_cache_entry_is_refetched(self):
+        self.cache.put(self.cid, self.data)
+        with open(self.cache._path(self.cid), 'r+b') as cached:
+            cached.write(b'\0' * 16)
+        self.assertEqual(self.cat(self.cid, self.cache), self.data)
+        self.assertEqual(self.node.requests['cat'], 1)
+        self.assertNotIn(self.cid, self.cache)
+
+    def test_stat_size(self):
+        self.assertEqual(self.call('stat_size', self.cid), len(self.data))
+
+    def test_node_errors_raise_ipfs_error(self):
+        self.node.fail_next(command='cat')
+        with self.assertRaisesMessage(IPFSError, 'injected failure'):
+            self.cat(self.cid)
+        self.node.fail_next(command='cat', mode='disconnect')
+        with self.assertRaises(IPFSError):
+            self.cat(self.cid)
+        self.assertEqual(self.cat(self.cid), self.data)
+
+    def test_missing_content(self):
+        with self.assertRaisesMessage(IPFSError, 'not found'):
+            self.cat(make_cid(b'never added'))
+
+    def test_health(self):
+        self.assertTrue(self.call('is_healthy'))
+        self.node.fail_next(command='id')
+        self.assertFalse(self.call('is_healthy'))
+
+
+class ExportDownloadTests(TestCase):
+    """
+    Download a complete export through the async view, with ranges.
+    """
+
+    def setUp(self):
+        self.node = FakeIPFSNode().start()
+        self.addCleanup(self.node.stop)
+        # Reads go straight to the node rather than the process-wide cache.
+        settings = override_settings(IPFS_API_ADDR=self.node.api_addr, IPFS_CACHE_DIR='')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache = mock.patch.object(ipfs_cache, '_cache', None)
+        cache.start()
+        self.addCleanup(cache.stop)
+
+        self.data = os.urandom(100 * 1024)
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='pw')
+        self.export = DataExport.objects.create(
+            user=self.user, status='complete', ipfs_cid=self.node.add(self.data)
+        )
+        self.token = str(AccessToken.for_user(self.user))
+
+    async def download(self, **headers):
+        response = await self.async_client.get(
+            f'/api/exports/{self.export.pk}/download/',
+            headers={'Authorization': f'Bearer {self.token}', **headers}
+        )
+        if response.streaming:
+            body = b''.join([chunk async for chunk in response.streaming_content])
+        else:
+            body = response.content
+        return response, body
+
+    async def test_full_download(self):
+        response, body = await self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{self.export.ipfs_cid}"')
+        self.assertEqual(body, self.data)
+
+    async def test_range_download(self):
+        response, body = await self.download(Range='bytes=100-65636')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-65636/{len(self.data)}')
+        self.assertEqual(body, self.data[100:65637])
+
+        response, _ = await self.download(Range=f'bytes={len(self.data)}-')
+        self.assertEqual(response.status_code, 416)
+
+    async def test_node_failure_is_a_bad_gateway(self):
+        self.node.fail_next(command='files/stat')
+        response, _ = await self.download()
+        self.assertEqual(response.status_code, 502)
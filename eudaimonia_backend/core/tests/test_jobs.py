@@ -0,0 +1,131 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.jobs import TaskSpec, claim_job, enqueue, registry, run_job
+from core.models import Job
+
+
+class Boom(Exception):
+    pass
+
+
+class RacingRegistry(dict):
+    """
+    A registry whose first lookup lets another worker claim the job, in
+    the gap between a worker reading its candidates and updating one.
+    """
+
+    def __init__(self, *args, rival):
+        super().__init__(*args)
+        self.rival = rival
+
+    def get(self, name, default=None):
+        rival, self.rival = self.rival, None
+        if rival is not None:
+            self.claimed = claim_job(rival, ['default'])
+        return super().get(name, default)
+
+
+class JobQueueTests(TestCase):
+    """
+    Claiming, retries, visibility timeouts and failure handling of the
+    database-backed job queue.
+    """
+
+    def setUp(self):
+        self.calls = []
+        self.failures = []
+        self.specs = {
+            'test.ok': TaskSpec(name='test.ok', func=lambda **payload: self.calls.append(payload)),
+            'test.boom': TaskSpec(
+                name='test.boom', func=self.boom, max_attempts=3, retry_backoff=30,
+                on_failure=lambda **payload: self.failures.append(payload),
+            ),
+        }
+        for patcher in (mock.patch.dict(registry, self.specs), mock.patch('core.jobs.logger')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def boom(self, **payload):
+        raise Boom('no luck')
+
+    def make_due(self, job):
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+    def test_two_workers_cannot_claim_the_same_job(self):
+        job = enqueue('test.ok', {'x': 1})
+        racing = RacingRegistry(registry, rival='worker-a')
+        with mock.patch('core.jobs.registry', racing):
+            self.assertIsNone(claim_job('worker-b', ['default']))
+
+        self.assertEqual(racing.claimed.pk, job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts), ('running', 'worker-a', 1))
+
+    def test_failed_job_is_rescheduled_with_backoff(self):
+        job = enqueue('test.boom')
+        before = timezone.now()
+        self.assertFalse(run_job(claim_job('w', ['default']), 'w'))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIsNone(job.locked_until)
+        self.assertIn('Boom: no luck', job.last_error)
+        # 30s base delay with +/-20% jitter.
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=24))
+        self.assertLessEqual(job.run_at, timezone.now() + timedelta(seconds=36))
+        self.assertIsNone(claim_job('w', ['default']))
+
+        self.make_due(job)
+        run_job(claim_job('w', ['default']), 'w')
+        job.refresh_from_db()
+        # The delay doubles after the second attempt.
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=48))
+
+    def test_job_with_an_expired_lock_is_reclaimed(self):
+        job = enqueue('test.ok', {'x': 1})
+        lost = claim_job('worker-a', ['default'])
+        self.assertIsNone(claim_job('worker-b', ['default']))
+
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        reclaimed = claim_job('worker-b', ['default'])
+        self.assertEqual(reclaimed.pk, job.pk)
+        self.assertEqual((reclaimed.locked_by, reclaimed.attempts), ('worker-b', 2))
+
+        # The lost worker finishing late does not touch the new claim.
+        run_job(lost, 'worker-a')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('running', 'worker-b'))
+        self.assertTrue(run_job(reclaimed, 'worker-b'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(self.calls, [{'x': 1}, {'x': 1}])
+
+    def test_failure_handler_runs_only_after_max_attempts(self):
+        job = enqueue('test.boom', {'export_id': 'e1'})
+        for attempt in range(1, 3):
+            run_job(claim_job('w', ['default']), 'w')
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', attempt))
+            self.assertEqual(self.failures, [])
+            self.make_due(job)
+
+        run_job(claim_job('w', ['default']), 'w')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertEqual(self.failures, [{'export_id': 'e1'}])
+        self.assertIsNone(claim_job('w', ['default']))
+
+    def test_job_lost_on_its_final_attempt_fails_when_reclaimed(self):
+        job = enqueue('test.boom', {'export_id': 'e2'})
+        Job.objects.filter(pk=job.pk).update(attempts=3)
+        claim_job('worker-a', ['default'])
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertFalse(run_job(claim_job('worker-b', ['default']), 'worker-b'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(self.failures, [{'export_id': 'e2'}])
@@ -0,0 +1,187 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import (
+    CommunityMembership, ConnectionRecommendation, Contribution, DataExport, Friendship,
+    FundingRound, LivingWorld, Post, Proposal, SmartProfile, User, VerifiableCredential, Vote
+)
+from core.opinions import analyze_opinions
+from core.query_budget import QueryBudgetExceeded
+from core.views import MeView
+
+EXPORT_CID = 'bafkreigh2akiscaildcqabsyg3dfr6chu3fgpregiymsck7e7aqa4s52zy'
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, OPENAI_API_KEY='')
+class QueryBudgetTests(TestCase):
+    """
+    Drive every endpoint that declares a ``query_budget`` with strict
+    budgets, so an N+1 regression fails the request. Collections hold
+    several rows each, so per-row queries would show.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='pw')
+            for i in range(4)
+        ]
+        cls.user = cls.users[0]
+        cls.world = LivingWorld.objects.create(name='Garden', description='d', owner=cls.user)
+        for user in cls.users:
+            profile = SmartProfile.objects.create(user=user, name=f'{user.username} at home')
+            CommunityMembership.objects.create(profile=profile, world=cls.world)
+            VerifiableCredential.objects.create(
+                profile=profile, credential_data={'level': 1}, issuer_did='did:example:issuer'
+            )
+            Post.objects.create(content='hello', author=user, world=cls.world)
+        cls.profile = cls.user.smart_profiles.get()
+
+        for first, second in [(0, 1), (0, 2), (1, 2), (2, 3)]:
+            Friendship.objects.create(
+                user1=cls.users[first], user2=cls.users[second], status='accepted'
+            )
+        Friendship.objects.create(
+            user1=User.objects.create_user(username='stranger', password='pw'), user2=cls.user
+        )
+        ConnectionRecommendation.objects.create(user=cls.user, candidate=cls.users[3], score=1.0)
+
+        cls.proposals = [
+            Proposal.objects.create(title=f'p{i}', description='d', world=cls.world, creator=cls.user)
+            for i in range(3)
+        ]
+        for index, user in enumerate(cls.users):
+            for proposal in cls.proposals:
+                Vote.objects.create(
+                    proposal=proposal, voter=user, choice=('agree', 'disagree')[index % 2]
+                )
+        analyze_opinions(full=True)
+
+        cls.round = FundingRound.objects.create(
+            world=cls.world, creator=cls.user, title='Round', matching_pool=Decimal('100')
+        )
+        for user in cls.users:
+            for proposal in cls.proposals:
+                Contribution.objects.create(
+                    round=cls.round, proposal=proposal, contributor=user, amount=Decimal('2')
+                )
+
+        cls.export = DataExport.objects.create(
+            user=cls.user, status='complete', ipfs_cid=EXPORT_CID
+        )
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def get(self, path, expected=200, **extra):
+        response = self.client.get(path, **self.auth, **extra)
+        self.assertEqual(response.status_code, expected, path)
+        return response
+
+    def test_strict_budgets_are_enforced(self):
+        with mock.patch.object(MeView, 'query_budget', {'get': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.get('/api/auth/me/')
+
+    def test_account_views(self):
+        self.get('/api/auth/me/')
+        self.get('/api/auth/me/profile/')
+
+    def test_users(self):
+        other = self.users[2].pk
+        for path in [
+            '/api/users/',
+            f'/api/users/{other}/',
+            f'/api/users/{other}/profile/',
+            f'/api/users/{other}/friends/',
+            f'/api/users/{other}/mutual_friends/',
+            '/api/users/friends_of_friends/',
+            '/api/users/recommendations/',
+        ]:
+            self.get(path)
+
+    def test_worlds(self):
+        world = self.world.pk
+        for path in [
+            '/api/worlds/',
+            f'/api/worlds/{world}/',
+            f'/api/worlds/{world}/posts/',
+            f'/api/worlds/{world}/members/',
+            f'/api/worlds/{world}/proposals/',
+        ]:
+            self.get(path)
+
+    def test_posts_friendships_and_memberships(self):
+        post = Post.objects.filter(author=self.user).get()
+        friendship = Friendship.objects.filter(user1=self.user).first()
+        membership = CommunityMembership.objects.get(profile=self.profile)
+        for path in [
+            '/api/posts/',
+            f'/api/posts/?world_id={self.world.pk}',
+            f'/api/posts/{post.pk}/',
+            '/api/friendships/',
+            f'/api/friendships/{friendship.pk}/',
+            '/api/friendships/pending/',
+            '/api/memberships/',
+            f'/api/memberships/{membership.pk}/',
+        ]:
+            self.get(path)
+
+    def test_proposals_and_votes(self):
+        proposal = self.proposals[0].pk
+        vote = Vote.objects.filter(voter=self.user).first()
+        for path in [
+            '/api/proposals/',
+            f'/api/proposals/{proposal}/',
+            f'/api/proposals/{proposal}/votes/',
+            f'/api/proposals/{proposal}/tally/',
+            f'/api/proposals/opinions/?world_id={self.world.pk}',
+            '/api/votes/',
+            f'/api/votes/{vote.pk}/',
+        ]:
+            self.get(path)
+
+    def test_pending_opinions(self):
+        world = LivingWorld.objects.create(name='New', description='d', owner=self.user)
+        self.get(f'/api/proposals/opinions/?world_id={world.pk}', expected=202)
+
+    def test_funding_rounds(self):
+        for path in [
+            '/api/funding-rounds/',
+            f'/api/funding-rounds/{self.round.pk}/',
+            f'/api/funding-rounds/{self.round.pk}/results/',
+        ]:
+            self.get(path)
+
+    def test_identity_and_exports(self):
+        credential = VerifiableCredential.objects.get(profile=self.profile)
+        for path in [
+            '/api/smart-profiles/',
+            f'/api/smart-profiles/{self.profile.pk}/',
+            '/api/verifiable-credentials/',
+            f'/api/verifiable-credentials/{credential.pk}/',
+            '/api/exports/',
+            f'/api/exports/{self.export.pk}/',
+        ]:
+            self.get(path)
+
+    def test_async_views(self):
+        # A matching ETag answers before the IPFS node is asked.
+        etag = {'HTTP_IF_NONE_MATCH': f'"{EXPORT_CID}"'}
+        self.get(f'/api/exports/{self.export.pk}/download/', expected=304, **etag)
+        self.get(f'/api/ipfs/{EXPORT_CID}/', expected=304, **etag)
+
+        response = self.client.post(
+            '/api/companion/query/', {'query': 'What is happening?'},
+            content_type='application/json', **self.auth
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.get(f'/api/worlds/{self.world.pk}/events/')
+        response.close()
@@ -0,0 +1,115 @@
+import asyncio
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase
+
+from core.models import CommunityMembership, LivingWorld, Post, Proposal, SmartProfile, User, Vote
+from core.world_events import RESYNC, InProcessBroker
+
+
+class Rollback(Exception):
+    pass
+
+
+class WorldEventTests(TestCase):
+    """
+    Writes reach an in-process subscriber of their world once their
+    transaction commits, and never if it rolls back.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='owner', email='owner@example.com', password='pw')
+        cls.profile = SmartProfile.objects.create(user=cls.user, name='main')
+        cls.world = LivingWorld.objects.create(name='Commons', description='d', owner=cls.user)
+        cls.other_world = LivingWorld.objects.create(name='Elsewhere', description='d', owner=cls.user)
+        cls.proposal = Proposal.objects.create(title='p', description='d', world=cls.world, creator=cls.user)
+
+    def setUp(self):
+        self.broker = InProcessBroker()
+        patcher = mock.patch('core.world_events.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def subscribe(self, world):
+        stream = self.broker.subscribe(world.pk)
+        self.addCleanup(self.loop.run_until_complete, stream.aclose())
+        self.assertEqual(self.loop.run_until_complete(anext(stream)), ('ready', {'world_id': str(world.pk)}))
+        (subscriber,) = self.broker._subscribers[str(world.pk)]
+        return subscriber
+
+    def received(self, subscriber):
+        # Run the callbacks that hand published events to the loop.
+        self.loop.run_until_complete(asyncio.sleep(0))
+        events = []
+        while not subscriber.queue.empty():
+            events.append(subscriber.queue.get_nowait())
+        return events
+
+    def test_post_is_published_after_commit(self):
+        subscriber = self.subscribe(self.world)
+        elsewhere = self.subscribe(self.other_world)
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(world=self.world, author=self.user, content='hello')
+            self.assertEqual(self.received(subscriber), [])
+
+        [(event, data)] = self.received(subscriber)
+        self.assertEqual(event, 'post')
+        self.assertEqual(data['id'], str(post.pk))
+        self.assertEqual(data['author'], {'id': str(self.user.pk), 'username': 'owner'})
+        self.assertEqual((data['content'], data['truncated']), ('hello', False))
+        self.assertEqual(self.received(elsewhere), [])
+
+    def test_membership_is_published_after_commit(self):
+        subscriber = self.subscribe(self.world)
+        with self.captureOnCommitCallbacks(execute=True):
+            membership = CommunityMembership.objects.create(profile=self.profile, world=self.world)
+            self.assertEqual(self.received(subscriber), [])
+        self.assertEqual(self.received(subscriber), [('member', {
+            'action': 'joined', 'id': str(membership.pk), 'profile_id': str(self.profile.pk), 'role': 'member',
+        })])
+
+        membership_id = membership.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            membership.delete()
+            self.assertEqual(self.received(subscriber), [])
+        self.assertEqual(self.received(subscriber), [('member', {
+            'action': 'left', 'id': str(membership_id), 'profile_id': str(self.profile.pk),
+        })])
+
+    def test_vote_publishes_the_tally_after_commit(self):
+        subscriber = self.subscribe(self.world)
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(proposal=self.proposal, voter=self.user, choice='agree')
+            self.assertEqual(self.received(subscriber), [])
+
+        self.assertEqual(self.received(subscriber), [('tally', {
+            'proposal_id': str(self.proposal.pk), 'agree': 1, 'disagree': 0, 'abstain': 0, 'total': 1,
+        })])
+
+    def test_rolled_back_writes_publish_nothing(self):
+        subscriber = self.subscribe(self.world)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(Rollback), transaction.atomic():
+                Post.objects.create(world=self.world, author=self.user, content='draft')
+                CommunityMembership.objects.create(profile=self.profile, world=self.world)
+                Vote.objects.create(proposal=self.proposal, voter=self.user, choice='agree')
+                raise Rollback
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.received(subscriber), [])
+
+    def test_overflow_replaces_the_queue_with_resync(self):
+        with mock.patch('core.world_events.SUBSCRIBER_QUEUE_SIZE', 2):
+            subscriber = self.subscribe(self.world)
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                Post.objects.create(world=self.world, author=self.user, content=f'post {i}')
+
+        self.assertEqual(self.received(subscriber), [RESYNC])
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(world=self.world, author=self.user, content='after')
+        self.assertEqual([event for event, _ in self.received(subscriber)], ['post'])
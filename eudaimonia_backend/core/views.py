@@ -7,22 +7,39 @@ are designed to support the community-centric architecture and implement
 the faceted identity concepts outlined in the project principles.
 """
 
-from rest_framework import viewsets, status, permissions
+import uuid
+
+from rest_framework import mixins, viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Q, Sum
 from .models import (
     LivingWorld, Post, Friendship, CommunityMembership,
-    Proposal, Vote
+    Proposal, Vote, ConnectionRecommendation, FundingRound, Contribution,
+    OpinionAnalysis
 )
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, LivingWorldSerializer,
     PostSerializer, FriendshipSerializer, CommunityMembershipSerializer,
-    ProposalSerializer, VoteSerializer, FacetedProfileSerializer
+    ProposalSerializer, VoteSerializer, BallotSerializer, FriendSerializer,
+    ConnectionRecommendationSerializer, FundingRoundSerializer, ContributionSerializer
+)
+from .friend_graph import (
+    friend_edges, friend_ids, friends_of_friends, mutual_friend_counts,
+    mutual_friend_edges
 )
+from .opinions import place_participant, schedule_analysis
+from .pagination import KeysetPagination
+from .post_index import schedule_indexing
+from .prefetching import OptimizedQuerySetMixin, optimize_queryset
+from .profile_cache import get_faceted_profile
+from .quadratic import close_round, get_results
+from .voting import MAX_BULK_VOTES, cast_votes
 
 User = get_user_model()
 
@@ -32,6 +49,7 @@ class MeView(APIView):
     User's own data endpoint.
     """
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'get': 2}
 
     def get(self, request):
         """
@@ -46,13 +64,13 @@ class MyProfileView(APIView):
     User's own profile data endpoint.
     """
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'get': 3}
 
     def get(self, request):
         """
         Get the authenticated user's faceted profile.
         """
-        serializer = FacetedProfileSerializer(request.user)
-        return Response(serializer.data)
+        return Response(get_faceted_profile(request.user))
 
 
 class UserRegistrationView(APIView):
@@ -75,7 +93,7 @@ class UserRegistrationView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(OptimizedQuerySetMixin, viewsets.ReadOnlyModelViewSet):
     """
     User ViewSet for user management.
     
@@ -85,6 +103,11 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {
+        'list': 3, 'retrieve': 3, 'profile': 4, 'friends': 5,
+        'mutual_friends': 4, 'friends_of_friends': 3, 'recommendations': 3,
+    }
+    cursor_field = 'date_joined'
     
     @action(detail=True, methods=['get'])
     def profile(self, request, pk=None):
@@ -96,33 +119,89 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         community affiliations.
         """
         user = self.get_object()
-        serializer = FacetedProfileSerializer(user)
-        return Response(serializer.data)
+        return Response(get_faceted_profile(user))
     
     @action(detail=True, methods=['get'])
     def friends(self, request, pk=None):
         """
         Get a user's friends list.
         
-        This endpoint returns all accepted friendships for a user.
+        This endpoint returns all accepted friendships for a user,
+        read from the friendship adjacency index and paginated by
+        when each friendship was accepted. Each friend carries the
+        number of friends they share with the current user.
         """
         user = self.get_object()
-        friendships = Friendship.objects.filter(
-            Q(user1=user) | Q(user2=user),
-            status='accepted'
+        paginator = KeysetPagination(cursor_field='created_at')
+        page = paginator.paginate_queryset(friend_edges(user), request, view=self)
+
+        friends = [edge.friend for edge in page]
+        counts = mutual_friend_counts(request.user, [friend.pk for friend in friends])
+        for friend in friends:
+            friend.mutual_friends = counts.get(friend.pk, 0)
+
+        serializer = FriendSerializer(friends, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def mutual_friends(self, request, pk=None):
+        """
+        Get the friends a user has in common with the current user.
+        """
+        user = self.get_object()
+        paginator = KeysetPagination(cursor_field='created_at')
+        page = paginator.paginate_queryset(
+            mutual_friend_edges(request.user, user), request, view=self
         )
-        
-        friends = []
-        for friendship in friendships:
-            if friendship.user1 == user:
-                friends.append(UserSerializer(friendship.user2).data)
-            else:
-                friends.append(UserSerializer(friendship.user1).data)
-        
-        return Response(friends)
+        serializer = UserSerializer([edge.friend for edge in page], many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def friends_of_friends(self, request):
+        """
+        Get friends of the current user's friends.
+
+        Candidates are ranked by how many friends they share with the
+        current user. Use ``limit`` to control how many are returned.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        candidates = friends_of_friends(request.user)[:max(limit, 0)]
+        serializer = FriendSerializer(candidates, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def recommendations(self, request):
+        """
+        Get precomputed connection recommendations for the current user.
+
+        Recommendations are scored in batch from mutual friends and shared
+        LivingWorlds (see core.recommendations); this endpoint only reads
+        the stored top-N list. Use ``limit`` to control how many are returned.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        recommendations = optimize_queryset(
+            ConnectionRecommendation.objects.filter(user=request.user).exclude(
+                candidate__in=friend_ids(request.user)
+            ).order_by('-score'),
+            ConnectionRecommendationSerializer
+        )[:max(limit, 0)]
+        serializer = ConnectionRecommendationSerializer(recommendations, many=True)
+        return Response(serializer.data)
 
 
-class LivingWorldViewSet(viewsets.ModelViewSet):
+class LivingWorldViewSet(OptimizedQuerySetMixin, viewsets.ModelViewSet):
     """
     LivingWorld ViewSet for community management.
     
@@ -132,6 +211,7 @@ class LivingWorldViewSet(viewsets.ModelViewSet):
     queryset = LivingWorld.objects.all()
     serializer_class = LivingWorldSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 3, 'posts': 4, 'members': 4, 'proposals': 4}
     
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -168,13 +248,15 @@ class LivingWorldViewSet(viewsets.ModelViewSet):
         """
         Get all posts in a LivingWorld.
         
-        This endpoint returns all posts within a specific LivingWorld,
-        maintaining the contextual nature of content.
+        This endpoint returns the posts within a specific LivingWorld,
+        newest first, maintaining the contextual nature of content.
         """
         world = self.get_object()
-        posts = world.posts.all()
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination()
+        posts = optimize_queryset(world.posts.all(), PostSerializer)
+        page = paginator.paginate_queryset(posts, request, view=self)
+        serializer = PostSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def members(self, request, pk=None):
@@ -185,9 +267,11 @@ class LivingWorldViewSet(viewsets.ModelViewSet):
         showing the community structure.
         """
         world = self.get_object()
-        memberships = world.memberships.all()
-        serializer = CommunityMembershipSerializer(memberships, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination(cursor_field='joined_at')
+        memberships = optimize_queryset(world.memberships.all(), CommunityMembershipSerializer)
+        page = paginator.paginate_queryset(memberships, request, view=self)
+        serializer = CommunityMembershipSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['get'])
     def proposals(self, request, pk=None):
@@ -197,12 +281,14 @@ class LivingWorldViewSet(viewsets.ModelViewSet):
         This endpoint returns all proposals within a specific LivingWorld.
         """
         world = self.get_object()
-        proposals = world.proposals.all()
-        serializer = ProposalSerializer(proposals, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination()
+        proposals = optimize_queryset(world.proposals.all(), ProposalSerializer)
+        page = paginator.paginate_queryset(proposals, request, view=self)
+        serializer = ProposalSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(OptimizedQuerySetMixin, viewsets.ModelViewSet):
     """
     Post ViewSet for content management.
     
@@ -212,6 +298,8 @@ class PostViewSet(viewsets.ModelViewSet):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 3}
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         """
@@ -225,9 +313,14 @@ class PostViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        transaction.on_commit(schedule_indexing)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        transaction.on_commit(schedule_indexing)
 
 
-class FriendshipViewSet(viewsets.ModelViewSet):
+class FriendshipViewSet(OptimizedQuerySetMixin, viewsets.ModelViewSet):
     """
     Friendship ViewSet for relationship management.
     
@@ -237,6 +330,7 @@ class FriendshipViewSet(viewsets.ModelViewSet):
     queryset = Friendship.objects.all()
     serializer_class = FriendshipSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 3, 'pending': 3}
     
     def get_queryset(self):
         """
@@ -281,15 +375,15 @@ class FriendshipViewSet(viewsets.ModelViewSet):
         """
         Get pending friendship requests.
         """
-        pending_friendships = Friendship.objects.filter(
-            user2=request.user,
-            status='pending'
+        pending_friendships = optimize_queryset(
+            Friendship.objects.filter(user2=request.user, status='pending'),
+            FriendshipSerializer
         )
         serializer = self.get_serializer(pending_friendships, many=True)
         return Response(serializer.data)
 
 
-class CommunityMembershipViewSet(viewsets.ReadOnlyModelViewSet):
+class CommunityMembershipViewSet(OptimizedQuerySetMixin, viewsets.ReadOnlyModelViewSet):
     """
     CommunityMembership ViewSet for membership management.
 
@@ -299,6 +393,8 @@ class CommunityMembershipViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = CommunityMembership.objects.all()
     serializer_class = CommunityMembershipSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 3}
+    cursor_field = 'joined_at'
 
     def get_queryset(self):
         """
@@ -307,7 +403,7 @@ class CommunityMembershipViewSet(viewsets.ReadOnlyModelViewSet):
         return CommunityMembership.objects.filter(profile__user=self.request.user)
 
 
-class ProposalViewSet(viewsets.ModelViewSet):
+class ProposalViewSet(OptimizedQuerySetMixin, viewsets.ModelViewSet):
     """
     Proposal ViewSet for governance management.
     
@@ -317,6 +413,8 @@ class ProposalViewSet(viewsets.ModelViewSet):
     queryset = Proposal.objects.all()
     serializer_class = ProposalSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 3, 'votes': 4, 'tally': 2, 'opinions': 4}
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         """
@@ -337,12 +435,65 @@ class ProposalViewSet(viewsets.ModelViewSet):
         Get all votes for a proposal.
         """
         proposal = self.get_object()
-        votes = proposal.votes.all()
+        votes = optimize_queryset(proposal.votes.all(), VoteSerializer)
         serializer = VoteSerializer(votes, many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def tally(self, request, pk=None):
+        """
+        Get the vote tally for a proposal, read from its counter columns.
+        """
+        try:
+            tally = self.get_queryset().filter(pk=pk).values(
+                'id', 'vote_count', 'agree_count', 'disagree_count', 'abstain_count'
+            ).first()
+        except (ValueError, DjangoValidationError):
+            tally = None
+        if tally is None:
+            return Response({'error': 'Proposal not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'proposal_id': tally['id'],
+            'agree': tally['agree_count'],
+            'disagree': tally['disagree_count'],
+            'abstain': tally['abstain_count'],
+            'total': tally['vote_count'],
+        })
+    
+    @action(detail=False, methods=['get'])
+    def opinions(self, request):
+        """
+        Get the opinion groups and consensus proposals found in the votes
+        of the world given by ``world_id`` (see core/opinions.py), with
+        where the current user's votes place them (``you``).
+        
+        Returns 202 while the world's first analysis is pending.
+        """
+        world_id = request.query_params.get('world_id')
+        try:
+            world_id = uuid.UUID(world_id or '')
+        except ValueError:
+            return Response({'error': 'world_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # One query finds both the world and its analysis, if any.
+        world = LivingWorld.objects.filter(pk=world_id).select_related('opinion_analysis').first()
+        if world is None:
+            return Response({'error': 'World not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            analysis = world.opinion_analysis
+        except OpinionAnalysis.DoesNotExist:
+            schedule_analysis()
+            return Response({'status': 'pending'}, status=status.HTTP_202_ACCEPTED)
+        
+        return Response({
+            **analysis.result,
+            'world_id': world_id,
+            'computed_at': analysis.computed_at,
+            'you': place_participant(analysis, request.user),
+        })
 
 
-class VoteViewSet(viewsets.ModelViewSet):
+class VoteViewSet(OptimizedQuerySetMixin, viewsets.ModelViewSet):
     """
     Vote ViewSet for voting management.
     
@@ -352,6 +503,7 @@ class VoteViewSet(viewsets.ModelViewSet):
     queryset = Vote.objects.all()
     serializer_class = VoteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 3}
     
     def get_queryset(self):
         """
@@ -361,6 +513,165 @@ class VoteViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         serializer.save(voter=self.request.user)
+        transaction.on_commit(schedule_analysis)
+    
+    def perform_update(self, serializer):
+        serializer.save()
+        transaction.on_commit(schedule_analysis)
+    
+    def perform_destroy(self, instance):
+        instance.delete()
+        transaction.on_commit(schedule_analysis)
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Cast many votes at once.
+        
+        Takes ``{"votes": [{"proposal_id": ..., "choice": ...}, ...]}``
+        and returns one result per vote, in order, with a ``status`` of
+        ``created``, ``already_voted``, ``duplicate``, ``not_found`` or
+        ``invalid`` (with ``errors``). Valid votes are cast in a single
+        transaction (see core/voting.py).
+        """
+        items = request.data.get('votes') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'votes must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > MAX_BULK_VOTES:
+            return Response(
+                {'error': f'At most {MAX_BULK_VOTES} votes per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results, ballots, positions = [None] * len(items), [], []
+        for index, item in enumerate(items):
+            ballot = BallotSerializer(data=item)
+            if ballot.is_valid():
+                ballots.append((ballot.validated_data['proposal_id'], ballot.validated_data['choice']))
+                positions.append(index)
+            else:
+                results[index] = {
+                    'proposal_id': item.get('proposal_id') if isinstance(item, dict) else None,
+                    'status': 'invalid',
+                    'errors': ballot.errors,
+                }
+        for index, result in zip(positions, cast_votes(request.user, ballots)):
+            results[index] = result
+        
+        created = sum(result['status'] == 'created' for result in results)
+        if created:
+            transaction.on_commit(schedule_analysis)
+        return Response({'created': created, 'results': results})
+
+
+class FundingRoundViewSet(OptimizedQuerySetMixin,
+                          mixins.CreateModelMixin,
+                          mixins.RetrieveModelMixin,
+                          mixins.ListModelMixin,
+                          viewsets.GenericViewSet):
+    """
+    FundingRound ViewSet for quadratic voting and funding.
+    
+    Members contribute voice credits or donations to the proposals of
+    the round's LivingWorld; results are computed by core.quadratic.
+    Rounds cannot be edited once created, only closed.
+    """
+    queryset = FundingRound.objects.all()
+    serializer_class = FundingRoundSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 3, 'results': 4}
+    pagination_class = KeysetPagination
+    
+    def get_queryset(self):
+        """
+        Filter rounds by LivingWorld if world_id is provided.
+        """
+        queryset = FundingRound.objects.all()
+        world_id = self.request.query_params.get('world_id', None)
+        if world_id:
+            queryset = queryset.filter(world_id=world_id)
+        return queryset
+    
+    @action(detail=True, methods=['post'])
+    def contribute(self, request, pk=None):
+        """
+        Contribute to a proposal of an open round as a member of its
+        LivingWorld.
+        
+        Takes ``proposal_id`` and ``amount``; contributing to the same
+        proposal again replaces the previous amount. In a voting round
+        a member's contributions cannot exceed the credit budget.
+        """
+        funding_round = self.get_object()
+        if funding_round.status != 'open':
+            return Response(
+                {'error': 'Round is closed'},
+                status=status.HTTP_409_CONFLICT
+            )
+        if not CommunityMembership.objects.filter(
+            profile__user=request.user, world_id=funding_round.world_id
+        ).exists():
+            return Response(
+                {'error': 'Only members of the world can contribute'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = ContributionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        proposal_id = serializer.validated_data['proposal_id']
+        amount = serializer.validated_data['amount']
+        
+        if not Proposal.objects.filter(pk=proposal_id, world_id=funding_round.world_id).exists():
+            return Response(
+                {'error': 'Proposal is not part of this round'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if funding_round.mechanism == 'voting':
+            # Concurrent contributions can overshoot the budget; results
+            # scale such a member's credits back down to it.
+            spent = Contribution.objects.filter(
+                round=funding_round, contributor=request.user
+            ).exclude(proposal_id=proposal_id).aggregate(total=Sum('amount'))['total'] or 0
+            if spent + amount > funding_round.credit_budget:
+                return Response(
+                    {'error': f'Only {funding_round.credit_budget - spent} voice credits left'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        contribution, created = Contribution.objects.update_or_create(
+            round=funding_round, proposal_id=proposal_id, contributor=request.user,
+            defaults={'amount': amount}
+        )
+        return Response(
+            ContributionSerializer(contribution).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+    
+    @action(detail=True, methods=['get'])
+    def results(self, request, pk=None):
+        """
+        Get the results of a round: final once closed, live while open.
+        """
+        return Response(get_results(self.get_object()))
+    
+    @action(detail=True, methods=['post'])
+    def close(self, request, pk=None):
+        """
+        Close a round and store its final results. Only the round's
+        creator or the world's owner can close it.
+        """
+        funding_round = self.get_object()
+        if request.user.pk not in (funding_round.creator_id, funding_round.world.owner_id):
+            return Response(
+                {'error': 'Only the round creator or world owner can close it'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        funding_round = close_round(funding_round)
+        return Response(funding_round.results)
 
 
 class SocialRecoveryView(APIView):
@@ -387,55 +698,3 @@ class SocialRecoveryView(APIView):
             },
             status=status.HTTP_501_NOT_IMPLEMENTED
         )
-
-
-class AICompanionView(APIView):
-    """
-    AI Companion endpoint for contextual AI assistance.
-
-    This endpoint provides personalized AI assistance based on
-    the user's faceted identity and community context.
-    """
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def post(self, request):
-        """
-        Process AI companion queries with user context.
-
-        This endpoint takes a user query and enriches it with
-        the user's faceted profile data before sending to an
-        external LLM API for personalized responses.
-        """
-        query = request.data.get('query', '')
-        if not query:
-            return Response(
-                {'error': 'Query is required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Get user's faceted profile
-        user = request.user
-        profile_serializer = FacetedProfileSerializer(user)
-        user_context = profile_serializer.data
-
-        # Construct meta-prompt with user context
-        system_message = (
-            "You are an AI companion helping a user navigate their social world "
-            "on Eudaimonia. You understand the concept of 'Faceted Identity' "
-            "where a person's identity emerges from their various community "
-            "affiliations and roles."
-        )
-
-        context_message = f"User context: {user_context}"
-        full_prompt = f"{system_message}\n\n{context_message}\n\nUser question: {query}"
-
-        # TODO: Integrate with OpenAI API
-        # For now, return a placeholder response
-        response = {
-            'message': 'AI Companion feature is being implemented',
-            'user_context': user_context,
-            'query': query,
-            'planned_integration': 'OpenAI API for personalized responses'
-        }
-
-        return Response(response)
\ No newline at end of file
@@ -1,22 +1,28 @@
 """
 Eudaimonia Core ViewSets
 
-This module provides Django REST Framework ViewSets for the SmartProfile
-and VerifiableCredential models.
+This module provides Django REST Framework ViewSets for the SmartProfile,
+VerifiableCredential and DataExport models.
 """
 
-from rest_framework import viewsets, permissions
-from .models import SmartProfile, VerifiableCredential
-from .serializers import SmartProfileSerializer, VerifiableCredentialSerializer
+from django.db import transaction
+from rest_framework import mixins, viewsets, permissions
+from .jobs import enqueue
+from .models import SmartProfile, VerifiableCredential, DataExport
+from .serializers import (
+    SmartProfileSerializer, VerifiableCredentialSerializer, DataExportSerializer
+)
+from .prefetching import OptimizedQuerySetMixin
 
 
-class SmartProfileViewSet(viewsets.ModelViewSet):
+class SmartProfileViewSet(OptimizedQuerySetMixin, viewsets.ModelViewSet):
     """
     SmartProfile ViewSet for managing faceted identities.
     """
     queryset = SmartProfile.objects.all()
     serializer_class = SmartProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 3}
 
     def get_queryset(self):
         """
@@ -31,13 +37,15 @@ class SmartProfileViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class VerifiableCredentialViewSet(viewsets.ModelViewSet):
+class VerifiableCredentialViewSet(OptimizedQuerySetMixin, viewsets.ModelViewSet):
     """
     VerifiableCredential ViewSet for managing credentials.
     """
     queryset = VerifiableCredential.objects.all()
     serializer_class = VerifiableCredentialSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 3}
+    cursor_field = 'issued_at'
 
     def get_queryset(self):
         """
@@ -45,3 +53,34 @@ class VerifiableCredentialViewSet(viewsets.ModelViewSet):
         SmartProfiles.
         """
         return VerifiableCredential.objects.filter(profile__user=self.request.user)
+
+
+class DataExportViewSet(mixins.CreateModelMixin,
+                        mixins.RetrieveModelMixin,
+                        mixins.ListModelMixin,
+                        viewsets.GenericViewSet):
+    """
+    DataExport ViewSet for requesting exports of the user's own data.
+
+    Creating an export queues it for a background worker; the response
+    returns immediately with status ``pending``.
+    """
+    queryset = DataExport.objects.all()
+    serializer_class = DataExportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 3}
+
+    def get_queryset(self):
+        """
+        Filter DataExports to show only those of the current user.
+        """
+        return DataExport.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        """
+        Create the export for the current user and queue it for processing.
+        """
+        export = serializer.save(user=self.request.user)
+        transaction.on_commit(
+            lambda: enqueue('core.process_data_export', {'export_id': str(export.id)})
+        )
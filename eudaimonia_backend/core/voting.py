@@ -0,0 +1,86 @@
+"""
+Eudaimonia Bulk Voting
+
+Casts many votes in one transaction with a fixed number of round trips:
+one query for the proposals, one INSERT per batch and one query to see
+which rows went in. The ``(proposal, voter)`` unique constraint settles
+races: a vote that conflicts with an existing one is skipped by the
+database (``ignore_conflicts``) instead of being checked for first, and
+reported as ``already_voted``.
+
+``bulk_create`` sends no signals, so the counter columns and tally
+events that ``core.counters`` and ``core.world_events`` maintain for
+single votes are updated here: proposals needing the same change share
+one UPDATE, so a voter's ballot costs at most one per choice.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+
+from .counters import adjust_counters_in, tally_field
+from .models import Proposal, Vote
+from .world_events import publish_tallies
+
+# Largest number of votes accepted in one call.
+MAX_BULK_VOTES = 1000
+
+# Rows per INSERT.
+BATCH_SIZE = 500
+
+
+def cast_votes(voter, ballots):
+    """
+    Cast ``voter``'s votes for ``ballots``, an iterable of
+    ``(proposal_id, choice)`` pairs with valid choices.
+
+    Returns one result per ballot, in order: a dict with ``proposal_id``
+    and a ``status`` of ``created`` (with the vote ``id``),
+    ``already_voted``, ``duplicate`` (the proposal appears earlier in
+    ``ballots``) or ``not_found``.
+    """
+    ballots = list(ballots)
+    found = set(Proposal.objects.filter(
+        pk__in={proposal_id for proposal_id, _ in ballots}
+    ).values_list('pk', flat=True))
+
+    results, votes, seen = [], [], set()
+    for proposal_id, choice in ballots:
+        result = {'proposal_id': str(proposal_id)}
+        results.append(result)
+        if proposal_id not in found:
+            result['status'] = 'not_found'
+        elif proposal_id in seen:
+            result['status'] = 'duplicate'
+        else:
+            seen.add(proposal_id)
+            vote = Vote(proposal_id=proposal_id, voter=voter, choice=choice)
+            votes.append((result, vote))
+
+    with transaction.atomic():
+        Vote.objects.bulk_create(
+            [vote for _, vote in votes], batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+        # Ids are generated here, so the rows that exist are the ones inserted.
+        inserted = set(Vote.objects.filter(
+            pk__in=[vote.pk for _, vote in votes]
+        ).values_list('pk', flat=True))
+
+        deltas = {}
+        for result, vote in votes:
+            if vote.pk in inserted:
+                result.update(status='created', id=str(vote.pk))
+                counts = deltas.setdefault(vote.proposal_id, Counter())
+                counts['vote_count'] += 1
+                counts[tally_field(vote.choice)] += 1
+            else:
+                result['status'] = 'already_voted'
+
+        groups = {}
+        for proposal_id, counts in deltas.items():
+            groups.setdefault(frozenset(counts.items()), []).append(proposal_id)
+        for counts, proposal_ids in groups.items():
+            adjust_counters_in(Proposal, proposal_ids, dict(counts))
+        publish_tallies(deltas)
+
+    return results
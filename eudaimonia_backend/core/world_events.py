@@ -0,0 +1,333 @@
+"""
+Eudaimonia World Events
+
+Pushes activity in a LivingWorld to the clients watching it, so a world
+page can follow new posts, members and votes without polling each list
+endpoint. Events are streamed by ``WorldEventsView`` as Server-Sent
+Events:
+
+``ready``
+    The subscription is live; fetch the lists once, then apply events.
+``post``
+    A post was created in the world (its content is an excerpt).
+``member``
+    A membership was created (``action: joined``) or deleted (``left``).
+``tally``
+    A vote on one of the world's proposals was cast, changed or
+    withdrawn. Carries the proposal's current counts rather than a
+    delta, so a client that misses one is corrected by the next.
+``resync``
+    Events may have been lost (the client fell too far behind, or the
+    broker reconnected); refetch the lists.
+
+Events are published once the transaction that caused them commits,
+through the broker named by ``WORLD_EVENTS_BROKER``:
+
+``InProcessBroker``
+    The default. Fans events out within the process, which is enough
+    when one process serves the whole API (``uvicorn`` without
+    ``--workers``): writes made in another process are not seen.
+``PostgresBroker``
+    Publishes with ``NOTIFY`` on the database and has each process
+    ``LISTEN`` once, so events reach subscribers on every node. Needs
+    PostgreSQL.
+
+Bulk queryset operations bypass the signals below; call
+``publish_tallies`` after changing votes in bulk.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import CommunityMembership, Post, Proposal, Vote
+
+logger = logging.getLogger(__name__)
+
+# Events a subscriber may fall behind by before it is sent ``resync``.
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Longest post excerpt in a ``post`` event, in characters; keeps events
+# within the 8000-byte NOTIFY payload limit.
+EXCERPT_CHARS = 500
+
+RESYNC = ('resync', {})
+
+
+class _Subscriber:
+    """
+    The queue of events for one client, owned by its event loop.
+    """
+
+    def __init__(self, world_id):
+        self.world_id = world_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, item):
+        # Runs on the subscriber's loop.
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    def send(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self.put, item)
+        except RuntimeError:
+            # The loop has closed; the subscription is being torn down.
+            pass
+
+
+class InProcessBroker:
+    """
+    Delivers events to the subscribers in this process.
+
+    ``publish`` may be called from any thread; each subscriber's events
+    are handed to its own event loop.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, world_id, event, data):
+        self.deliver(str(world_id), event, data)
+
+    def deliver(self, world_id, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(world_id, ()))
+        for subscriber in subscribers:
+            subscriber.send((event, data))
+
+    def deliver_all(self, event, data):
+        with self._lock:
+            subscribers = [s for group in self._subscribers.values() for s in group]
+        for subscriber in subscribers:
+            subscriber.send((event, data))
+
+    async def listen(self):
+        """
+        Make sure this process receives published events. Nothing to do
+        in-process.
+        """
+
+    async def subscribe(self, world_id):
+        """
+        Yield ``(event, data)`` pairs for ``world_id``, starting with
+        ``ready`` once the subscription is registered.
+        """
+        world_id = str(world_id)
+        subscriber = _Subscriber(world_id)
+        with self._lock:
+            self._subscribers.setdefault(world_id, set()).add(subscriber)
+        try:
+            await self.listen()
+            yield 'ready', {'world_id': world_id}
+            while True:
+                yield await subscriber.queue.get()
+        finally:
+            with self._lock:
+                group = self._subscribers.get(world_id)
+                if group is not None:
+                    group.discard(subscriber)
+                    if not group:
+                        del self._subscribers[world_id]
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Relays events between processes with PostgreSQL ``NOTIFY``.
+
+    Each process keeps one extra database connection per event loop,
+    listening on ``channel``, and delivers what arrives to its local
+    subscribers. If that connection drops, it reconnects and sends
+    every local subscriber ``resync``.
+    """
+
+    def __init__(self, channel='eudaimonia_world_events', using='default', reconnect_delay=1.0):
+        super().__init__()
+        if connections[using].vendor != 'postgresql':
+            raise ImproperlyConfigured('PostgresBroker needs a PostgreSQL database.')
+        self.channel = channel
+        self.using = using
+        self.reconnect_delay = reconnect_delay
+        self._listeners = {}
+
+    def publish(self, world_id, event, data):
+        payload = json.dumps({'world_id': str(world_id), 'event': event, 'data': data})
+        with connections[self.using].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    async def listen(self):
+        # Wait for LISTEN, so nothing published after ``ready`` is missed.
+        loop = asyncio.get_running_loop()
+        listener = self._listeners.get(loop)
+        if listener is None or listener[0].done():
+            connected = asyncio.Event()
+            listener = self._listeners[loop] = (asyncio.ensure_future(self._listen(connected)), connected)
+        await listener[1].wait()
+
+    def _connect(self):
+        # A dedicated psycopg2 connection, outside Django's per-thread ones.
+        wrapper = connections[self.using]
+        connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    async def _listen(self, connected):
+        loop = asyncio.get_running_loop()
+        first = True
+        while True:
+            try:
+                connection = await asyncio.to_thread(self._connect)
+            except Exception:
+                logger.exception('World events listener could not connect')
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            if not first:
+                self.deliver_all(*RESYNC)
+            first = False
+            connected.set()
+
+            lost = loop.create_future()
+
+            def readable():
+                try:
+                    connection.poll()
+                except Exception as e:
+                    if not lost.done():
+                        lost.set_result(e)
+                    return
+                while connection.notifies:
+                    self._received(connection.notifies.pop(0).payload)
+
+            loop.add_reader(connection.fileno(), readable)
+            try:
+                error = await lost
+                logger.warning('World events listener lost its connection: %s', error)
+            finally:
+                loop.remove_reader(connection.fileno())
+                connection.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _received(self, payload):
+        try:
+            message = json.loads(payload)
+            self.deliver(message['world_id'], message['event'], message['data'])
+        except (ValueError, KeyError):
+            logger.warning('Ignoring malformed world event: %.200s', payload)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """
+    Return the broker configured by ``WORLD_EVENTS_BROKER``.
+    """
+    broker_class = import_string(settings.WORLD_EVENTS_BROKER)
+    return broker_class(**settings.WORLD_EVENTS_BROKER_OPTIONS)
+
+
+def publish(world_id, event, data):
+    """
+    Publish an event to ``world_id`` once the current transaction commits.
+    """
+    def send():
+        try:
+            get_broker().publish(world_id, event, data)
+        except Exception:
+            # Subscribers resync on reconnect; never fail the write.
+            logger.exception('Could not publish %s event to world %s', event, world_id)
+
+    transaction.on_commit(send)
+
+
+def publish_tallies(proposal_ids):
+    """
+    Publish the current tally of each of ``proposal_ids`` once the
+    current transaction commits.
+    """
+    proposal_ids = set(proposal_ids)
+    if not proposal_ids:
+        return
+
+    def send():
+        try:
+            broker = get_broker()
+            tallies = Proposal.objects.filter(pk__in=proposal_ids).values(
+                'id', 'world_id', 'vote_count', 'agree_count', 'disagree_count', 'abstain_count'
+            )
+            for tally in tallies:
+                broker.publish(tally['world_id'], 'tally', {
+                    'proposal_id': str(tally['id']),
+                    'agree': tally['agree_count'],
+                    'disagree': tally['disagree_count'],
+                    'abstain': tally['abstain_count'],
+                    'total': tally['vote_count'],
+                })
+        except Exception:
+            logger.exception('Could not publish proposal tallies')
+
+    transaction.on_commit(send)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    publish(instance.world_id, 'post', {
+        'id': str(instance.pk),
+        'author': {'id': str(instance.author_id), 'username': instance.author.username},
+        'content': instance.content[:EXCERPT_CHARS],
+        'truncated': len(instance.content) > EXCERPT_CHARS,
+        'created_at': instance.created_at.isoformat(),
+    })
+
+
+@receiver(post_save, sender=CommunityMembership)
+def membership_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    publish(instance.world_id, 'member', {
+        'action': 'joined',
+        'id': str(instance.pk),
+        'profile_id': str(instance.profile_id),
+        'role': instance.role,
+    })
+
+
+@receiver(post_delete, sender=CommunityMembership)
+def membership_deleted(sender, instance, **kwargs):
+    publish(instance.world_id, 'member', {
+        'action': 'left',
+        'id': str(instance.pk),
+        'profile_id': str(instance.profile_id),
+    })
+
+
+@receiver(post_save, sender=Vote)
+def vote_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # core.counters records the previous choice before the save.
+    previous = getattr(instance, '_previous_choice', None)
+    if created or (previous is not None and previous != instance.choice):
+        publish_tallies([instance.proposal_id])
+
+
+@receiver(post_delete, sender=Vote)
+def vote_deleted(sender, instance, **kwargs):
+    publish_tallies([instance.proposal_id])
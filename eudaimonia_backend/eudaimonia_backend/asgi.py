@@ -0,0 +1,25 @@
+"""
+ASGI config for eudaimonia_backend project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server so the async views in core/async_views.py can
+wait on the LLM and IPFS without holding a worker, e.g.::
+
+    uvicorn eudaimonia_backend.asgi:application --workers 4
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eudaimonia_backend.settings')
+
+application = get_asgi_application()
+
+# Imported once Django is set up; lets streaming views notice disconnects.
+from core.streaming import DisconnectWatcher  # noqa: E402
+
+application = DisconnectWatcher(application)
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'core.query_budget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,6 +76,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'eudaimonia_backend.wsgi.application'
+ASGI_APPLICATION = 'eudaimonia_backend.asgi.application'
 
 
 # Database
@@ -101,6 +103,36 @@ if DEBUG:
     }
 
 
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+#
+# The 'profiles' cache holds materialized faceted profiles (core/profile_cache.py).
+# Point it at a shared backend in production, e.g.
+# PROFILE_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# PROFILE_CACHE_LOCATION=redis://127.0.0.1:6379/1
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'profiles': {
+        'BACKEND': config('PROFILE_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('PROFILE_CACHE_LOCATION', default='eudaimonia-profiles'),
+        'TIMEOUT': config('PROFILE_CACHE_TIMEOUT', default=3600, cast=int),
+    },
+    'companion': {
+        'BACKEND': config('COMPANION_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('COMPANION_CACHE_LOCATION', default='eudaimonia-companion'),
+        'TIMEOUT': config('COMPANION_CACHE_TIMEOUT', default=86400, cast=int),
+    },
+}
+
+
+# Every model points at core.User, and the views, serializers and JWT
+# authentication resolve accounts through get_user_model(). Databases
+# created before this was set need the upgrade steps in the README.
+AUTH_USER_MODEL = 'core.User'
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -150,10 +182,14 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
     'PAGE_SIZE': 20,
 }
 
+# Query budget instrumentation (see core/query_budget.py)
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+QUERY_BUDGET_DUPLICATE_THRESHOLD = config('QUERY_BUDGET_DUPLICATE_THRESHOLD', default=5, cast=int)
+
 # JWT settings
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -170,5 +206,44 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# IPFS (see core/ipfs_service.py)
+IPFS_API_ADDR = config('IPFS_API_ADDR', default=None)
+IPFS_POOL_SIZE = config('IPFS_POOL_SIZE', default=4, cast=int)
+IPFS_CONNECT_TIMEOUT = config('IPFS_CONNECT_TIMEOUT', default=5.0, cast=float)
+IPFS_READ_TIMEOUT = config('IPFS_READ_TIMEOUT', default=60.0, cast=float)
+IPFS_ACQUIRE_TIMEOUT = config('IPFS_ACQUIRE_TIMEOUT', default=30.0, cast=float)
+IPFS_HEALTH_CHECK_INTERVAL = config('IPFS_HEALTH_CHECK_INTERVAL', default=30.0, cast=float)
+# Connections shared by concurrent transfers in core/ipfs_async.py.
+IPFS_ASYNC_MAX_CONNECTIONS = config('IPFS_ASYNC_MAX_CONNECTIONS', default=32, cast=int)
+# Local cache of fetched IPFS objects (see core/ipfs_cache.py); empty disables it.
+IPFS_CACHE_DIR = config('IPFS_CACHE_DIR', default=str(BASE_DIR / 'ipfs_cache'))
+IPFS_CACHE_MAX_BYTES = config('IPFS_CACHE_MAX_BYTES', default=1024 ** 3, cast=int)
+
 # OpenAI API Key (for AI Companion feature)
-OPENAI_API_KEY = config('OPENAI_API_KEY', default='') 
\ No newline at end of file
+OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
+OPENAI_BASE_URL = config('OPENAI_BASE_URL', default='')
+OPENAI_MODEL = config('OPENAI_MODEL', default='gpt-3.5-turbo')
+OPENAI_TIMEOUT = config('OPENAI_TIMEOUT', default=30.0, cast=float)
+OPENAI_MAX_RETRIES = config('OPENAI_MAX_RETRIES', default=2, cast=int)
+
+# Upper bound on the user context sent with each companion query, in tokens.
+COMPANION_CONTEXT_TOKENS = config('COMPANION_CONTEXT_TOKENS', default=600, cast=int)
+# Posts from the user's worlds retrieved into the companion context.
+COMPANION_RETRIEVED_POSTS = config('COMPANION_RETRIEVED_POSTS', default=5, cast=int)
+
+# Post embedding index (see core/post_index.py and core/embeddings.py).
+POST_INDEX_DIR = config('POST_INDEX_DIR', default=str(BASE_DIR / 'post_index'))
+POST_EMBEDDER = config('POST_EMBEDDER', default='core.embeddings.HashingEmbedder')
+POST_EMBEDDER_OPTIONS = {'dim': config('POST_EMBEDDING_DIM', default=256, cast=int)}
+# Seconds a new post waits before the index run that picks it up.
+POST_INDEX_DELAY = config('POST_INDEX_DELAY', default=30, cast=int)
+
+# Seconds a new vote waits before the opinion analysis that picks it up
+# (see core/opinions.py).
+OPINION_ANALYSIS_DELAY = config('OPINION_ANALYSIS_DELAY', default=60, cast=int)
+
+# Broker relaying LivingWorld events to streaming clients (see core/world_events.py).
+# The in-process default only reaches clients of the process that made the
+# change; use core.world_events.PostgresBroker when running several workers.
+WORLD_EVENTS_BROKER = config('WORLD_EVENTS_BROKER', default='core.world_events.InProcessBroker')
+WORLD_EVENTS_BROKER_OPTIONS = {}
@@ -132,6 +132,78 @@ export default function LivingWorldPage() {
     }
   )
 
+  // Follow world activity pushed by the server instead of polling.
+  // EventSource cannot send the Authorization header, so read the
+  // Server-Sent Events stream with fetch.
+  useEffect(() => {
+    const controller = new AbortController()
+    let retry: ReturnType<typeof setTimeout> | undefined
+
+    const handleEvent = (event: string, data: any) => {
+      if (event === 'post') {
+        queryClient.invalidateQueries(['worldPosts', worldId])
+      } else if (event === 'member') {
+        queryClient.invalidateQueries(['worldMembers', worldId])
+        queryClient.invalidateQueries(['world', worldId])
+      } else if (event === 'tally') {
+        queryClient.setQueryData(['worldProposals', worldId], (proposals: Proposal[] | undefined) =>
+          proposals?.map((proposal) =>
+            proposal.id === data.proposal_id ? { ...proposal, vote_count: data.total } : proposal
+          ) as Proposal[]
+        )
+      } else if (event === 'resync') {
+        queryClient.invalidateQueries(['worldPosts', worldId])
+        queryClient.invalidateQueries(['worldMembers', worldId])
+        queryClient.invalidateQueries(['worldProposals', worldId])
+      }
+    }
+
+    const connect = async () => {
+      try {
+        const token = localStorage.getItem('authToken')
+        const response = await fetch(`/api/worlds/${worldId}/events/`, {
+          headers: { Authorization: `Bearer ${token}`, Accept: 'text/event-stream' },
+          signal: controller.signal
+        })
+        if (!response.ok || !response.body) {
+          return
+        }
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+        let buffer = ''
+        while (true) {
+          const { value, done } = await reader.read()
+          if (done) break
+          buffer += value
+          const messages = buffer.split('\n\n')
+          buffer = messages.pop() || ''
+          for (const message of messages) {
+            let event = 'message'
+            let data = ''
+            for (const line of message.split('\n')) {
+              if (line.startsWith('event: ')) event = line.slice(7)
+              else if (line.startsWith('data: ')) data += line.slice(6)
+            }
+            if (data) handleEvent(event, JSON.parse(data))
+          }
+        }
+      } catch (error) {
+        if (controller.signal.aborted) return
+        console.error('World event stream failed:', error)
+      }
+      // Reconnect, then refetch whatever was missed in between.
+      retry = setTimeout(() => {
+        handleEvent('resync', {})
+        connect()
+      }, 5000)
+    }
+
+    connect()
+    return () => {
+      controller.abort()
+      clearTimeout(retry)
+    }
+  }, [worldId, queryClient])
+
   // Create post mutation
   const createPostMutation = useMutation(
     async (content: string) => {